@@ -0,0 +1,60 @@
+"""
+Cancel cost as the queue grows.
+
+Enters N events and cancels all of them. Prints the average cost of one cancel for the
+standard sched module and for every calsched queue backend. With sched the cost grows
+linearly with N, with calsched it stays flat.
+
+    python benchmarks/bench_cancel.py
+"""
+
+import argparse
+import sched
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, HeapQueue, SimulatedClock, TimingWheelQueue
+
+
+def bench_sched(size):
+    scheduler = sched.scheduler(SimulatedClock().time)
+    events = [scheduler.enterabs(i, 0, print) for i in range(size)]
+
+    def cancel_all():
+        for event in events:
+            scheduler.cancel(event)
+    return measure(cancel_all) / size
+
+
+def bench_calsched(size, queue):
+    clock = SimulatedClock()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock, queue=queue)
+    events = [
+        scheduler.enter_every_second_event(action=print, interval=1 + i % 3600)
+        for i in range(size)
+    ]
+
+    def cancel_all():
+        for event in events:
+            scheduler.cancel(event)
+    return measure(cancel_all) / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        rows.append([
+            size,
+            f"{bench_sched(size) * 1e6:.2f}",
+            f"{bench_calsched(size, HeapQueue()) * 1e6:.2f}",
+            f"{bench_calsched(size, TimingWheelQueue()) * 1e6:.2f}",
+        ])
+    print_table(["events", "sched us/cancel", "HeapQueue us/cancel", "TimingWheelQueue us/cancel"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+One compound event against separate daily events.
+
+Schedules the same times of day once as separate daily events, one per time, and once as
+compound events, one per job, and compares the queue size, the cost of entering the jobs
+and of dispatching their fires on a virtual clock.
+
+    python benchmarks/bench_compound.py
+"""
+
+import argparse
+import datetime
+import gc
+import itertools
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, SimulatedClock
+from calsched.queues import HeapQueue
+
+
+DAY = 86400
+UTC = datetime.timezone.utc
+
+
+def enter_separate(scheduler, job, hours, action, end_time):
+    for hour in hours:
+        scheduler.enter_daily_event(action, hour=hour, minute=job % 60, start_time=0.0, end_time=end_time, tz=UTC)
+
+
+def enter_compound(scheduler, job, hours, action, end_time):
+    scheduler.enter_compound_event(
+        action, "daily", hours=hours, minutes=(job % 60,), start_time=0.0, end_time=end_time, tz=UTC
+    )
+
+
+def bench(enter, jobs, hours, days):
+    clock = SimulatedClock()
+    queue = HeapQueue()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock, queue=queue)
+    counter = itertools.count()
+    gc.collect()
+    enter_time = measure(lambda: [enter(scheduler, job, hours, counter.__next__, days * DAY) for job in range(jobs)])
+    size = len(queue)
+    gc.collect()
+    elapsed = measure(scheduler.run)
+    return size, enter_time / jobs, elapsed / next(counter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--times", type=int, default=3, help="times of day per job")
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    hours = tuple(range(0, 24, 24 // args.times))[:args.times]
+    rows = []
+    for name, enter in (("daily", enter_separate), ("compound", enter_compound)):
+        size, enter_time, dispatch = bench(enter, args.jobs, hours, args.days)
+        rows.append([name, size, f"{enter_time * 1e6:.2f}", f"{dispatch * 1e6:.2f}"])
+    print_table(["events", "queue size", "us/job enter", "us/fire"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Dispatch and cancel throughput with several threads.
+
+Every thread runs its own CalendarScheduler on a virtual clock, dispatches a fixed number
+of fires and then cancels its events. With --shared-lock all events share one lock, as
+they did before each event got its own lock.
+
+    python benchmarks/bench_contention.py
+"""
+
+import argparse
+import threading
+import time
+
+from common import print_table
+
+from calsched import CalendarScheduler, SimulatedClock
+
+
+def worker(events_per_thread, fires_per_thread, shared_lock, barrier, result):
+    clock = SimulatedClock()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock)
+    events = []
+    fires = 0
+
+    def action():
+        nonlocal fires
+        fires += 1
+        if fires == fires_per_thread:
+            start = time.perf_counter()
+            for event in events:
+                scheduler.cancel(event)
+            result["cancel"] = time.perf_counter() - start
+
+    for i in range(events_per_thread):
+        event = scheduler.enter_every_millisecond_event(action=action, interval=10 + i % 90)
+        if shared_lock is not None:
+            event.lock = shared_lock
+        events.append(event)
+
+    barrier.wait()
+    start = time.perf_counter()
+    scheduler.run()
+    result["run"] = time.perf_counter() - start
+
+
+def bench(threads, events_per_thread, fires_per_thread, shared):
+    shared_lock = threading.Lock() if shared else None
+    barrier = threading.Barrier(threads)
+    results = [{} for _ in range(threads)]
+    workers = [
+        threading.Thread(
+            target=worker,
+            args=(events_per_thread, fires_per_thread, shared_lock, barrier, results[i])
+        )
+        for i in range(threads)
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cancel_time = max(result["cancel"] for result in results)
+    return threads * fires_per_thread / elapsed, threads * events_per_thread / cancel_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--events", type=int, default=1000, help="events per thread")
+    parser.add_argument("--fires", type=int, default=50000, help="fires per thread")
+    parser.add_argument("--shared-lock", action="store_true")
+    args = parser.parse_args()
+
+    rows = []
+    for threads in args.threads:
+        dispatch_rate, cancel_rate = bench(threads, args.events, args.fires, args.shared_lock)
+        rows.append([threads, f"{dispatch_rate:.0f}", f"{cancel_rate:.0f}"])
+    print_table(["threads", "fires/s", "cancels/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
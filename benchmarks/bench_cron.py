@@ -0,0 +1,41 @@
+"""
+Next fire time cost of cron expressions.
+
+Computes the next fire time of cron events repeatedly, the way the scheduler does on every
+fire. The cost should not depend on how sparse the expression is, because the next time is
+found by jumping field by field instead of scanning minute by minute.
+
+    python benchmarks/bench_cron.py
+"""
+
+import datetime
+
+from common import measure_rearm, print_table, rearm_arguments
+
+from calsched import CalendarScheduler
+
+
+EXPRESSIONS = [
+    "* * * * *",
+    "*/15 9-17 * * mon-fri",
+    "30 2 * * *",
+    "0 0 1 * *",
+    "0 0 13 * fri",
+    "0 3 29 2 *",
+]
+
+
+def main():
+    args = rearm_arguments(__doc__)
+
+    scheduler = CalendarScheduler()
+    rows = []
+    for expression in EXPRESSIONS:
+        event = scheduler.enter_cron_event(print, expression, start_time=args.start, tz=datetime.timezone.utc)
+        scheduler.cancel(event)
+        rows.append([expression, f"{measure_rearm(event.settings.next_time, args.count, args.start) * 1e6:.2f}"])
+    print_table(["expression", "us/next_time"], rows)
+
+
+if __name__ == "__main__":
+    main()
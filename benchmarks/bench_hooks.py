@@ -0,0 +1,65 @@
+"""
+Dispatch cost with and without hooks.
+
+Runs events on a virtual clock and prints the average cost of one fire: without hooks,
+after a hook was added and removed again, which must cost the same, and with a no-op
+hook on every dispatch point.
+
+    python benchmarks/bench_hooks.py
+"""
+
+import argparse
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, SimulatedClock
+from calsched.core import HOOKS
+
+
+def noop(*_):
+    pass
+
+
+def bench(args, setup):
+    results = []
+    for _ in range(args.repeat):
+        clock = SimulatedClock()
+        scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock)
+        setup(scheduler)
+        for i in range(args.events):
+            scheduler.enter_every_millisecond_event(
+                action=noop, interval=1000 + i, start_time=0, end_time=args.fires
+            )
+        results.append(measure(scheduler.run))
+    fires = sum(int((args.fires * 1000 - 1) // (1000 + i)) for i in range(args.events))
+    return min(results) / fires
+
+
+def add_and_remove(scheduler):
+    for name in HOOKS:
+        scheduler.add_hook(name, noop)
+        scheduler.remove_hook(name, noop)
+
+
+def add_all(scheduler):
+    for name in HOOKS:
+        scheduler.add_hook(name, noop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--fires", type=int, default=1000, help="fires of each event")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = bench(args, lambda scheduler: None)
+    rows = [["no hooks", f"{baseline * 1e6:.3f}", "1.00"]]
+    for name, setup in (("added and removed", add_and_remove), ("no-op hooks", add_all)):
+        cost = bench(args, setup)
+        rows.append([name, f"{cost * 1e6:.3f}", f"{cost / baseline:.2f}"])
+    print_table(["hooks", "us/fire", "relative"], rows)
+
+
+if __name__ == "__main__":
+    main()
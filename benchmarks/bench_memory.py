@@ -0,0 +1,54 @@
+"""
+Memory per registered event for every event type.
+
+Enters events of each type into a scheduler and reports the memory they take, traced by
+tracemalloc: the event handle, its rule, its queue entry and the values they refer to.
+Rules shared between events, such as compiled cron expressions, are counted too, since
+the events of the suite have different parameters.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --size 1000000 --events daily cron
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from bench_suite import EVENT_TYPES
+from common import print_table
+
+from calsched import CalendarScheduler, SimulatedClock
+
+
+def bench(method, params, size):
+    clock = SimulatedClock()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock)
+    enter = getattr(scheduler, method)
+    parameters = [params(i) for i in range(size)]
+    gc.collect()
+    tracemalloc.start()
+    events = [enter(action=print, start_time=0.0, **parameters[i]) for i in range(size)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list of handles is not part of the events.
+    return (used - events.__sizeof__()) / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--events", nargs="+", help="event types to run (default: all)")
+    args = parser.parse_args()
+
+    rows = []
+    for name, method, params, _ in EVENT_TYPES:
+        if args.events and name not in args.events:
+            continue
+        per_event = bench(method, params, args.size)
+        rows.append([name, f"{per_event:.0f}", f"{per_event * 1e6 / 2 ** 20:.0f}"])
+    print_table(["event", "bytes/event", "MiB per 1M events"], rows)
+
+
+if __name__ == "__main__":
+    main()
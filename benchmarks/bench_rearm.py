@@ -0,0 +1,64 @@
+"""
+Re-arm cost of the calendar rules.
+
+Computes the next fire time of an event repeatedly, the way the scheduler does on every
+fire. Prints the average cost of one re-arm with the datetime based computation, which
+was used for every fire before, and with the current next_time(), which uses plain
+arithmetic for fixed offset zones and cached offsets for other zones.
+
+    python benchmarks/bench_rearm.py
+"""
+
+import datetime
+
+from common import measure_rearm, print_table, rearm_arguments
+
+from calsched.rules import (
+    Event, InternalHourlyEvent, InternalDailyEvent, InternalWeeklyEvent, InternalMonthlyEvent,
+    InternalYearlyEvent,
+)
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+RULES = [
+    ("hourly", InternalHourlyEvent),
+    ("daily", InternalDailyEvent),
+    ("weekly", InternalWeeklyEvent),
+    ("monthly", InternalMonthlyEvent),
+    ("yearly", InternalYearlyEvent),
+]
+
+
+def zones():
+    result = [
+        ("utc", datetime.timezone.utc),
+        ("+05:30", datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+        ("local", None),
+    ]
+    if zoneinfo is not None:
+        result.append(("Europe/Berlin", zoneinfo.ZoneInfo("Europe/Berlin")))
+    return result
+
+
+def main():
+    args = rearm_arguments(__doc__)
+
+    rows = []
+    for zone_name, tz in zones():
+        for rule_name, rule_class in RULES:
+            rule = rule_class(Event(), print, (), {}, args.start, None, tz=tz, hour=4, minute=30)
+            # The datetime computation is the internal fallback of next_time(), measured as the reference.
+            before = measure_rearm(rule._next_datetime, args.count, args.start)  # pylint: disable=protected-access
+            after = measure_rearm(rule.next_time, args.count, args.start)
+            rows.append([
+                zone_name, rule_name, f"{before * 1e6:.2f}", f"{after * 1e6:.2f}", f"{before / after:.1f}x"
+            ])
+    print_table(["zone", "rule", "datetime us/re-arm", "next_time us/re-arm", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
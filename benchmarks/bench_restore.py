@@ -0,0 +1,69 @@
+"""
+Restart time: saving many jobs to a job store and restoring them into a new scheduler.
+
+Half of the jobs have a last fire time, as after a restart of a running application.
+
+    python benchmarks/bench_restore.py
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import tempfile
+import time
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, FileJobStore, SQLiteJobStore
+
+
+def save_jobs(scheduler, size):
+    start_time = time.time() + 86400
+    with scheduler.batch() as batch:
+        for i in range(size):
+            batch.enter_daily_event(
+                action=print, action_args=(i,), hour=i % 24, minute=i % 60, second=i % 59,
+                start_time=start_time, tz=datetime.timezone.utc, job_id=f"job-{i}"
+            )
+
+
+def bench(store_class, size, directory):
+    path = os.path.join(directory, f"{store_class.__name__}-{size}")
+    store = store_class(path)
+    saved = measure(save_jobs, CalendarScheduler(store=store), size)
+    for i in range(0, size, 2):
+        store.fired(f"job-{i}", time.time())
+    store.close()
+    # A restarted process does not carry the garbage of the scheduler that saved the jobs.
+    gc.collect()
+
+    store = store_class(path)
+    scheduler = CalendarScheduler(store=store)
+    events = {}
+
+    def restore():
+        events.update(scheduler.restore())
+
+    restored = measure(restore)
+    store.close()
+    assert len(events) == size
+    return saved, restored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            for store_class in (SQLiteJobStore, FileJobStore):
+                saved, restored = bench(store_class, size, directory)
+                rows.append([size, store_class.__name__, f"{saved:.3f}", f"{restored:.3f}"])
+    print_table(["jobs", "store", "save, s", "restore, s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Next fire time cost of RRULE events.
+
+Re-arms RRULE events repeatedly, the way the scheduler does on every fire, and prints the
+average cost of one re-arm. The rule is parsed once and every event keeps its position
+in the rule, so the cost is amortized O(1): periods are expanded once, not on every fire.
+A COUNT rule is re-armed through its whole COUNT to show that it does not restart.
+
+    python benchmarks/bench_rrule.py
+"""
+
+import datetime
+import math
+
+from common import measure, print_table, rearm_arguments
+
+from calsched import CalendarScheduler
+
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR;BYHOUR=9,17",
+    "FREQ=MONTHLY;BYDAY=-1FR",
+    "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1",
+    "FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29",
+    "FREQ=MINUTELY;INTERVAL=15;BYHOUR=9,10,11,12,13,14,15,16,17",
+    "FREQ=DAILY;COUNT=100000",
+]
+
+
+def bench(event, count):
+    next_time = event.settings.next_time
+    done = []
+
+    def rearm():
+        run_time = event.settings.start_time
+        for i in range(count):
+            run_time = next_time(run_time, False)
+            if run_time == math.inf:  # The rule has ended.
+                done.append(i + 1)
+                return
+        done.append(count)
+    return measure(rearm) / done[0]
+
+
+def main():
+    args = rearm_arguments(__doc__)
+
+    scheduler = CalendarScheduler()
+    rows = []
+    for rule in RULES:
+        event = scheduler.enter_rrule_event(print, rule, start_time=args.start, tz=datetime.timezone.utc)
+        scheduler.cancel(event)
+        rows.append([rule, f"{bench(event, args.count) * 1e6:.2f}"])
+    print_table(["rule", "us/re-arm"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput of ShardedCalendarScheduler across worker counts.
+
+Every event fires --fires times with a CPU bound action, all within a short span of time.
+The "run_all" misfire policy makes a saturated scheduler run every occurrence late instead
+of skipping it, so the time from the first occurrence until run() returns shows how fast
+the schedulers get through the same work.
+
+    python benchmarks/bench_sharded.py
+"""
+
+import argparse
+import os
+import time
+
+from common import print_table
+
+from calsched import CalendarScheduler, ShardedCalendarScheduler
+
+
+def work(size, _job):
+    sum(range(size))
+
+
+def bench(scheduler, args):
+    start_time = time.time() + 0.5
+    for i in range(args.events):
+        scheduler.enter_every_millisecond_event(
+            action=work, action_args=(args.work, i), interval=10,
+            start_time=start_time, end_time=start_time + 0.01 * args.fires + 0.005,
+            misfire_policy="run_all"
+        )
+    scheduler.run()
+    return time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--fires", type=int, default=20)
+    parser.add_argument("--work", type=int, default=2000, help="size of the range summed by the action")
+    parser.add_argument("--workers", type=int, nargs="+")
+    args = parser.parse_args()
+    workers = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    total = args.events * args.fires
+    rows = []
+    elapsed = bench(CalendarScheduler(), args)
+    rows.append(["CalendarScheduler", "-", f"{elapsed:.2f}", f"{total / elapsed:.0f}"])
+    for count in workers:
+        scheduler = ShardedCalendarScheduler(workers=count)
+        elapsed = bench(scheduler, args)
+        scheduler.close()
+        rows.append(["ShardedCalendarScheduler", count, f"{elapsed:.2f}", f"{total / elapsed:.0f}"])
+    print_table(["scheduler", "workers", "run, s", "fires/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
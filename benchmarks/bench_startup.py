@@ -0,0 +1,70 @@
+"""
+Startup time: registering many events one by one and with a batch.
+
+The scheduler is already running in its own thread, as in an application that loads its
+schedules at startup. Every event is first due tomorrow, so nothing fires during the benchmark.
+
+    python benchmarks/bench_startup.py
+"""
+
+import argparse
+import datetime
+import gc
+import threading
+import time
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, HeapQueue, TimingWheelQueue
+
+
+def enter_events(target, size, events):
+    start_time = time.time() + 86400
+    for i in range(size):
+        events.append(target.enter_daily_event(
+            action=print, hour=i % 24, minute=i % 60, second=i % 59,
+            start_time=start_time, tz=datetime.timezone.utc
+        ))
+
+
+def bench(size, queue, use_batch):
+    scheduler = CalendarScheduler(queue=queue)
+    events = [scheduler.enter_yearly_event(action=print, start_time=time.time() + 86400)]
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    time.sleep(0.01)
+    gc.collect()
+
+    def enter_batch():
+        with scheduler.batch() as batch:
+            enter_events(batch, size, events)
+
+    if use_batch:
+        elapsed = measure(enter_batch)
+    else:
+        elapsed = measure(enter_events, scheduler, size, events)
+    for event in events:
+        scheduler.cancel(event)
+    thread.join()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        for name, queue_class in (("HeapQueue", HeapQueue), ("TimingWheelQueue", TimingWheelQueue)):
+            rows.append([
+                size,
+                name,
+                f"{bench(size, queue_class(), use_batch=False):.3f}",
+                f"{bench(size, queue_class(), use_batch=True):.3f}",
+            ])
+    print_table(["events", "queue", "one by one, s", "batch, s"], rows)
+
+
+if __name__ == "__main__":
+    main()
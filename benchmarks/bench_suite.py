@@ -0,0 +1,277 @@
+"""
+Regression suite: enter, cancel, dispatch and next_time cost of every event type.
+
+For each event type and number of events, measures on a virtual clock the average cost of
+entering an event, canceling it, dispatching one fire and computing the next fire time.
+Events get different parameters, so they fire at different times like real schedules.
+Prints a table, and with --json saves the results, so that runs of different releases
+can be compared with --compare.
+
+The suite is repeated in new processes (--repeat), and the median of each cost is shown.
+A cost is reported as a regression only if its median is slower than the baseline one by
+more than --threshold and the Mann-Whitney U test on the costs of the repeats finds the
+slowdown significant, so that the noise of a single run does not fail the comparison:
+
+    python benchmarks/bench_suite.py --json baseline.json
+    python benchmarks/bench_suite.py --sizes 1000 10000 100000 1000000 --compare baseline.json
+"""
+
+import argparse
+import datetime
+import functools
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+from importlib import metadata
+
+from common import measure, print_table
+
+from calsched import CalendarScheduler, SimulatedClock
+
+
+DAY = 86400
+UTC = datetime.timezone.utc
+
+# Name, enter method, parameters of the i-th event and the longest period in seconds.
+EVENT_TYPES = [
+    ("microsecond", "enter_every_microsecond_event", lambda i: {"interval": 100 + i % 900}, 0.001),
+    ("millisecond", "enter_every_millisecond_event", lambda i: {"interval": 100 + i % 900}, 1),
+    ("second", "enter_every_second_event", lambda i: {"interval": 1 + i % 60}, 60),
+    ("minute", "enter_every_minute_event", lambda i: {"second": i % 60}, 60),
+    ("hourly", "enter_hourly_event", lambda i: {"minute": i % 60, "second": i // 60 % 60, "tz": UTC}, 3600),
+    ("daily", "enter_daily_event", lambda i: {
+        "hour": i % 24, "minute": i // 24 % 60, "second": i // 1440 % 60, "tz": UTC
+    }, DAY),
+    ("weekly", "enter_weekly_event", lambda i: {
+        "weekday": i % 7, "hour": i // 7 % 24, "minute": i // 168 % 60, "tz": UTC
+    }, 7 * DAY),
+    ("monthly", "enter_monthly_event", lambda i: {
+        "day": 1 + i % 28, "hour": i // 28 % 24, "minute": i // 672 % 60, "tz": UTC
+    }, 31 * DAY),
+    ("yearly", "enter_yearly_event", lambda i: {
+        "month": 1 + i % 12, "day": 1 + i // 12 % 28, "hour": i // 336 % 24, "tz": UTC
+    }, 366 * DAY),
+    ("cron", "enter_cron_event", lambda i: {
+        "expression": f"{i % 60} {i // 60 % 24} * * {i // 1440 % 7}", "tz": UTC
+    }, 7 * DAY),
+    ("rrule", "enter_rrule_event", lambda i: {
+        "rule": f"FREQ=WEEKLY;BYDAY={('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')[i % 7]};BYHOUR={i // 7 % 24}",
+        "tz": UTC
+    }, 7 * DAY),
+    ("compound", "enter_compound_event", lambda i: {
+        "period": "daily", "hours": (i % 8, 8 + i % 8, 16 + i % 8), "minutes": (i // 8 % 60,), "tz": UTC
+    }, DAY),
+]
+
+METRICS = ("enter", "cancel", "dispatch", "next_time")
+# Measurements of fewer events are repeated in one process, so that each cost is taken
+# from about this many events: a measurement of a few milliseconds is too noisy.
+MIN_EVENTS = 10000
+
+
+def enter_events(scheduler, method, params, size, action, end_time=None):
+    enter = getattr(scheduler, method)
+    return [enter(action=action, start_time=0.0, end_time=end_time, **params(i)) for i in range(size)]
+
+
+def bench_enter_cancel(method, params, size):
+    clock = SimulatedClock()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock)
+    events = []
+    gc.collect()
+    enter_time = measure(lambda: events.extend(enter_events(scheduler, method, params, size, print)))
+
+    run_time = 1.7e9
+    next_time = measure(lambda: [event.settings.next_time(run_time, False) for event in events])
+
+    random.Random(size).shuffle(events)
+    gc.collect()
+    cancel_time = measure(lambda: [scheduler.cancel(event) for event in events])
+    return enter_time / size, cancel_time / size, next_time / size
+
+
+def bench_dispatch(method, params, size, period, fires):
+    clock = SimulatedClock()
+    scheduler = CalendarScheduler(timefunc=clock.time, sleep_controller=clock)
+    counter = itertools.count()
+    enter_events(scheduler, method, params, size, counter.__next__, end_time=period * fires)
+    gc.collect()
+    elapsed = measure(scheduler.run)
+    count = next(counter)
+    return elapsed / count, count
+
+
+def run_suite(args):
+    """
+    Measure every event type and size once.
+
+    :return: List of the results, with the costs in microseconds.
+    """
+    results = []
+    for size in args.sizes:
+        for name, method, params, period in EVENT_TYPES:
+            if args.events and name not in args.events:
+                continue
+            samples = []
+            for _ in range(max(1, MIN_EVENTS // size)):
+                enter, cancel, next_time = bench_enter_cancel(method, params, size)
+                dispatch, fires = bench_dispatch(method, params, size, period, args.fires)
+                samples.append({"enter": enter, "cancel": cancel, "dispatch": dispatch, "next_time": next_time})
+            results.append({
+                "event": name, "size": size, "fires": fires,
+                **{key: min(sample[key] for sample in samples) * 1e6 for key in METRICS}
+            })
+    return results
+
+
+def run_repeats(args):
+    """
+    Run the suite args.repeat times, each time in a new process.
+
+    The speed of the same code differs between processes more than between repeats in one
+    process, for example with the memory layout, so the repeats are made in new processes.
+
+    :return: List of the results with the median costs and the costs of every run in "samples".
+    """
+    command = [
+        sys.executable, os.path.abspath(__file__), "--worker", "--fires", str(args.fires),
+        "--sizes", *map(str, args.sizes)
+    ]
+    if args.events:
+        command += ["--events", *args.events]
+    runs = [
+        json.loads(subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout)
+        for _ in range(args.repeat)
+    ]
+    results = []
+    for items in zip(*runs):
+        samples = {key: [item[key] for item in items] for key in METRICS}
+        results.append({
+            "event": items[0]["event"], "size": items[0]["size"], "fires": items[0]["fires"],
+            **{key: statistics.median(samples[key]) for key in METRICS}, "samples": samples
+        })
+    return results
+
+
+def slower_p_value(new, old):
+    """
+    One-sided p-value of the Mann-Whitney U test for the new samples being slower than the old ones:
+    the probability that the U statistic is at least the observed one if both are from the same
+    distribution. Computed exactly, ties count as half.
+    """
+    observed = sum((a > b) + 0.5 * (a == b) for a in new for b in old)
+
+    @functools.lru_cache(maxsize=None)
+    def arrangements(n, m, u):
+        # Orderings of n new and m old samples in which new ones precede old ones in u pairs.
+        if u < 0:
+            return 0
+        if n == 0 or m == 0:
+            return int(u == 0)
+        return arrangements(n - 1, m, u - m) + arrangements(n, m - 1, u)
+
+    n, m = len(new), len(old)
+    return sum(arrangements(n, m, u) for u in range(math.ceil(observed), n * m + 1)) / math.comb(n + m, n)
+
+
+def source_version():
+    """
+    Version in pyproject.toml of the source tree, or None.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "pyproject.toml")
+    try:
+        with open(path, encoding="utf-8") as file:
+            match = re.search(r'^version\s*=\s*"([^"]+)"', file.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return match and match.group(1)
+
+
+def environment():
+    try:
+        version = metadata.version("calsched")
+    except metadata.PackageNotFoundError:
+        version = source_version()
+    return {"calsched": version, "python": platform.python_version(), "machine": platform.machine()}
+
+
+def compare(results, baseline, threshold, significance):
+    """
+    Compare the results with the baseline ones.
+
+    A cost is a regression if the ratio of its medians exceeds the threshold and the samples
+    of the run are slower than the baseline ones with the significance of the Mann-Whitney
+    U test. Baselines saved without samples are compared by the ratio only.
+
+    :return: Dictionary of the ratios to the baseline by (event, size, metric),
+             and the list of the regressions.
+    """
+    previous = {(item["event"], item["size"]): item for item in baseline["results"]}
+    ratios = {}
+    regressions = []
+    for item in results:
+        old = previous.get((item["event"], item["size"]))
+        if old is None:
+            continue
+        for key in METRICS:
+            ratio = item[key] / old[key]
+            ratios[item["event"], item["size"], key] = ratio
+            if ratio <= threshold:
+                continue
+            p_value = slower_p_value(item["samples"][key], old["samples"][key]) if "samples" in old else 0
+            if p_value < significance:
+                regressions.append(f"{item['event']} x{item['size']} {key}: {ratio:.2f}x, p={p_value:.3f}")
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--events", nargs="+", choices=[item[0] for item in EVENT_TYPES],
+                        help="event types to measure (default: all)")
+    parser.add_argument("--fires", type=int, default=3, help="fires of each event in the dispatch test")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the suite, each in a new process (default: 5)")
+    parser.add_argument("--json", help="file to save the results to")
+    parser.add_argument("--compare", help="results saved by an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio of the medians reported as a regression (default: 1.2)")
+    parser.add_argument("--significance", type=float, default=0.01,
+                        help="p-value below which a slowdown is not attributed to noise (default: 0.01)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_suite(args), sys.stdout)
+        return
+
+    results = run_repeats(args)
+    ratios, regressions = {}, []
+    header = ["event", "events", "enter us", "cancel us", "dispatch us/fire", "next_time us"]
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            ratios, regressions = compare(results, json.load(file), args.threshold, args.significance)
+
+    def cell(item, key):
+        ratio = ratios.get((item["event"], item["size"], key))
+        return f"{item[key]:.2f}" if ratio is None else f"{item[key]:.2f} ({ratio:.2f}x)"
+
+    print_table(header, [[item["event"], item["size"]] + [cell(item, key) for key in METRICS] for item in results])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2)
+    if regressions:
+        print("Regressions:", *regressions, sep="\n  ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import argparse
+import time
+
+
+def measure(func, *args):
+    """
+    Call func(*args) once and return the elapsed wall time in seconds.
+    """
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def measure_rearm(next_time, count, start):
+    """
+    Call next_time(run_time, False) count times, each time with the previous result, the way
+    the scheduler re-arms an event. Starts over from start every 100 calls.
+
+    :return: Average time of one call in seconds.
+    """
+    def rearm():
+        run_time = start
+        for i in range(count):
+            if i % 100 == 0:
+                run_time = start
+            run_time = next_time(run_time, False)
+    return measure(rearm) / count
+
+
+def rearm_arguments(description):
+    """
+    Parse the command line of a re-arm benchmark: --count of re-arms and --start time.
+    """
+    parser = argparse.ArgumentParser(description=description.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--start", type=float, default=1.7e9)
+    return parser.parse_args()
+
+
+def print_table(header, rows):
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
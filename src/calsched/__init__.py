@@ -7,4 +7,10 @@ with positional (args) and keyword (kwargs) arguments at the defined interval.
 Designed for integration into larger applications requiring basic recurring event management.
 """
 
-from .core import CalendarScheduler
+from .core import CalendarScheduler, BatchAction
+from .queues import HeapQueue, TimingWheelQueue
+from .aio import AsyncCalendarScheduler
+from .store import JobStore, SQLiteJobStore, FileJobStore
+from .sharded import ShardedCalendarScheduler
+from .leadership import Lease, SQLiteLease, FileLease
+from .simulation import SimulatedClock, SimulatedScheduler
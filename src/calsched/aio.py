@@ -0,0 +1,151 @@
+"""
+Calendar scheduler for asyncio applications.
+"""
+
+import asyncio
+import inspect
+import time
+
+from .base import BaseCalendarScheduler, _acquire, _release
+from .rules import Event, _sentinel
+
+
+class AsyncCalendarScheduler(BaseCalendarScheduler):
+    """
+    Calendar scheduler running on an asyncio event loop.
+
+    Has the same enter_*_event() methods as CalendarScheduler. Events are armed with
+    loop.call_at(), so no extra threads are used. Coroutine functions can be used as actions:
+    each call is started as a task.
+
+    The methods must be called from the event loop thread. Events entered before run()
+    are armed when run() starts.
+    """
+    def __init__(self, timefunc = time.time, spread=None):
+        """
+        Initialize the AsyncCalendarScheduler.
+
+        :param timefunc: Function to get the current time (default: time.time).
+        :param spread: Default spread window in seconds for all events (default: None, no spread).
+        """
+        self.timefunc = timefunc
+        self.spread = spread
+        self._loop = None
+        self._idle = None
+        self._error = None
+        self._handles = {}  # Loop timer -> (event_settings, next_time).
+        self._pending = {}  # id(event) -> (event_settings, next_time), before run().
+        self._tasks = set()
+
+    async def run(self):
+        """
+        Run all scheduled events until completion.
+        Completion means that all events have either been canceled or have reached their end_time,
+        and all started coroutine actions have finished.
+        An exception raised by an action stops run() and is raised from it.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Event()
+        self._error = None
+        pending, self._pending = self._pending, {}
+        for event_settings, next_time in pending.values():
+            self._schedule(event_settings, next_time)
+        self._check_idle()
+        await self._idle.wait()
+        self._idle = None
+        if self._error is not None:
+            self._disarm()
+            error, self._error = self._error, None
+            raise error
+
+    def cancel(self, event: Event):
+        """
+        Cancel a scheduled event.
+
+        :param event: The event instance returned by the enter_*() method.
+        """
+        with event.lock:
+            if event.canceled:
+                return
+            event.canceled = True
+            handle = event.internal_event
+            event.internal_event = None
+        if isinstance(handle, asyncio.TimerHandle):
+            if handle in self._handles:
+                handle.cancel()
+                del self._handles[handle]
+        elif handle is not None:
+            self._pending.pop(id(event), None)
+        self._check_idle()
+
+    def _push(self):
+        pass
+
+    def _schedule(self, event_settings, next_time):
+        if self._idle is None:
+            item = (event_settings, next_time)
+            self._pending[id(event_settings.event)] = item
+            event_settings.event.internal_event = item
+            return
+        when = self._loop.time() + (next_time + event_settings.jitter - self.timefunc())
+        handle = self._loop.call_at(when, self._fire, event_settings, next_time)
+        self._handles[handle] = (event_settings, next_time)
+        event_settings.event.internal_event = handle
+
+    def _disarm(self):
+        """
+        Cancel the loop timers when run() stops with an error, so that no action runs
+        after it has returned. The events are armed again by the next run().
+        """
+        handles, self._handles = self._handles, {}
+        for handle, item in handles.items():
+            handle.cancel()
+            self._pending[id(item[0].event)] = item
+            item[0].event.internal_event = item
+
+    def _fire(self, event_settings, event_time):
+        self._handles.pop(event_settings.event.internal_event, None)
+        try:
+            self._run_event(event_settings, event_time)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._stop(error)
+        self._check_idle()
+
+    def _run_action(self, event_settings, event_time=None):
+        max_concurrent = event_settings.max_concurrent
+        if max_concurrent is not None and not _acquire(event_settings):
+            return
+        event = event_settings.event
+        action_kwargs = {} if event_settings.action_kwargs is _sentinel else event_settings.action_kwargs
+        try:
+            result = event_settings.action(*event_settings.action_args, **action_kwargs)
+        except BaseException:
+            if max_concurrent is not None:
+                _release(event)
+            raise
+        if not inspect.isawaitable(result):
+            if max_concurrent is not None:
+                _release(event)
+            return
+
+        task = asyncio.ensure_future(result)
+        self._tasks.add(task)
+
+        def done(task):
+            self._tasks.discard(task)
+            if max_concurrent is not None:
+                _release(event)
+            if not task.cancelled() and task.exception() is not None:
+                self._stop(task.exception())
+            self._check_idle()
+        task.add_done_callback(done)
+
+    def _stop(self, error):
+        if self._error is None:
+            self._error = error
+        if self._idle is not None:
+            self._idle.set()
+
+    def _check_idle(self):
+        if self._idle is not None and not self._handles and not self._tasks:
+            self._idle.set()
@@ -0,0 +1,1000 @@
+"""
+Event API shared by the calendar schedulers: the enter_*_event() methods, re-arming
+of due events and previews of their fire times.
+"""
+
+import time
+import datetime
+import math
+
+from .metrics import Metrics
+from .rules import (
+    COMPOUND_PERIODS, MISFIRE_COALESCE, MISFIRE_POLICIES, MISFIRE_SKIP, NANOSECONDS_IN_SECOND,
+    SECONDS_IN_MINUTE, Event,
+    InternalCompoundEvent, InternalCronEvent, InternalDailyEvent, InternalEveryMicrosecondEvent,
+    InternalEveryMillisecondEvent, InternalEveryMinuteEvent, InternalEverySecondEvent,
+    InternalHourlyEvent, InternalMonthlyEvent, InternalRRuleEvent, InternalWeeklyEvent,
+    InternalYearlyEvent, _sentinel, _value_set, parse_rrule, compile_cron
+)
+
+
+def _valid_misfire(policy, grace_time, limit):
+    if policy not in MISFIRE_POLICIES:
+        return False
+    if grace_time is not None and grace_time < 0:
+        return False
+    return limit is None or limit >= 1
+
+
+def _acquire(event_settings):
+    event = event_settings.event
+    with event.lock:
+        if event.running >= event_settings.max_concurrent:
+            return False
+        event.running += 1
+        return True
+
+
+def _release(event):
+    with event.lock:
+        event.running -= 1
+
+
+class BaseCalendarScheduler:
+    """
+    Event API shared by the calendar schedulers.
+    Subclasses define timefunc and implement _schedule(), _run_action() and _push().
+
+    Options accepted by every enter_*_event() method:
+
+    :param max_concurrent: Maximum number of simultaneously running actions of the event
+                           (default: no limit). If the limit is reached, the occurrence is skipped.
+    :param misfire_policy: What to do with occurrences missed while the scheduler was late:
+                           "coalesce" (default) runs the action once for all of them,
+                           "skip" does not run them, nor an occurrence late by a whole period
+                           if there is no grace time, "run_all" runs each of them.
+    :param misfire_grace_time: An occurrence late by more than this many seconds is not run
+                               (default: no limit).
+    :param misfire_limit: For "run_all", maximum number of the most recent missed occurrences
+                          to run (default: no limit).
+    :param spread: Window in seconds to spread the fire times over (default: the scheduler spread).
+                   The event fires at a stable offset inside the window after each occurrence.
+                   Events that differ only in arguments that are not JSON serializable need
+                   a job_id to get their own offsets (see EventSettings.identity()).
+    :param job_id: Identifier of the job in the scheduler store (default: None, not stored).
+                   The method returns None if the action is not importable by its path
+                   or the arguments are not JSON serializable.
+    """
+    timefunc = staticmethod(time.time)
+    spread = None
+    store = None
+    leadership = None
+    metrics = None
+
+    def _schedule(self, event_settings, next_time):
+        raise NotImplementedError
+
+    def _run_action(self, event_settings, event_time=None):
+        raise NotImplementedError
+
+    def _push(self):
+        raise NotImplementedError
+
+    def _event_options(self, max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id):
+        """
+        Validate the options shared by the enter_*_event() methods.
+
+        :return: Keyword arguments for the event settings, or None if an option is invalid.
+        """
+        if max_concurrent is not None and max_concurrent < 1:
+            return None
+        if not _valid_misfire(misfire_policy, misfire_grace_time, misfire_limit):
+            return None
+        if spread is None:
+            spread = self.spread
+        elif spread < 0:
+            return None
+        return {
+            "max_concurrent": max_concurrent, "misfire_policy": misfire_policy,
+            "misfire_grace_time": misfire_grace_time, "misfire_limit": misfire_limit,
+            "spread": spread, "job_id": job_id
+        }
+
+    def _save_job(self, record):
+        self.store.save_many([record])
+
+    def _now_ns(self):
+        """
+        Current time as float seconds and integer nanoseconds, or None for the nanoseconds
+        if the clock is not the default one. The default clock is read with time.time_ns(),
+        so the start of sub-second events is exact.
+        """
+        if self.timefunc is time.time:
+            now_ns = time.time_ns()
+            return now_ns / NANOSECONDS_IN_SECOND, now_ns
+        return self.timefunc(), None
+
+    def _add_event(self, event_settings):
+        """
+        Save the job of a new event and schedule its first occurrence.
+
+        :return: The event, or None if the job cannot be stored.
+        """
+        if event_settings.job_id is not None and self.store is not None:
+            try:
+                record = self.store.record(event_settings)
+            except ValueError:
+                return None
+            self._save_job(record)
+        self._enter_event(event_settings, self.timefunc, event_settings.start_time)
+        self._push()
+        return event_settings.event
+
+    def _run_event(self, event_settings, event_time):
+        if self._rearm(event_settings, event_time):
+            self._run_action(event_settings, event_time)
+
+    def _rearm(self, event_settings, event_time, schedule=None):
+        """
+        Schedule the next occurrence of a due event.
+
+        :return: True if the action of the due occurrence should run.
+        """
+        event = event_settings.event
+        if event.canceled:
+            return False
+        with event.lock:
+            if event.canceled:
+                return False
+            late = self._enter_event(event_settings, self.timefunc, event_time, schedule)
+        if self.store is not None and event_settings.job_id is not None:
+            self.store.fired(event_settings.job_id, event_time)
+        lateness = self.timefunc() - (event_time + event_settings.jitter)
+        if self.metrics is not None:
+            self._record_fire(event, lateness)
+        grace_time = event_settings.misfire_grace_time
+        if grace_time is not None and lateness > grace_time:
+            return False
+        # Without a grace time, "skip" drops an occurrence late by a whole period.
+        if grace_time is None and late and event_settings.misfire_policy == MISFIRE_SKIP:
+            return False
+        # A standby replica keeps re-arming its events, but does not run them.
+        return self.leadership is None or self.leadership.is_leader()
+
+    def _record_fire(self, event, lateness):
+        if event.metrics is None:
+            event.metrics = Metrics()
+        event.metrics.record_fire(lateness)
+        self.metrics.record_fire(lateness)
+
+    def _record_run(self, events, duration):
+        for event in events:
+            if event.metrics is None:
+                event.metrics = Metrics()
+            event.metrics.record_run(duration)
+        self.metrics.record_run(duration)
+
+    def occurrences(self, event: Event, start: float = None, end: float = None):
+        """
+        Generate the fire times of an event without running the scheduler.
+        Times are computed lazily one at a time, so memory use does not depend on the range.
+
+        :param event: The event instance returned by the enter_*() method.
+        :param start: Skip occurrences before this POSIX timestamp (default: the event start_time).
+        :param end: Stop before this POSIX timestamp (default: the event end_time).
+                    If neither is set, the generator is infinite.
+        :return: Generator of POSIX timestamps in increasing order.
+        """
+        event_settings = event.settings
+        jitter = event_settings.jitter
+        if event_settings.end_time is not None:
+            end = event_settings.end_time if end is None else min(end, event_settings.end_time)
+        run_time = event_settings.next_time(event_settings.start_time, inclusive=True)
+        while end is None or run_time + jitter < end:
+            if start is None or run_time + jitter >= start:
+                yield run_time + jitter
+            run_time = event_settings.next_time(run_time, inclusive=False)
+
+    def _enter_event(self, event_settings, timefunc, run_time, schedule=None):
+        """
+        Schedule the next occurrence after run_time.
+
+        :param schedule: Function used instead of _schedule() (default: None).
+        :return: True if the occurrence after run_time is already due.
+        """
+        event_settings.event.settings = event_settings
+        next_time = event_settings.next_time(run_time)
+
+        current_time = timefunc() - event_settings.jitter
+        missed = current_time >= next_time
+        if missed:
+            next_time = event_settings.catch_up(next_time, current_time)
+
+        end_time = event_settings.end_time
+        if end_time is not None and next_time + event_settings.jitter >= end_time:
+            return missed
+
+        (schedule or self._schedule)(event_settings, next_time)
+        return missed
+
+    # The enter_*_event() methods take the rule fields and the options as explicit
+    # parameters, which pylint counts as local variables.
+    def enter_every_millisecond_event(  # pylint: disable=too-many-locals
+            self,
+            action,
+            action_args=(),
+            action_kwargs=_sentinel,
+            interval: int = 100,
+            start_time: float = None,
+            end_time: float = None,
+            max_concurrent: int = None,
+            misfire_policy: str = MISFIRE_COALESCE,
+            misfire_grace_time: float = None,
+            misfire_limit: int = None,
+            spread: float = None,
+            job_id: str = None,
+    ):
+        """
+        Schedule an event to run every N milliseconds.
+        Occurrences are computed in integer nanoseconds from the start time, so they keep
+        their phase exactly however long the event runs.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in milliseconds (default: 100).
+                         Very small intervals do not make practical sense.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if 1 > interval:
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        start_ns = None
+        if start_time is None:
+            start_time, start_ns = self._now_ns()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        second_event = InternalEveryMillisecondEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, interval_ns=round(interval * 1_000_000), start_ns=start_ns,
+            **options
+        )
+
+        return self._add_event(second_event)
+
+    def enter_every_microsecond_event(  # pylint: disable=too-many-locals
+            self,
+            action,
+            action_args=(),
+            action_kwargs=_sentinel,
+            interval: int = 1000,
+            start_time: float = None,
+            end_time: float = None,
+            max_concurrent: int = None,
+            misfire_policy: str = MISFIRE_COALESCE,
+            misfire_grace_time: float = None,
+            misfire_limit: int = None,
+            spread: float = None,
+            job_id: str = None,
+    ):
+        """
+        Schedule an event to run every N microseconds, for high-rate sampling.
+        The occurrences keep their phase exactly, see enter_every_millisecond_event().
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in microseconds (default: 1000). Must be an integer.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if not isinstance(interval, int) or 1 > interval:
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        start_ns = None
+        if start_time is None:
+            start_time, start_ns = self._now_ns()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        microsecond_event = InternalEveryMicrosecondEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, interval_ns=interval * 1000, start_ns=start_ns,
+            **options
+        )
+
+        return self._add_event(microsecond_event)
+
+    def enter_every_second_event(  # pylint: disable=too-many-locals
+            self,
+            action,
+            action_args=(),
+            action_kwargs=_sentinel,
+            interval: int = 1,
+            start_time: float = None,
+            end_time: float = None,
+            max_concurrent: int = None,
+            misfire_policy: str = MISFIRE_COALESCE,
+            misfire_grace_time: float = None,
+            misfire_limit: int = None,
+            spread: float = None,
+            job_id: str = None,
+    ):
+        """
+        Schedule an event to run every N seconds.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in seconds (default: 1).
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if 1 > interval:
+            return None
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        second_event = InternalEverySecondEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, interval=interval,
+            **options
+        )
+
+        return self._add_event(second_event)
+
+    def enter_every_minute_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run every N minutes at a specific second.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in minutes (default: 1).
+        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (1 > interval) or not (0 <= second <= 59):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        minute_event = InternalEveryMinuteEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, interval=SECONDS_IN_MINUTE*interval, second=second,
+            **options
+        )
+
+        return self._add_event(minute_event)
+
+    def enter_hourly_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        minute: int = 0,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run hourly (or every N hours) at a specific minute and second.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in hours (default: 1).
+        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
+        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (1 > interval) or not (0 <= minute <= 59) or not (0 <= second <= 59):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        hourly_event = InternalHourlyEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval, second, minute,
+            **options
+        )
+
+        return self._add_event(hourly_event)
+
+    def enter_daily_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        hour: int = 0,
+        minute: int = 0,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run daily (or every N days) at a specific time.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in days (default: 1).
+        :param hour: Hour of the day to run the event (default: 0). Range: 0-23.
+        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
+        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (
+            (1 > interval) or not (0 <= hour <= 23) or not (0 <= minute <= 59)
+            or not (0 <= second <= 59)
+        ):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        daily_event = InternalDailyEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval, second, minute, hour,
+            **options
+        )
+
+        return self._add_event(daily_event)
+
+    def enter_weekly_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        weekday: int = 0,
+        hour: int = 0,
+        minute: int = 0,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run weekly (or every N weeks) on a specific day and time.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in weeks (default: 1).
+        :param weekday: Day of the week as an integer, where Monday is 0, and Sunday is 6
+                        Default: 0 (Monday).
+        :param hour: Hour of the day to run the event (default: 0). Range: 0-23.
+        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
+        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (
+            (1 > interval) or not (0 <= hour <= 23) or not (0 <= minute <= 59)
+            or not (0 <= second <= 59) or not (0 <= weekday <= 6)
+        ):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        daily_event = InternalWeeklyEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval, second, minute, hour, weekday=weekday,
+            **options
+        )
+
+        return self._add_event(daily_event)
+
+    def enter_monthly_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        day: int = 1,
+        hour: int = 0,
+        minute: int = 0,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run monthly (or every N months) on a specific day and time.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in months (default: 1).
+        :param day: Day of the month to run the event (default: 1). Should be in range 1-31.
+        :param hour: Hour of the day to run the event (default: 0). Should be in range 0-23.
+        :param minute: Minute of the hour to run the event (default: 0). Should be in range 0-59.
+        :param second: Second of the minute to run the event (default: 0). Should be in range 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (
+            (interval < 1) or not (1 <= day <= 31) or not (0 <= hour <= 23)
+            or not (0 <= minute <= 59) or not (0 <= second <= 59)
+        ):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        monthly_event = InternalMonthlyEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval, second, minute, hour, day=day,
+            **options
+        )
+
+        return self._add_event(monthly_event)
+
+    def enter_yearly_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        month: int = 1,
+        day: int = 1,
+        hour: int = 0,
+        minute: int = 0,
+        second: int = 0,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run yearly (or every N years) on a specific month, day, and time.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in years (default: 1).
+        :param month: Month to run the event (default: 1). Should be in the range 1-12.
+        :param day: Day of the month to run the event (default: 1). Should be in the range 1-31.
+        :param hour: Hour of the day to run the event (default: 0). Should be in the range 0-23.
+        :param minute: Minute of the hour to run the event (default: 0).
+                       Should be in the range 0-59.
+        :param second: Second of the minute to run the event (default: 0).
+                       Should be in the range 0-59.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        if (
+            (interval < 1) or not (1 <= month <= 12) or not (1 <= day <= 31)
+            or not (0 <= hour <= 23) or not (0 <= minute <= 59) or not (0 <= second <= 59)
+        ):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        yearly_event = InternalYearlyEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval, second, minute, hour, day=day, month=month,
+            **options
+        )
+
+        return self._add_event(yearly_event)
+
+    def enter_cron_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        expression: str,
+        action_args=(),
+        action_kwargs=_sentinel,
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run at the minutes matching a cron expression.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param expression: Cron expression with the minute, hour, day of month, month and
+                           day of week fields, such as "*/15 9-17 * * mon-fri", or a macro
+                           such as "@daily". See the calsched.cron module for the syntax.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid
+                 or the expression can never fire.
+        """
+        try:
+            compile_cron(expression)
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        cron_event = InternalCronEvent(
+            event, action, action_args, action_kwargs, start_time, end_time, tz,
+            expression=expression, **options
+        )
+
+        return self._add_event(cron_event)
+
+    def enter_rrule_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        rule: str,
+        action_args=(),
+        action_kwargs=_sentinel,
+        exdates=(),
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run at the occurrences of an RFC 5545 recurrence rule.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute, when the event is triggered.
+        :param rule: Recurrence rule, such as "FREQ=MONTHLY;BYDAY=-1FR;BYHOUR=18" for the last
+                     Friday of every month at 18:00. See the calsched.rrule module for the
+                     supported parts. Parts that are not set are taken from start_time.
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param exdates: POSIX timestamps of the occurrences to exclude (EXDATE).
+                        Excluded occurrences still count for COUNT.
+        :param start_time: Start of the rule (DTSTART) as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        try:
+            parse_rrule(rule)
+            exdates = tuple(sorted(float(exdate) for exdate in exdates))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        rrule_event = InternalRRuleEvent(
+            event, action, action_args, action_kwargs, start_time,
+            # The rule returns math.inf when it runs out of occurrences, which ends the event.
+            math.inf if end_time is None else end_time, tz,
+            rule=rule, exdates=exdates, **options
+        )
+
+        return self._add_event(rrule_event)
+
+    def enter_compound_event(  # pylint: disable=too-many-locals
+        self,
+        action,
+        period: str,
+        action_args=(),
+        action_kwargs=_sentinel,
+        interval: int = 1,
+        hours=(0,),
+        minutes=(0,),
+        seconds=(0,),
+        weekdays=(0,),
+        days=(1,),
+        start_time: float = None,
+        end_time: float = None,
+        tz: datetime.tzinfo = None,
+        max_concurrent: int = None,
+        misfire_policy: str = MISFIRE_COALESCE,
+        misfire_grace_time: float = None,
+        misfire_limit: int = None,
+        spread: float = None,
+        job_id: str = None
+    ):
+        """
+        Schedule an event to run at several times of each hour, day, week or month.
+        The event takes a single place in the queue whatever the number of times.
+
+        For max_concurrent, misfire_*, spread and job_id, see BaseCalendarScheduler.
+
+        :param action: The function to execute when the event is triggered.
+        :param period: "hourly", "daily", "weekly" or "monthly".
+        :param action_args: Positional arguments for the action.
+        :param action_kwargs: Keyword arguments for the action.
+        :param interval: Interval in periods (default: 1).
+        :param hours: Hours of the day to run the event (default: 0). Range: 0-23.
+                      Not used by hourly events.
+        :param minutes: Minutes of the hour to run the event (default: 0). Range: 0-59.
+        :param seconds: Seconds of the minute to run the event (default: 0). Range: 0-59.
+        :param weekdays: For weekly events, days of the week, where Monday is 0, and Sunday is 6
+                         (default: 0).
+        :param days: For monthly events, days of the month (default: 1). Range: 1-31.
+                     Days beyond the end of a month fall on its last day.
+        :param start_time: Start time for the event as a POSIX timestamp (default: now).
+                           Should be the value returned by time.time() or datetime.timestamp().
+        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
+                         Should be the value returned by time.time() or datetime.timestamp().
+        :param tz: Time zone information for the event. None means local time.
+                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
+        :return: The scheduled event object, or None if parameters are invalid.
+        """
+        hours = _value_set(hours, 0, 23)
+        minutes = _value_set(minutes, 0, 59)
+        seconds = _value_set(seconds, 0, 59)
+        weekdays = _value_set(weekdays, 0, 6)
+        days = _value_set(days, 1, 31)
+        if (
+            period not in COMPOUND_PERIODS or (1 > interval)
+            or None in (hours, minutes, seconds, weekdays, days)
+        ):
+            return None
+
+        options = self._event_options(
+            max_concurrent, misfire_policy, misfire_grace_time, misfire_limit, spread, job_id
+        )
+        if options is None:
+            return None
+
+        event = Event()
+
+        if start_time is None:
+            start_time = self.timefunc()
+
+        if end_time is not None and start_time >= end_time:
+            return None
+
+        compound_event = InternalCompoundEvent(
+            event, action, action_args, action_kwargs,
+            start_time, end_time, tz, interval,
+            period=period, hours=hours, minutes=minutes, seconds=seconds,
+            weekdays=weekdays, days=days, **options
+        )
+
+        return self._add_event(compound_event)
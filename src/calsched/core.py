@@ -3,210 +3,46 @@ Calendar Scheduler core module.
 This module provides the core functionality for scheduling recurring events.
 """
 
-import sched
 import time
-import datetime
-import calendar
-from dataclasses import dataclass
 import threading
-from typing import Optional, Any
+import types
 
+from .base import BaseCalendarScheduler, _acquire, _release
+from .metrics import Metrics
+from .queues import HeapQueue
+from .rules import MISFIRE_SKIP, Event, _sentinel
 
-SECONDS_IN_MINUTE = 60
 
-@dataclass()
-class Event:
-    """
-    Represents a scheduled event in the calendar scheduler.
-    Contains synchronization primitives and internal state for event management.
-    Can be used to cancel the event using the CalendarScheduler.cancel() method.
-    """
-    lock: threading.Lock = threading.Lock()
-    internal_event: Optional[sched.Event] = None
-    canceled: bool = False
-
-
-@dataclass(frozen=True)
-class EventSettings:
-    event: Event
-    action: Any
-    action_args: Any # tuple
-    action_kwargs: Any # dict
-    start_time: float
-    end_time: Optional[float]
-    tz: Optional[datetime.tzinfo] = None
-    interval: int = 1
-    second: int = 0
-    minute: int = 0
-    hour: int = 0
-    weekday: int = 0
-    day: int = 1
-    month: int = 1
-
-
-@dataclass(frozen=True)
-class InternalEveryMillisecondEvent(EventSettings):
-    interval_ms: float = None
-
-    def next_time(self, run_time):
-        return run_time + self.interval_ms
-
-
-@dataclass(frozen=True)
-class InternalEverySecondEvent(EventSettings):
-    def next_time(self, run_time):
-        target_time = run_time // 1 # remove milliseconds
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= run_time:
-                past_event = True
-        elif target_time < run_time:
-            past_event = True
-        if past_event:
-            target_time += self.interval
-        return target_time
-
-
-@dataclass(frozen=True)
-class InternalEveryMinuteEvent(EventSettings):
-    def next_time(self, run_time):
-        minute_start = run_time // SECONDS_IN_MINUTE * SECONDS_IN_MINUTE
-        target_time = minute_start + self.second
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= run_time:
-                past_event = True
-        elif target_time < run_time:
-            past_event = True
-        if past_event:
-            target_time += self.interval
-        return target_time
-
-
-@dataclass(frozen=True)
-class InternalHourlyEvent(EventSettings):
-    def next_time(self, run_time):
-        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
-        target_time = dt_base_time.replace(minute=self.minute, second=self.second, microsecond=0)
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= dt_base_time:
-                past_event = True
-        elif target_time < dt_base_time:
-            past_event = True
-        if past_event:
-            target_time += datetime.timedelta(hours=self.interval)
-        return target_time.timestamp()
-
-
-@dataclass(frozen=True)
-class InternalDailyEvent(EventSettings):
-    def next_time(self, run_time):
-        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
-        target_time = dt_base_time.replace(
-            hour=self.hour, minute=self.minute, second=self.second, microsecond=0
-        )
+HOOKS = ("before_rearm", "before_action", "after_action", "on_exception", "on_cancel")
 
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= dt_base_time:
-                past_event = True
-        elif target_time < dt_base_time:
-            past_event = True
-        if past_event:
-            target_time += datetime.timedelta(days=self.interval)
-        return target_time.timestamp()
-
-
-@dataclass(frozen=True)
-class InternalWeeklyEvent(EventSettings):
-    def next_time(self, run_time):
-        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
-        days_ahead = (self.weekday - dt_base_time.weekday()) % 7
-        target_date = dt_base_time + datetime.timedelta(days=days_ahead)
-        target_time = target_date.replace(
-            hour=self.hour, minute=self.minute, second=self.second, microsecond=0
-        )
 
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= dt_base_time:
-                past_event = True
-        elif target_time < dt_base_time:
-            past_event = True
-        if past_event:
-            target_time += datetime.timedelta(weeks=self.interval)
-        return target_time.timestamp()
-
-
-@dataclass(frozen=True)
-class InternalMonthlyEvent(EventSettings):
-    def next_time(self, run_time):
-        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
-        last_day = calendar.monthrange(dt_base_time.year, dt_base_time.month)[1]
-        limit_day = min(self.day, last_day)
-        target_time = dt_base_time.replace(
-            day=limit_day, hour=self.hour, minute=self.minute, second=self.second, microsecond=0
-        )
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= dt_base_time:
-                past_event = True
-        elif target_time < dt_base_time:
-            past_event = True
-        if past_event:
-            next_month = dt_base_time.month + self.interval
-            next_year = dt_base_time.year + (next_month - 1) // 12
-            next_month = (next_month - 1) % 12 + 1
-            last_day = calendar.monthrange(next_year, next_month)[1]
-            limit_day = min(self.day, last_day)
-            target_time = datetime.datetime(
-                next_year, next_month, limit_day, self.hour, self.minute, self.second,
-                tzinfo=self.tz
-            )
-        return target_time.timestamp()
-
-
-@dataclass(frozen=True)
-class InternalYearlyEvent(EventSettings):
-    def next_time(self, run_time):
-        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
-        last_day = calendar.monthrange(dt_base_time.year, self.month)[1]
-        limit_day = min(self.day, last_day)
-        target_time = dt_base_time.replace(
-            month=self.month, day=limit_day, hour=self.hour,
-            minute=self.minute, second=self.second, microsecond=0
-        )
-        past_event = False
-        if self.event.internal_event is not None:
-            if target_time <= dt_base_time:
-                past_event = True
-        elif target_time < dt_base_time:
-            past_event = True
-        if past_event:
-            next_year = dt_base_time.year + self.interval
-            last_day = calendar.monthrange(next_year, self.month)[1]
-            limit_day = min(self.day, last_day)
-            target_time = datetime.datetime(
-                next_year, self.month, limit_day, self.hour, self. minute, self.second,
-                tzinfo=self.tz
-            )
-        return target_time.timestamp()
+class BatchAction:  # pylint: disable=too-few-public-methods
+    """
+    Action which handles several occurrences in one call. A callable wrapper: calling it
+    is its only operation.
 
+    Wraps a function that takes a list of (args, kwargs) tuples. When events with BatchAction
+    of the same function are due at the same instant, CalendarScheduler calls the function
+    once with the arguments of all of them. Otherwise it is called with a list of one item.
 
-_sentinel = object()
+        @BatchAction
+        def send(calls):
+            for args, kwargs in calls:
+                ...
 
+        scheduler.enter_every_minute_event(action=send, action_args=("a",))
+        scheduler.enter_every_minute_event(action=send, action_args=("b",))
+    """
+    def __init__(self, func):
+        """
+        Initialize the BatchAction.
 
-def _action_runner(enter_func, event_settings, cal_scheduler, event_time):
-    if event_settings.action_kwargs is _sentinel:
-        action_kwargs = {}
-    else:
-        action_kwargs = event_settings.action_kwargs
-    with event_settings.event.lock:
-        if event_settings.event.canceled:
-            return
-        enter_func(event_settings, cal_scheduler, event_time)
-    event_settings.action(*event_settings.action_args, **action_kwargs)
+        :param func: Function taking a list of (args, kwargs) tuples.
+        """
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        return self.func([(args, kwargs)])
 
 
 class DefaultSleepController:
@@ -229,21 +65,114 @@ class DefaultSleepController:
         self._terminate_sleep.set()
 
 
-class CalendarScheduler:
+class EventBatch(BaseCalendarScheduler):
+    """
+    Collects events and adds them to a CalendarScheduler at once.
+    Returned by CalendarScheduler.batch(). Has the same enter_*_event() methods.
+    """
+    def __init__(self, timefunc, commit, spread=None, store=None):
+        self.timefunc = timefunc
+        self.spread = spread
+        self.store = store
+        self._commit = commit
+        self._items = []
+        self._records = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        items, self._items = self._items, []
+        records, self._records = self._records, []
+        if exc_type is not None:
+            for event_settings, _ in items:
+                event_settings.event.canceled = True
+            return
+        if records:
+            self.store.save_many(records)
+        self._commit(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _save_job(self, record):
+        self._records.append(record)
+
+    def _schedule(self, event_settings, next_time):
+        self._items.append((event_settings, next_time))
+
+    def _run_action(self, event_settings, event_time=None):
+        # The batch only collects events. They run in the scheduler they are committed to.
+        raise RuntimeError("events of a batch are run by its scheduler")
+
+    def _push(self):
+        pass
+
+
+def _skip_missed(event_settings, next_time, current_time):
+    """
+    Get the first occurrence of a "skip" job that was not missed while the process was down.
+    An occurrence that passed is missed however late it is, unless it is within the grace time.
+    """
+    limit = current_time - event_settings.jitter
+    if event_settings.misfire_grace_time is not None:
+        limit -= event_settings.misfire_grace_time
+    if next_time < limit:
+        return event_settings.skip_to(next_time, limit)
+    return next_time
+
+
+class CalendarScheduler(BaseCalendarScheduler):
     """
     Calendar scheduler.
     """
-    def __init__(self, timefunc = time.time, sleep_controller=DefaultSleepController()):
+    def __init__(
+            self,
+            timefunc = time.time,
+            sleep_controller=None,
+            queue=None,
+            executor=None,
+            spread=None,
+            store=None,
+            leadership=None,
+            metrics=False,
+    ):
         """
         Initialize the CalendarScheduler.
 
         :param timefunc: Function to get the current time (default: time.time).
         :param sleep_controller: Object handling sleep and interrupt logic
                                  (default: DefaultSleepController).
+        :param queue: Event queue backend (default: HeapQueue).
+                      Use TimingWheelQueue for O(1) insert and cancel with many events.
+        :param executor: concurrent.futures executor for actions (default: None).
+                         None means actions run in the thread that called run().
+                         With an executor, the scheduler thread only re-arms events and
+                         submits actions, so a long action does not delay other events.
+                         For a ProcessPoolExecutor, actions and arguments must be picklable.
+        :param spread: Default spread window in seconds for all events (default: None, no spread).
+                       Events that cluster on the same time, such as second=0, fire at stable
+                       offsets inside the window instead.
+        :param store: JobStore for events entered with a job_id (default: None).
+                      See restore().
+        :param leadership: Lease, such as SQLiteLease, shared by replicas running the same events
+                           (default: None). Actions run only while this scheduler holds the lease.
+        :param metrics: Record lateness, action duration and fire counts for stats() (default: False).
         """
         self.timefunc = timefunc
-        self.sleep_controller = sleep_controller
-        self._scheduler = sched.scheduler(timefunc, self.sleep_controller.sleep)
+        self.spread = spread
+        self.store = store
+        self.leadership = leadership
+        self.metrics = Metrics() if metrics else None
+        self._wakeups = 0
+        self._hooks = {name: [] for name in HOOKS}
+        self._hooks_installed = False
+        # Bound once: every queue entry refers to it, and a bound method per entry costs memory.
+        self._run_event = self._run_event
+        self.sleep_controller = DefaultSleepController() if sleep_controller is None else sleep_controller
+        self._queue = HeapQueue() if queue is None else queue
+        self._lock = threading.RLock()
+        self.executor = executor
 
     def run(self):
         """
@@ -251,460 +180,411 @@ class CalendarScheduler:
         Completion means that all events have either been canceled or have reached their end_time.
         This method blocks the calling thread until all scheduled events have been processed.
         """
-        self._scheduler.run()
-
-    def cancel(self, event: Event):
+        timefunc = self.timefunc
+        delayfunc = self.sleep_controller.sleep
+        store = self.store
+        while True:
+            with self._lock:
+                now = timefunc()
+                entry = self._queue.peek(now)
+                if entry is None:
+                    break
+                delay = entry.time > now
+                if delay:
+                    self._queue.compact()
+                else:
+                    entries = self._queue.pop_group()
+            if delay:
+                if store is not None:
+                    store.flush()
+                self._wakeups += 1
+                delayfunc(entry.time - now)
+            elif len(entries) == 1:
+                entry.action(*entry.argument)
+                delayfunc(0)  # Let other threads run.
+            else:
+                self._run_group(entries)
+                delayfunc(0)
+        if store is not None:
+            store.flush()
+
+    def batch(self):
         """
-        Cancel a scheduled event.
+        Create a batch for adding many events at once.
 
-        :param event: The event instance returned by the enter_*() method.
-        """
-        cancelled = False
-        with event.lock:
-            if event.canceled:
-                return
-            event.canceled = True
-            if event.internal_event:
-                try:
-                    self._scheduler.cancel(event.internal_event)
-                    cancelled = True
-                except ValueError:
-                    pass
-            event.internal_event = None
-        if cancelled:
-            self._push()
+        Events entered into the batch are validated and get their first fire time immediately,
+        but are added to the queue in one operation when the with block exits,
+        and the scheduler thread is woken up only once. If the block raises,
+        the collected events are discarded.
 
-    def _sleep(self, seconds):
-        self.sleep_controller.sleep(seconds)
-
-    def _push(self):
-        self.sleep_controller.interrupt()
-
-    def _enter_event(self, event_settings, timefunc, run_time):
-        next_time = event_settings.next_time(run_time)
-
-        current_time = timefunc()
-        if current_time > next_time:
-            next_time = event_settings.next_time(current_time)
-
-        if event_settings.end_time is not None and next_time >= event_settings.end_time:
-            return
-
-        event_settings.event.internal_event = self._scheduler.enterabs(
-            time=next_time,
-            priority=0,
-            action=_action_runner,
-            argument=(self._enter_event, event_settings, timefunc, next_time)
-        )
+            with scheduler.batch() as batch:
+                for job in jobs:
+                    batch.enter_daily_event(action=job.run, hour=job.hour)
 
-    def enter_every_millisecond_event(
-            self,
-            action,
-            action_args=(),
-            action_kwargs=_sentinel,
-            interval: int = 100,
-            start_time: float = None,
-            end_time: float = None
-    ):
+        :return: EventBatch with the same enter_*_event() methods as the scheduler.
         """
-        Schedule an event to run every N milliseconds.
+        return EventBatch(self.timefunc, self._schedule_many, self.spread, self.store)
 
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in milliseconds (default: 100).
-                         Very small intervals do not make practical sense.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :return: The scheduled event object, or None if parameters are invalid.
+    def restore(self):
         """
-        if 1 > interval:
-            return None
-
-        event = Event()
-
-        if start_time is None:
-            start_time = self.timefunc()
-
-        if end_time is not None and start_time >= end_time:
-            return None
-
-        second_event = InternalEveryMillisecondEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, interval_ms=interval/1000
-        )
+        Enter all jobs of the store, for example after a restart.
 
-        self._enter_event(second_event, self.timefunc, start_time)
+        A job that has fired before continues after its last fire time. If occurrences were
+        missed while the process was down, the job runs according to its misfire policy:
+        once for "coalesce", every missed occurrence for "run_all", and missed occurrences
+        are dropped for "skip". Jobs that have reached their end_time are removed from the store.
+        Jobs whose action cannot be imported are left in the store and not entered.
 
-        self._push()
-        return event
-
-    def enter_every_second_event(
-            self,
-            action,
-            action_args=(),
-            action_kwargs=_sentinel,
-            interval: int = 1,
-            start_time: float = None,
-            end_time: float = None
-    ):
+        :return: Dictionary of the entered events by job_id.
         """
-        Schedule an event to run every N seconds.
-
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in seconds (default: 1).
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :return: The scheduled event object, or None if parameters are invalid.
+        events = self._enter_records()
+        for job_id, event in list(events.items()):
+            if event.internal_event is None:
+                self.store.remove(job_id)
+                del events[job_id]
+        return events
+
+    def _enter_records(self):
         """
-        if 1 > interval:
-            return None
-        event = Event()
-
-        if start_time is None:
-            start_time = self.timefunc()
-
-        if end_time is not None and start_time >= end_time:
-            return None
-
-        second_event = InternalEverySecondEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, interval=interval
-        )
-
-        self._enter_event(second_event, self.timefunc, start_time)
+        Enter the jobs of the store and push them into the queue in one step.
 
-        self._push()
-        return event
+        A job resumes with the first occurrence after its last fire time, or with its first
+        occurrence if it has not fired yet. If that is in the past, the job is due at once and
+        the occurrences missed while the process was down are handled by its misfire policy.
+        A "skip" job resumes with its first occurrence that has not passed.
 
-    def enter_every_minute_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None
-    ):
+        :return: Dictionary of the entered events by job_id.
         """
-        Schedule an event to run every N minutes at a specific second.
-
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in minutes (default: 1).
-        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :return: The scheduled event object, or None if parameters are invalid.
+        records = self.store.load()
+        current_time = self.timefunc()
+        events = {}
+        items = []
+        # The records are released as they are entered, so that the collections triggered
+        # by the new events do not traverse them.
+        records.reverse()
+        while records:
+            record = records.pop()
+            try:
+                event_settings = record.event_settings(self.spread)
+            except ValueError:
+                continue
+            event = event_settings.event
+            event.settings = event_settings
+            events[record.job_id] = event
+            if record.last_fire_time is None:
+                next_time = event_settings.next_time(event_settings.start_time, inclusive=True)
+            else:
+                next_time = event_settings.next_time(record.last_fire_time, inclusive=False)
+            if event_settings.misfire_policy == MISFIRE_SKIP:
+                next_time = _skip_missed(event_settings, next_time, current_time)
+            end_time = event_settings.end_time
+            if end_time is None or next_time + event_settings.jitter < end_time:
+                items.append((event_settings, next_time))
+        self._schedule_many(items)
+        return events
+
+    def stats(self, event: Event = None):
         """
-        if (1 > interval) or not (0 <= second <= 59):
-            return None
+        Get a snapshot of the metrics. Requires metrics=True.
 
-        event = Event()
-
-        if start_time is None:
-            start_time = self.timefunc()
-
-        if end_time is not None and start_time >= end_time:
-            return None
-
-        minute_event = InternalEveryMinuteEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, interval=SECONDS_IN_MINUTE*interval, second=second
-        )
+        The snapshot has the fires and runs counters, and lateness and duration histograms
+        (see Histogram.snapshot()). The snapshot of the scheduler also has the current
+        queue_depth and the number of wakeups from sleep.
+        With an executor, the duration is measured from the submission of the action.
 
-        self._enter_event(minute_event, self.timefunc, start_time)
-
-        self._push()
-        return event
-
-    def enter_hourly_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        minute: int = 0,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None,
-        tz: datetime.tzinfo = None
-    ):
+        :param event: Event to get the metrics of (default: None, the whole scheduler).
+        :return: Dictionary, or None if metrics are disabled or the event has not fired yet.
         """
-        Schedule an event to run hourly (or every N hours) at a specific minute and second.
-
-        :param action: The function to execute when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in hours (default: 1).
-        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
-        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :param tz: Time zone information for the event. None means local time.
-                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
-        :return: The scheduled event object, or None if parameters are invalid.
-        """
-        if (1 > interval) or not (0 <= minute <= 59) or not (0 <= second <= 59):
-            return None
-
-        event = Event()
-
-        if start_time is None:
-            start_time = self.timefunc()
-
-        if end_time is not None and start_time >= end_time:
+        if self.metrics is None:
             return None
-
-        hourly_event = InternalHourlyEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, tz, interval, second, minute
-        )
-
-        self._enter_event(hourly_event, self.timefunc, start_time)
-
-        self._push()
-        return event
-
-    def enter_daily_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        hour: int = 0,
-        minute: int = 0,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None,
-        tz: datetime.tzinfo = None
-    ):
+        if event is not None:
+            return None if event.metrics is None else event.metrics.snapshot()
+        with self._lock:
+            queue_depth = len(self._queue)
+        result = self.metrics.snapshot()
+        result["queue_depth"] = queue_depth
+        result["wakeups"] = self._wakeups
+        return result
+
+    def add_hook(self, name, hook):
         """
-        Schedule an event to run daily (or every N days) at a specific time.
-
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in days (default: 1).
-        :param hour: Hour of the day to run the event (default: 0). Range: 0-23.
-        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
-        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :param tz: Time zone information for the event. None means local time.
-                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
-        :return: The scheduled event object, or None if parameters are invalid.
-        """
-        if (
-            (1 > interval) or not (0 <= hour <= 23) or not (0 <= minute <= 59)
-            or not (0 <= second <= 59)
-        ):
-            return None
+        Register a function called around the dispatch of every occurrence.
 
-        event = Event()
+        Hooks are called as hook(event, scheduled_time, actual_time), where scheduled_time is
+        the fire time of the occurrence including the spread offset, and actual_time is the
+        current time. on_exception hooks get the exception as the fourth argument.
 
-        if start_time is None:
-            start_time = self.timefunc()
+        - before_rearm: an occurrence is due, before its event is re-armed.
+        - before_action: before the action runs. Not called for occurrences skipped by
+          the misfire policy, leadership or max_concurrent.
+        - after_action: the action has returned. With an executor, when it completes.
+        - on_exception: the action has raised.
+        - on_cancel: the event is canceled. scheduled_time is its next fire time, or None.
 
-        if end_time is not None and start_time >= end_time:
-            return None
+        While no dispatch hooks are registered, the dispatch code does not check for them,
+        so hooks cost nothing until they are used.
 
-        daily_event = InternalDailyEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, tz, interval, second, minute, hour
-        )
-
-        self._enter_event(daily_event, self.timefunc, start_time)
-
-        self._push()
-        return event
-
-    def enter_weekly_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        weekday: int = 0,
-        hour: int = 0,
-        minute: int = 0,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None,
-        tz: datetime.tzinfo = None
-    ):
+        :param name: One of HOOKS.
+        :param hook: Function to call.
+        :raises ValueError: If the name is not in HOOKS.
         """
-        Schedule an event to run weekly (or every N weeks) on a specific day and time.
-
-        :param action: The function to execute when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in weeks (default: 1).
-        :param weekday: Day of the week as an integer, where Monday is 0, and Sunday is 6
-                        Default: 0 (Monday).
-        :param hour: Hour of the day to run the event (default: 0). Range: 0-23.
-        :param minute: Minute of the hour to run the event (default: 0). Range: 0-59.
-        :param second: Second of the minute to run the event (default: 0). Range: 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :param tz: Time zone information for the event. None means local time.
-                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
-        :return: The scheduled event object, or None if parameters are invalid.
-        """
-        if (
-            (1 > interval) or not (0 <= hour <= 23) or not (0 <= minute <= 59)
-            or not (0 <= second <= 59) or not (0 <= weekday <= 6)
-        ):
-            return None
-
-        event = Event()
+        if name not in self._hooks:
+            raise ValueError(f"unknown hook {name!r}")
+        self._hooks[name].append(hook)
+        self._install_hooks()
 
-        if start_time is None:
-            start_time = self.timefunc()
+    def remove_hook(self, name, hook):
+        """
+        Unregister a function added by add_hook().
 
-        if end_time is not None and start_time >= end_time:
-            return None
+        :raises ValueError: If the hook is not registered.
+        """
+        if name not in self._hooks:
+            raise ValueError(f"unknown hook {name!r}")
+        self._hooks[name].remove(hook)
+        self._install_hooks()
 
-        daily_event = InternalWeeklyEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, tz, interval, second, minute, hour, weekday=weekday
-        )
+    def cancel(self, event: Event):
+        """
+        Cancel a scheduled event.
 
-        self._enter_event(daily_event, self.timefunc, start_time)
-
-        self._push()
-        return event
-
-    def enter_monthly_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        day: int = 1,
-        hour: int = 0,
-        minute: int = 0,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None,
-        tz: datetime.tzinfo = None
-    ):
+        :param event: The event instance returned by the enter_*() method.
         """
-        Schedule an event to run monthly (or every N months) on a specific day and time.
-
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in months (default: 1).
-        :param day: Day of the month to run the event (default: 1). Should be in range 1-31.
-        :param hour: Hour of the day to run the event (default: 0). Should be in range 0-23.
-        :param minute: Minute of the hour to run the event (default: 0). Should be in range 0-59.
-        :param second: Second of the minute to run the event (default: 0). Should be in range 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :param tz: Time zone information for the event. None means local time.
-                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
-        :return: The scheduled event object, or None if parameters are invalid.
-        """
-        if (
-            (interval < 1) or not (1 <= day <= 31) or not (0 <= hour <= 23)
-            or not (0 <= minute <= 59) or not (0 <= second <= 59)
-        ):
-            return None
+        if event.canceled:
+            return
+        cancelled = False
+        next_time = None
+        with event.lock:
+            if event.canceled:
+                return
+            event.canceled = True
+            if event.internal_event:
+                with self._lock:
+                    cancelled = self._queue.cancel(event.internal_event)
+                if cancelled:
+                    next_time = event.internal_event.time
+            event.internal_event = None
+        self._call_hooks("on_cancel", event, next_time)
+        if self.store is not None and event.settings is not None and event.settings.job_id is not None:
+            self.store.remove(event.settings.job_id)
+        if cancelled:
+            self._push()
 
-        event = Event()
+    def _run_group(self, entries):
+        """
+        Run all entries due at the same instant: re-arm the events with one queue operation,
+        then run the actions. Events with the same BatchAction are passed to it in one call.
+        If actions raise, the other actions of the group still run before the first exception
+        propagates: their events are already re-armed, so they would not run otherwise.
+        """
+        pending = []
+
+        def schedule(event_settings, next_time):
+            pending.append((event_settings, next_time))
+
+        ready = [entry.argument for entry in entries if self._rearm(*entry.argument, schedule)]
+        self._schedule_many(pending, push=False)
+
+        # Keyed by the wrapped function: copies of a BatchAction, such as unpickled ones, share it.
+        batches = {}
+        for argument in ready:
+            if isinstance(argument[0].action, BatchAction):
+                batches.setdefault(id(argument[0].action.func), []).append(argument)
+        error = None
+        for argument in ready:
+            action = argument[0].action
+            try:
+                if not isinstance(action, BatchAction):
+                    self._run_action(*argument)
+                elif batches[id(action.func)]:
+                    items = batches[id(action.func)]
+                    batches[id(action.func)] = None
+                    self._run_batch(action, items)
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if error is None:
+                    error = exception
+        if error is not None:
+            raise error
+
+    def _run_batch(self, action, items):
+        """
+        Call a BatchAction once for several due occurrences.
 
-        if start_time is None:
-            start_time = self.timefunc()
+        :param items: List of (event_settings, event_time) tuples.
+        :return: Future if an executor is used, True if the action ran, False if all
+                 occurrences were skipped by max_concurrent.
+        """
+        started = [
+            item for item in items
+            if item[0].max_concurrent is None or _acquire(item[0])
+        ]
+        if not started:
+            return False
+        return self._start_batch(action, started)
+
+    def _start_batch(self, action, items):
+        """
+        Call a BatchAction for occurrences whose max_concurrent slots are acquired.
+        """
+        calls = []
+        events = []
+        acquired = []
+        for event_settings, _ in items:
+            events.append(event_settings.event)
+            if event_settings.max_concurrent is not None:
+                acquired.append(event_settings.event)
+            if event_settings.action_kwargs is _sentinel:
+                calls.append((event_settings.action_args, {}))
+            else:
+                calls.append((event_settings.action_args, event_settings.action_kwargs))
+
+        def release(_=None):
+            for event in acquired:
+                _release(event)
+
+        started = None if self.metrics is None else time.perf_counter()
+        if self.executor is None:
+            try:
+                action.func(calls)
+            finally:
+                release()
+                if started is not None:
+                    self._record_run(events, time.perf_counter() - started)
+            return True
+
+        future = self.executor.submit(action.func, calls)
+        if acquired:
+            future.add_done_callback(release)
+        if started is not None:
+            future.add_done_callback(lambda _: self._record_run(events, time.perf_counter() - started))
+        return future
+
+    def _run_action(self, event_settings, event_time=None):
+        """
+        Run the action of a due occurrence.
 
-        if end_time is not None and start_time >= end_time:
-            return None
+        :return: Future if an executor is used, True if the action ran, False if the
+                 occurrence was skipped by max_concurrent.
+        """
+        if event_settings.max_concurrent is not None and not _acquire(event_settings):
+            return False
+        return self._start_action(event_settings, event_time)
 
-        monthly_event = InternalMonthlyEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, tz, interval, second, minute, hour, day=day
+    def _start_action(self, event_settings, event_time):  # pylint: disable=unused-argument
+        """
+        Run the action of an occurrence whose max_concurrent slot is acquired.
+        """
+        if event_settings.action_kwargs is _sentinel:
+            action_kwargs = {}
+        else:
+            action_kwargs = event_settings.action_kwargs
+        event = event_settings.event
+        max_concurrent = event_settings.max_concurrent
+
+        started = None if self.metrics is None else time.perf_counter()
+        if self.executor is None:
+            try:
+                event_settings.action(*event_settings.action_args, **action_kwargs)
+            finally:
+                if max_concurrent is not None:
+                    _release(event)
+                if started is not None:
+                    self._record_run((event,), time.perf_counter() - started)
+            return True
+
+        future = self.executor.submit(
+            event_settings.action, *event_settings.action_args, **action_kwargs
         )
+        if max_concurrent is not None:
+            future.add_done_callback(lambda _: _release(event))
+        if started is not None:
+            future.add_done_callback(lambda _: self._record_run((event,), time.perf_counter() - started))
+        return future
 
-        self._enter_event(monthly_event, self.timefunc, start_time)
-
-        self._push()
-        return event
-
-    def enter_yearly_event(
-        self,
-        action,
-        action_args=(),
-        action_kwargs=_sentinel,
-        interval: int = 1,
-        month: int = 1,
-        day: int = 1,
-        hour: int = 0,
-        minute: int = 0,
-        second: int = 0,
-        start_time: float = None,
-        end_time: float = None,
-        tz: datetime.tzinfo = None
-    ):
+    def _install_hooks(self):
         """
-        Schedule an event to run yearly (or every N years) on a specific month, day, and time.
-
-        :param action: The function to execute, when the event is triggered.
-        :param action_args: Positional arguments for the action.
-        :param action_kwargs: Keyword arguments for the action.
-        :param interval: Interval in years (default: 1).
-        :param month: Month to run the event (default: 1). Should be in the range 1-12.
-        :param day: Day of the month to run the event (default: 1). Should be in the range 1-31.
-        :param hour: Hour of the day to run the event (default: 0). Should be in the range 0-23.
-        :param minute: Minute of the hour to run the event (default: 0).
-                       Should be in the range 0-59.
-        :param second: Second of the minute to run the event (default: 0).
-                       Should be in the range 0-59.
-        :param start_time: Start time for the event as a POSIX timestamp (default: now).
-                           Should be the value returned by time.time() or datetime.timestamp().
-        :param end_time: End time for the event as a POSIX timestamp (default: no limit).
-                         Should be the value returned by time.time() or datetime.timestamp().
-        :param tz: Time zone information for the event. None means local time.
-                   Otherwise, should be an instance of tzinfo. For UTC, use datetime.timezone.utc.
-        :return: The scheduled event object, or None if parameters are invalid.
-        """
-        if (
-            (interval < 1) or not (1 <= month <= 12) or not (1 <= day <= 31)
-            or not (0 <= hour <= 23) or not (0 <= minute <= 59) or not (0 <= second <= 59)
-        ):
-            return None
-
-        event = Event()
+        Switch the dispatch methods to the versions calling hooks, or back.
+        The instance attributes are replaced rather than deleted, and __dict__ is not read:
+        either would make every attribute lookup on the scheduler slower.
+        """
+        dispatch_hooks = any(hooks for name, hooks in self._hooks.items() if name != "on_cancel")
+        if dispatch_hooks == self._hooks_installed:
+            return
+        self._hooks_installed = dispatch_hooks
+        for name in ("_rearm", "_start_action", "_start_batch"):
+            if dispatch_hooks:
+                setattr(self, name, getattr(self, name + "_with_hooks"))
+            else:
+                setattr(self, name, types.MethodType(getattr(type(self), name), self))
+
+    def _call_hooks(self, name, event, scheduled_time, *args):
+        hooks = self._hooks[name]
+        if hooks:
+            actual_time = self.timefunc()
+            for hook in hooks:
+                hook(event, scheduled_time, actual_time, *args)
+
+    def _rearm_with_hooks(self, event_settings, event_time, schedule=None):
+        if not event_settings.event.canceled:
+            self._call_hooks("before_rearm", event_settings.event, event_time + event_settings.jitter)
+        return type(self)._rearm(self, event_settings, event_time, schedule)
+
+    def _start_action_with_hooks(self, event_settings, event_time):
+        items = [(event_settings.event, event_time + event_settings.jitter)]
+        return self._dispatch_with_hooks(items, type(self)._start_action, event_settings, event_time)
+
+    def _start_batch_with_hooks(self, action, items):
+        hook_items = [(event_settings.event, event_time + event_settings.jitter) for event_settings, event_time in items]
+        return self._dispatch_with_hooks(hook_items, type(self)._start_batch, action, items)
+
+    def _dispatch_with_hooks(self, items, run, *args):
+        """
+        Call run(self, *args) between the action hooks of the (event, scheduled_time) items.
+        """
+        for event, scheduled_time in items:
+            self._call_hooks("before_action", event, scheduled_time)
+        try:
+            result = run(self, *args)
+        except Exception as error:
+            self._finish_hooks(items, error)
+            raise
+        if result is True:
+            self._finish_hooks(items, None)
+        else:
+            result.add_done_callback(
+                lambda future: future.cancelled() or self._finish_hooks(items, future.exception())
+            )
+        return result
 
-        if start_time is None:
-            start_time = self.timefunc()
+    def _finish_hooks(self, items, error):
+        for event, scheduled_time in items:
+            if error is None:
+                self._call_hooks("after_action", event, scheduled_time)
+            else:
+                self._call_hooks("on_exception", event, scheduled_time, error)
 
-        if end_time is not None and start_time >= end_time:
-            return None
+    def _sleep(self, seconds):
+        self.sleep_controller.sleep(seconds)
 
-        yearly_event = InternalYearlyEvent(
-            event, action, action_args, action_kwargs,
-            start_time, end_time, tz, interval, second, minute, hour, day=day, month=month
-        )
+    def _push(self):
+        self.sleep_controller.interrupt()
 
-        self._enter_event(yearly_event, self.timefunc, start_time)
+    def _schedule(self, event_settings, next_time):
+        with self._lock:
+            event_settings.event.internal_event = self._queue.push(
+                next_time + event_settings.jitter, self._run_event, (event_settings, next_time)
+            )
 
-        self._push()
-        return event
+    def _schedule_many(self, items, push=True):
+        items = [item for item in items if not item[0].event.canceled]
+        if not items:
+            return
+        with self._lock:
+            # The (event_settings, next_time) item is the argument of _run_event() as is.
+            entries = self._queue.push_many(
+                (item[1] + item[0].jitter, self._run_event, item) for item in items
+            )
+            for (event_settings, _), entry in zip(items, entries):
+                event_settings.event.internal_event = entry
+        if push:
+            self._push()
@@ -0,0 +1,192 @@
+"""
+Cron expressions compiled into bitsets.
+
+An expression has five fields: minute, hour, day of month, month and day of week.
+Each field is compiled once into an integer with one bit per allowed value, so finding
+the next allowed value of a field is a shift and a lowest set bit lookup. The next fire
+time is found by jumping field by field: to the next allowed month, then day, hour and
+minute, restarting from the next month, day or hour when a field has no value left.
+Its cost does not depend on how sparse the expression is.
+
+Fields support "*", numbers, ranges "1-5", steps "*/15", "10-50/20" and "5/10", lists
+"1,15,30", month names "jan"-"dec" and weekday names "sun"-"sat". Day of week is 0-7,
+where both 0 and 7 are Sunday. As in Vixie cron, if both day of month and day of week
+are restricted (do not start with "*"), a day matches if either of them does.
+The macros @yearly, @annually, @monthly, @weekly, @daily, @midnight and @hourly are accepted.
+"""
+
+import calendar
+import datetime
+import functools
+
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+MINUTES_IN_DAY = 1440
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+_WEEKDAY_NAMES = {name: number for number, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))}
+
+# Maximum number of days in each month, with February of a leap year.
+_MAX_DAYS = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _next_bit(bits, start):
+    """
+    Get the lowest set bit of bits at or above start, or None.
+    """
+    rest = bits >> start
+    if not rest:
+        return None
+    return start + (rest & -rest).bit_length() - 1
+
+
+def _parse_field(text, low, high, names=None):
+    """
+    Compile one field into a bitset of the allowed values.
+
+    :raises ValueError: If the field is malformed or a value is out of range.
+    """
+    def value(item):
+        item = item.lower()
+        if names is not None and item in names:
+            return names[item]
+        if not item.isdigit():
+            raise ValueError(f"invalid cron value {item!r}")
+        return int(item)
+
+    bits = 0
+    for part in text.split(","):
+        part, slash, step = part.partition("/")
+        if slash and (not step.isdigit() or int(step) == 0):
+            raise ValueError(f"invalid cron step in {text!r}")
+        step = int(step) if slash else None
+        if part == "*":
+            first, last = low, high
+        elif "-" in part:
+            first, _, last = part.partition("-")
+            first, last = value(first), value(last)
+        else:
+            first = value(part)
+            last = high if step else first
+        if not low <= first <= last <= high:
+            raise ValueError(f"cron value out of range in {text!r}")
+        for number in range(first, last + 1, step or 1):
+            bits |= 1 << number
+    return bits
+
+
+@functools.lru_cache(maxsize=4096)
+def _month_info(year, month):
+    """
+    :return: Tuple of the cron weekday (0 is Sunday) of the first day of the month
+             and the bitset of its days (bits 1 to the number of days).
+    """
+    weekday, days = calendar.monthrange(year, month)
+    return (weekday + 1) % 7, (1 << (days + 1)) - 2
+
+
+class CronExpression:
+    """
+    Compiled cron expression. Use compile_cron() to share instances of the same expression.
+    """
+    __slots__ = ("text", "minutes", "hours", "days", "months", "weekdays", "_weekday_days", "_any_day")
+
+    def __init__(self, text: str):
+        """
+        Compile an expression.
+
+        :param text: Cron expression, such as "*/15 9-17 * * mon-fri".
+        :raises ValueError: If the expression is malformed or can never fire.
+        """
+        self.text = text
+        fields = MACROS.get(text.strip().lower(), text).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression must have 5 fields: {text!r}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12, _MONTH_NAMES)
+        weekdays = _parse_field(fields[4], 0, 7, _WEEKDAY_NAMES)
+        self.weekdays = (weekdays | weekdays >> 7) & 0x7F  # 7 is Sunday too.
+        day_restricted = not fields[2].startswith("*")
+        weekday_restricted = not fields[4].startswith("*")
+
+        # Days of a month matching the day of week, for each weekday of the first day.
+        self._weekday_days = tuple(
+            sum(1 << day for day in range(1, 32) if self.weekdays >> (first + day - 1) % 7 & 1)
+            for first in range(7)
+        )
+        # A day matches if it is in days or, when _any_day is set, in _weekday_days.
+        self._any_day = weekday_restricted
+        if weekday_restricted and not day_restricted:
+            self.days = 0
+        if not self._any_day and not any(
+            self.months >> month & 1 and _next_bit(self.days, 1) <= _MAX_DAYS[month] for month in range(1, 13)
+        ):
+            raise ValueError(f"cron expression never fires: {text!r}")
+
+    def __repr__(self):
+        return f"CronExpression({self.text!r})"
+
+    def _month_days(self, year, month):
+        first, month_days = _month_info(year, month)
+        if self._any_day:
+            return (self.days | self._weekday_days[first]) & month_days
+        return self.days & month_days
+
+    def next_minute(self, minute_index: int):
+        """
+        Get the first matching minute at or after minute_index.
+
+        :param minute_index: Wall clock time in minutes since 1970-01-01 00:00.
+        :return: Wall clock time in minutes since 1970-01-01 00:00.
+        """
+        days, minute_of_day = divmod(minute_index, MINUTES_IN_DAY)
+        date = datetime.date.fromordinal(days + EPOCH_ORDINAL)
+        year, month, day = date.year, date.month, date.day
+        hour, minute = divmod(minute_of_day, 60)
+        while True:
+            next_month = _next_bit(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            next_day = _next_bit(self._month_days(year, month), day)
+            if next_day is None:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+            next_hour = _next_bit(self.hours, hour)
+            if next_hour is None:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+            next_minute = _next_bit(self.minutes, minute)
+            if next_minute is None:
+                hour, minute = hour + 1, 0
+                continue
+            days = datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL
+            return days * MINUTES_IN_DAY + hour * 60 + next_minute
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_cron(text: str):
+    """
+    Compile a cron expression, reusing the result for the same text.
+
+    :raises ValueError: If the expression is malformed or can never fire.
+    """
+    return CronExpression(text)
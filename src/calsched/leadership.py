@@ -0,0 +1,188 @@
+"""
+Leases for running the same schedule on several replicas with only one of them active.
+
+A lease is held by one node at a time for lease_time seconds and is renewed while the node
+keeps dispatching. If the leader stops, another node takes over once the lease expires.
+Pass a lease as the leadership parameter of CalendarScheduler: all replicas keep their
+queues up to date, but only the leader runs actions.
+
+The backends here coordinate processes on one machine.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class Lease:
+    """
+    Base class of the leases.
+    Subclasses implement _try_acquire() and release().
+
+    is_leader() is called on every fire, so it touches the storage only when the lease
+    is due for renewal (after a third of lease_time) and, on a standby node, at most once
+    per retry_interval.
+    """
+    def __init__(self, lease_time: float = 10.0, node_id: str = None, retry_interval: float = None,
+                 timefunc=time.time):
+        """
+        Initialize the Lease.
+
+        :param lease_time: Time in seconds for which the lease is held without renewal (default: 10).
+                           A standby node takes over at most lease_time + retry_interval
+                           after the leader stops.
+        :param node_id: Unique name of this node (default: host name, process ID and a random suffix).
+        :param retry_interval: How often a standby node tries to take the lease in seconds
+                               (default: a quarter of lease_time).
+        :param timefunc: Function to get the current time (default: time.time).
+                         All nodes must use the same clock.
+        """
+        self.lease_time = lease_time
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.retry_interval = lease_time / 4 if retry_interval is None else retry_interval
+        self.timefunc = timefunc
+        self._lock = threading.Lock()
+        self._renew_at = None
+        self._retry_at = None
+
+    def is_leader(self):
+        """
+        Check that this node holds the lease, acquiring or renewing it if needed.
+        """
+        now = self.timefunc()
+        renew_at = self._renew_at
+        if renew_at is not None and now < renew_at:
+            return True
+        if renew_at is None and self._retry_at is not None and now < self._retry_at:
+            return False
+        with self._lock:
+            try:
+                held = self._try_acquire(now, now + self.lease_time)
+            except (OSError, sqlite3.Error, ValueError):
+                held = False
+            if held:
+                self._renew_at = now + self.lease_time / 3
+            else:
+                self._renew_at = None
+                self._retry_at = now + self.retry_interval
+        return held
+
+    def release(self):
+        """
+        Give up the lease if this node holds it, so that another node takes over at once.
+        """
+        raise NotImplementedError
+
+    def _try_acquire(self, now, expires):
+        """
+        Take the lease until expires if it is free, expired or already held by this node.
+
+        :return: True if this node holds the lease.
+        """
+        raise NotImplementedError
+
+
+class SQLiteLease(Lease):
+    """
+    Lease stored in an SQLite database.
+    """
+    def __init__(self, path, name: str = "calsched", **kwargs):
+        """
+        Initialize the SQLiteLease.
+
+        :param path: Path of the database file shared by the nodes.
+        :param name: Name of the lease, so that one database can hold several (default: "calsched").
+        :param kwargs: Parameters of Lease.
+        """
+        super().__init__(**kwargs)
+        self._name = name
+        self._connection = sqlite3.connect(path, timeout=self.lease_time / 4, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS calsched_leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def release(self):
+        with self._lock:
+            self._renew_at = None
+            self._connection.execute(
+                "DELETE FROM calsched_leases WHERE name = ? AND owner = ?", (self._name, self.node_id)
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def _try_acquire(self, now, expires):
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT owner, expires FROM calsched_leases WHERE name = ?", (self._name,)
+            ).fetchone()
+            held = row is None or row[0] == self.node_id or row[1] <= now
+            if held:
+                connection.execute(
+                    "INSERT OR REPLACE INTO calsched_leases (name, owner, expires) VALUES (?, ?, ?)",
+                    (self._name, self.node_id, expires)
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return held
+
+
+class FileLease(Lease):
+    """
+    Lease stored in a file guarded by an exclusive flock(). Not available on Windows.
+    """
+    def __init__(self, path, **kwargs):
+        """
+        Initialize the FileLease.
+
+        :param path: Path of the lease file shared by the nodes. It is created if it does not exist.
+        :param kwargs: Parameters of Lease.
+        """
+        if fcntl is None:
+            raise ImportError("FileLease requires fcntl, use SQLiteLease on this platform")
+        super().__init__(**kwargs)
+        self._path = path
+
+    def release(self):
+        with self._lock:
+            self._renew_at = None
+            self._update(lambda owner, _: None if owner == self.node_id else False)
+
+    def _try_acquire(self, now, expires):
+        def update(owner, owner_expires):
+            if owner is None or owner == self.node_id or owner_expires <= now:
+                return {"owner": self.node_id, "expires": expires}
+            return False
+        return self._update(update) is not False
+
+    def _update(self, update):
+        """
+        Read the lease and replace it with update(owner, expires) under the file lock.
+        update() returns the new content, None to clear the lease, or False to keep it.
+        """
+        with open(self._path, "a+", encoding="utf-8") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)  # Released when the file is closed.
+            file.seek(0)
+            text = file.read()
+            lease = json.loads(text) if text else {"owner": None, "expires": 0.0}
+            content = update(lease["owner"], lease["expires"])
+            if content is not False:
+                file.truncate(0)
+                if content is not None:
+                    file.write(json.dumps(content))
+                file.flush()
+            return content
@@ -0,0 +1,98 @@
+"""
+Fixed-bucket counters of the scheduler performance.
+
+Recording a value costs one binary search over the bucket bounds and a few additions.
+Counters are updated without locks: values recorded from executor threads at the same
+moment may be lost, which is acceptable for monitoring.
+"""
+
+import bisect
+
+
+# Upper bounds of the histogram buckets in seconds: 1 us to 100 s in 1-2-5 steps.
+# Larger values go to the last, unbounded bucket.
+BUCKETS = tuple(round(mantissa * 10.0 ** exponent, 6) for exponent in range(-6, 2) for mantissa in (1, 2, 5)) + (100.0,)
+
+
+class Histogram:
+    """
+    Distribution of durations in seconds.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction):
+        """
+        Get the upper bound of the bucket holding the given fraction of the values.
+
+        :param fraction: Number from 0 to 1, such as 0.99.
+        :return: Bucket bound in seconds, the maximum for the last bucket, or None if empty.
+        """
+        if self.count == 0:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        :return: Dictionary with count, sum, max, p50, p90 and p99 in seconds, and buckets:
+                 a list of (upper bound, count) pairs with None as the last bound.
+        """
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": list(zip(BUCKETS + (None,), self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Counters of one event or of the whole scheduler.
+
+    fires counts occurrences taken from the queue, runs counts actions started. They differ
+    when occurrences are skipped by the misfire policy, max_concurrent or leadership.
+    Lateness is the delay from the scheduled time to the dispatch.
+    """
+    __slots__ = ("fires", "runs", "lateness", "duration")
+
+    def __init__(self):
+        self.fires = 0
+        self.runs = 0
+        self.lateness = Histogram()
+        self.duration = Histogram()
+
+    def record_fire(self, lateness):
+        self.fires += 1
+        self.lateness.record(max(lateness, 0.0))
+
+    def record_run(self, duration):
+        self.runs += 1
+        self.duration.record(duration)
+
+    def snapshot(self):
+        return {
+            "fires": self.fires,
+            "runs": self.runs,
+            "lateness": self.lateness.snapshot(),
+            "duration": self.duration.snapshot(),
+        }
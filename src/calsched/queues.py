@@ -0,0 +1,384 @@
+"""
+Event queue backends for the calendar scheduler.
+
+A queue stores scheduled entries ordered by time. It is not thread-safe by itself:
+CalendarScheduler guards every call with its own lock.
+"""
+
+import heapq
+import itertools
+
+
+class QueueEntry:  # pylint: disable=too-few-public-methods
+    """
+    A single scheduled call stored in a queue. A plain record with slots: there is one
+    for every scheduled occurrence.
+    Entries are ordered by time, entries with equal time are ordered by insertion.
+    The level attribute is None when the entry is not in a queue.
+    """
+    __slots__ = ("time", "sequence", "action", "argument", "level", "index")
+
+    def __init__(self, time, sequence, action, argument):
+        self.time = time
+        self.sequence = sequence
+        self.action = action
+        self.argument = argument
+        self.level = None
+        self.index = None
+
+
+class HeapQueue:
+    """
+    Binary heap queue, the same structure as used by the standard sched module.
+    Insert costs O(log n). Cancel costs O(1): canceled entries are left in the heap as
+    tombstones and skipped when they reach the top. compact() removes them all at once.
+    """
+    def __init__(self, compact_threshold: int = 1024):
+        """
+        Initialize the HeapQueue.
+
+        :param compact_threshold: Minimum number of tombstones before compact() rebuilds
+                                  the heap (default: 1024). The heap is also rebuilt only
+                                  when tombstones make up at least half of it.
+        """
+        self._heap = []
+        self._sequence = itertools.count()
+        self._dead = 0
+        self._compact_threshold = compact_threshold
+
+    def __len__(self):
+        return len(self._heap) - self._dead
+
+    @property
+    def tombstones(self):
+        """
+        Number of canceled entries still in the heap.
+        """
+        return self._dead
+
+    def push(self, time, action, argument):
+        """
+        Add an entry to the queue.
+
+        :param time: Time of the entry as a POSIX timestamp.
+        :param action: Function to call when the entry is due.
+        :param argument: Tuple of positional arguments for the action.
+        :return: The queue entry, which can be passed to cancel().
+        """
+        entry = QueueEntry(time, next(self._sequence), action, argument)
+        entry.level = 0
+        heapq.heappush(self._heap, (time, entry.sequence, entry))
+        return entry
+
+    def push_many(self, items):
+        """
+        Add several entries to the queue at once.
+        A large batch is merged with a single heapify instead of one push per entry.
+
+        :param items: Iterable of (time, action, argument) tuples.
+        :return: List of queue entries in the order of items.
+        """
+        entries = []
+        for time, action, argument in items:
+            entry = QueueEntry(time, next(self._sequence), action, argument)
+            entry.level = 0
+            entries.append(entry)
+        if len(entries) > len(self._heap):
+            self._heap.extend((entry.time, entry.sequence, entry) for entry in entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, (entry.time, entry.sequence, entry))
+        return entries
+
+    def cancel(self, entry):
+        """
+        Remove an entry from the queue.
+
+        :param entry: The entry returned by push().
+        :return: True if the entry was removed, False if it is no longer in the queue.
+        """
+        if entry.level is None:
+            return False
+        entry.level = None
+        self._dead += 1
+        return True
+
+    def peek(self, now):  # pylint: disable=unused-argument
+        """
+        Return the earliest entry without removing it.
+
+        :param now: Current time. Backends may use it to advance internal cursors.
+        :return: The earliest entry, or None if the queue is empty.
+        """
+        heap = self._heap
+        while heap and heap[0][2].level is None:
+            heapq.heappop(heap)
+            self._dead -= 1
+        if not heap:
+            return None
+        return heap[0][2]
+
+    def pop(self):
+        """
+        Remove and return the earliest entry.
+        """
+        self.peek(None)
+        entry = heapq.heappop(self._heap)[2]
+        entry.level = None
+        return entry
+
+    def pop_group(self):
+        """
+        Remove and return all entries with the earliest time, in insertion order.
+        """
+        entries = [self.pop()]
+        time = entries[0].time
+        while True:
+            entry = self.peek(None)
+            if entry is None or entry.time != time:
+                return entries
+            entries.append(self.pop())
+
+    def compact(self):
+        """
+        Remove tombstones left by cancel() if there are enough of them.
+        CalendarScheduler calls this method while it waits for the next event.
+        """
+        if self._dead < self._compact_threshold or self._dead * 2 < len(self._heap):
+            return
+        self._heap = [item for item in self._heap if item[2].level is not None]
+        heapq.heapify(self._heap)
+        self._dead = 0
+
+
+_DUE = -1
+_OVERFLOW = -2
+
+
+class TimingWheelQueue:
+    """
+    Hierarchical timing wheel queue.
+    Insert and cancel cost O(1). Each entry is moved between wheel levels at most
+    `levels` times before it becomes due.
+
+    Time is split into ticks of `resolution` seconds. Level 0 holds entries due within
+    the current block of 2**slot_bits ticks, level 1 within the current block of
+    2**(2*slot_bits) ticks and so on. Entries beyond the last level are kept in an
+    overflow heap.
+    """
+    def __init__(self, resolution: float = 0.001, slot_bits: int = 6, levels: int = 8):
+        """
+        Initialize the TimingWheelQueue.
+
+        :param resolution: Tick length in seconds (default: 0.001).
+                           Entries keep their exact time, the resolution only affects
+                           the distribution of entries between slots.
+        :param slot_bits: Number of slots per level as a power of two (default: 6, 64 slots).
+        :param levels: Number of wheel levels (default: 8).
+        """
+        self._resolution = resolution
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = levels
+        self._wheels = [[{} for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._occupied = [0] * levels
+        self._current = 0
+        self._due = []
+        self._overflow = []
+        self._sequence = itertools.count()
+        self._count = 0
+        self._dead = 0
+        self._earliest_cache = None
+
+    def __len__(self):
+        return self._count
+
+    def push(self, time, action, argument):
+        """
+        Add an entry to the queue.
+
+        :param time: Time of the entry as a POSIX timestamp.
+        :param action: Function to call when the entry is due.
+        :param argument: Tuple of positional arguments for the action.
+        :return: The queue entry, which can be passed to cancel().
+        """
+        entry = QueueEntry(time, next(self._sequence), action, argument)
+        self._place(entry)
+        self._count += 1
+        cached = self._earliest_cache
+        if cached is not None and (time, entry.sequence) < (cached.time, cached.sequence):
+            self._earliest_cache = entry
+        return entry
+
+    def push_many(self, items):
+        """
+        Add several entries to the queue at once.
+
+        :param items: Iterable of (time, action, argument) tuples.
+        :return: List of queue entries in the order of items.
+        """
+        return [self.push(time, action, argument) for time, action, argument in items]
+
+    def cancel(self, entry):
+        """
+        Remove an entry from the queue.
+
+        :param entry: The entry returned by push().
+        :return: True if the entry was removed, False if it is no longer in the queue.
+        """
+        if entry.level is None:
+            return False
+        self._detach(entry)
+        return True
+
+    def peek(self, now):
+        """
+        Return the earliest entry without removing it.
+
+        :param now: Current time. The wheel is advanced up to this time.
+        :return: The earliest entry, or None if the queue is empty.
+        """
+        self._advance(int(now // self._resolution))
+        return self._earliest()
+
+    def pop(self):
+        """
+        Remove and return the earliest entry.
+        """
+        entry = self._earliest()
+        self._detach(entry)
+        return entry
+
+    def pop_group(self):
+        """
+        Remove and return all entries with the earliest time, in insertion order.
+        """
+        entries = [self.pop()]
+        time = entries[0].time
+        while True:
+            entry = self._earliest()
+            if entry is None or entry.time != time:
+                return entries
+            self._detach(entry)
+            entries.append(entry)
+
+    def compact(self):
+        """
+        Remove tombstones left by cancel() in the internal heaps.
+        CalendarScheduler calls this method while it waits for the next event.
+        """
+        if not self._dead:
+            return
+        self._due = [item for item in self._due if item[2].level is not None]
+        heapq.heapify(self._due)
+        self._overflow = [item for item in self._overflow if item[2].level is not None]
+        heapq.heapify(self._overflow)
+        self._dead = 0
+
+    def _place(self, entry):
+        tick = int(entry.time // self._resolution)
+        if tick <= self._current:
+            entry.level = _DUE
+            heapq.heappush(self._due, (entry.time, entry.sequence, entry))
+            return
+        level = ((tick ^ self._current).bit_length() - 1) // self._bits
+        if level >= self._levels:
+            entry.level = _OVERFLOW
+            heapq.heappush(self._overflow, (entry.time, entry.sequence, entry))
+            return
+        index = (tick >> (level * self._bits)) & self._mask
+        self._wheels[level][index][entry] = None
+        self._occupied[level] |= 1 << index
+        entry.level = level
+        entry.index = index
+
+    def _detach(self, entry):
+        level = entry.level
+        if level >= 0:
+            slot = self._wheels[level][entry.index]
+            del slot[entry]
+            if not slot:
+                self._occupied[level] &= ~(1 << entry.index)
+        elif level == _DUE and self._due[0][2] is entry:
+            heapq.heappop(self._due)
+        elif level == _OVERFLOW and self._overflow[0][2] is entry:
+            heapq.heappop(self._overflow)
+        else:
+            # Other heap entries stay in place and are skipped later by _prune().
+            self._dead += 1
+        entry.level = None
+        self._count -= 1
+        if self._earliest_cache is entry:
+            self._earliest_cache = None
+
+    def _first_slot(self):
+        for level in range(self._levels):
+            start = ((self._current >> (level * self._bits)) & self._mask) + 1
+            bitmap = self._occupied[level] >> start
+            if bitmap:
+                return level, start + (bitmap & -bitmap).bit_length() - 1
+        return None
+
+    def _slot_start(self, level, index):
+        shift = (level + 1) * self._bits
+        return (self._current >> shift << shift) | (index << (level * self._bits))
+
+    def _advance(self, target):
+        while self._current < target:
+            located = self._first_slot()
+            if located is None:
+                _prune(self._overflow)
+                if not self._overflow:
+                    self._current = target
+                    break
+                overflow_tick = int(self._overflow[0][0] // self._resolution)
+                self._current = max(min(target, overflow_tick), self._current)
+                self._refill()
+                continue
+            level, index = located
+            start = self._slot_start(level, index)
+            if start > target:
+                self._current = target
+                break
+            self._current = start
+            slot = self._wheels[level][index]
+            self._wheels[level][index] = {}
+            self._occupied[level] &= ~(1 << index)
+            for entry in slot:
+                self._place(entry)
+            self._earliest_cache = None
+
+    def _refill(self):
+        limit = self._levels * self._bits
+        while self._overflow:
+            entry = self._overflow[0][2]
+            if entry.level is None:
+                heapq.heappop(self._overflow)
+                continue
+            if (int(entry.time // self._resolution) ^ self._current).bit_length() > limit:
+                break
+            heapq.heappop(self._overflow)
+            self._place(entry)
+        self._earliest_cache = None
+
+    def _earliest(self):
+        _prune(self._due)
+        if self._due:
+            return self._due[0][2]
+        if self._earliest_cache is not None:
+            return self._earliest_cache
+        located = self._first_slot()
+        if located is not None:
+            level, index = located
+            entry = min(self._wheels[level][index], key=lambda e: (e.time, e.sequence))
+        else:
+            _prune(self._overflow)
+            entry = self._overflow[0][2] if self._overflow else None
+        self._earliest_cache = entry
+        return entry
+
+
+def _prune(heap):
+    while heap and heap[0][2].level is None:
+        heapq.heappop(heap)
@@ -0,0 +1,474 @@
+"""
+Recurrence rules of RFC 5545 (iCalendar RRULE).
+
+A rule is parsed once by parse_rrule(), which shares the result between events with the same
+text. RRuleIterator walks the periods of the rule (years, months, weeks, days, hours,
+minutes or seconds) from the start and expands each period into its sorted occurrences.
+It keeps its position, so consecutive calls with increasing times cost amortized O(1),
+and without COUNT it jumps straight to the period of a later time.
+
+Supported parts: FREQ, INTERVAL, COUNT, UNTIL, BYMONTH, BYMONTHDAY, BYDAY (with ordinals
+such as 2TU or -1FR for MONTHLY and YEARLY rules), BYHOUR, BYMINUTE, BYSECOND, BYSETPOS
+and WKST. BYYEARDAY and BYWEEKNO are not supported. Times are wall clock seconds since
+1970-01-01 00:00 in the time zone of the event.
+"""
+
+import calendar
+import datetime
+import functools
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+SECONDS_IN_DAY = 86400
+
+FREQUENCIES = ("YEARLY", "MONTHLY", "WEEKLY", "DAILY", "HOURLY", "MINUTELY", "SECONDLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")  # Indexes are datetime weekdays.
+
+# Length of the sub-daily periods in seconds.
+_PERIOD_SECONDS = {"HOURLY": 3600, "MINUTELY": 60, "SECONDLY": 1}
+
+# Periods in a row without occurrences after which a rule is considered exhausted,
+# such as a rule for February 30. Valid rules need at most a few thousand (February 29).
+_MAX_EMPTY_PERIODS = 50000
+
+
+@dataclass(frozen=True)
+class RRule:
+    """
+    Parsed recurrence rule, made by parse_rrule(). BY parts that are not set are empty tuples.
+    """
+    text: str
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime.datetime] = None
+    until_utc: bool = False
+    by_month: Tuple[int, ...] = ()
+    by_month_day: Tuple[int, ...] = ()
+    by_day: Tuple[Tuple[int, int], ...] = ()  # (nth, weekday), nth is 0 for every such weekday.
+    by_hour: Tuple[int, ...] = ()
+    by_minute: Tuple[int, ...] = ()
+    by_second: Tuple[int, ...] = ()
+    by_set_pos: Tuple[int, ...] = ()
+    week_start: int = 0
+
+    def __repr__(self):
+        return f"RRule({self.text!r})"
+
+
+def _period_times(rule, start_second):
+    """
+    Offsets of the occurrences from the start of a day, or of a sub-daily period.
+    Time parts that are not set are taken from the start. Parts finer than a day that
+    the period itself sets are 0.
+    """
+    hour, rest = divmod(start_second % SECONDS_IN_DAY, 3600)
+    minute, second = divmod(rest, 60)
+    freq = rule.freq
+    hours = (rule.by_hour or (hour,)) if freq not in _PERIOD_SECONDS else (0,)
+    minutes = (rule.by_minute or (minute,)) if freq not in ("MINUTELY", "SECONDLY") else (0,)
+    seconds = (rule.by_second or (second,)) if freq != "SECONDLY" else (0,)
+    return tuple(h * 3600 + m * 60 + s for h in hours for m in minutes for s in seconds)
+
+
+def _number(text, low, high):
+    sign = -1 if text.startswith("-") else 1
+    digits = text.lstrip("+-")
+    if not digits.isdigit():
+        raise ValueError(f"invalid number {text!r}")
+    value = sign * int(digits)
+    if value < low or (high is not None and value > high) or (low < 0 and value == 0):
+        raise ValueError(f"number {text!r} out of range")
+    return value
+
+
+def _numbers(text, low, high):
+    if text is None:
+        return ()
+    return tuple(sorted({_number(item, low, high) for item in text.split(",")}))
+
+
+def _parse_weekday(text):
+    """
+    :return: Tuple (nth, weekday), where nth is 0 for every such weekday.
+    """
+    nth, name = text[:-2], text[-2:]
+    if name not in WEEKDAYS:
+        raise ValueError(f"invalid weekday {text!r}")
+    return (_number(nth, -53, 53) if nth else 0), WEEKDAYS.index(name)
+
+
+def _parse_until(text):
+    """
+    :return: Tuple of a naive datetime and whether it is in UTC.
+    """
+    utc = text.endswith("Z")
+    try:
+        if "T" in text:
+            until = datetime.datetime.strptime(text.rstrip("Z"), "%Y%m%dT%H%M%S")
+        else:
+            until = datetime.datetime.strptime(text, "%Y%m%d")
+    except ValueError as error:
+        raise ValueError(f"invalid UNTIL {text!r}") from error
+    return until, utc
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_rrule(text: str):
+    """
+    Parse a rule, reusing the result for the same text.
+
+    :param text: Rule such as "FREQ=MONTHLY;BYDAY=-1FR", optionally prefixed with "RRULE:".
+    :raises ValueError: If the rule is malformed or uses unsupported parts.
+    """
+    parts = _split_parts(text)
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"invalid or missing FREQ in {text!r}")
+    count = _number(parts.pop("COUNT"), 1, None) if "COUNT" in parts else None
+    until, until_utc = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else (None, False)
+    if count is not None and until is not None:
+        raise ValueError("COUNT and UNTIL cannot be used together")
+    week_start = parts.pop("WKST", "MO")
+    if week_start not in WEEKDAYS:
+        raise ValueError(f"invalid WKST {week_start!r}")
+    rule = RRule(
+        text, freq, _number(parts.pop("INTERVAL", "1"), 1, None), count, until, until_utc,
+        week_start=WEEKDAYS.index(week_start), **_pop_by_parts(parts)
+    )
+    if parts:
+        raise ValueError(f"unsupported rule parts: {', '.join(sorted(parts))}")
+    if any(nth for nth, _ in rule.by_day) and freq not in ("MONTHLY", "YEARLY"):
+        raise ValueError("BYDAY ordinals are only allowed with FREQ=MONTHLY or YEARLY")
+    if rule.by_month_day and freq == "WEEKLY":
+        raise ValueError("BYMONTHDAY is not allowed with FREQ=WEEKLY")
+    return rule
+
+
+def _split_parts(text):
+    """
+    :return: Dictionary of the upper case values of the rule parts by their upper case names.
+    """
+    body = text.strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[6:]
+    parts = {}
+    for item in body.split(";"):
+        name, separator, value = item.partition("=")
+        name = name.strip().upper()
+        if not separator or not value or name in parts:
+            raise ValueError(f"invalid rule part {item!r}")
+        parts[name] = value.strip().upper()
+    return parts
+
+
+def _pop_by_parts(parts):
+    """
+    Remove the BY parts from the parts of a rule.
+
+    :return: Keyword arguments for RRule.
+    """
+    by_day = parts.pop("BYDAY", None)
+    return {
+        "by_month": _numbers(parts.pop("BYMONTH", None), 1, 12),
+        "by_month_day": _numbers(parts.pop("BYMONTHDAY", None), -31, 31),
+        "by_day": () if by_day is None else tuple(_parse_weekday(item) for item in by_day.split(",")),
+        "by_hour": _numbers(parts.pop("BYHOUR", None), 0, 23),
+        "by_minute": _numbers(parts.pop("BYMINUTE", None), 0, 59),
+        "by_second": _numbers(parts.pop("BYSECOND", None), 0, 59),
+        "by_set_pos": _numbers(parts.pop("BYSETPOS", None), -366, 366),
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def _month_span(year, month):
+    """
+    :return: Tuple of the ordinal of the first day of the month and its number of days.
+    """
+    return datetime.date(year, month, 1).toordinal(), calendar.monthrange(year, month)[1]
+
+
+class RRuleIterator:  # pylint: disable=too-few-public-methods
+    """
+    Occurrences of a rule from a start time in wall clock seconds.
+    A cursor over the occurrences: next() is its only operation.
+    Not thread safe: callers serialize the calls.
+    """
+    def __init__(self, rule: RRule, start: float):
+        """
+        Initialize the RRuleIterator.
+
+        :param rule: Parsed rule.
+        :param start: Start of the rule (DTSTART) in wall clock seconds. Parts of the start
+                      fill in the rule parts that are not set, as in RFC 5545: for example,
+                      FREQ=MONTHLY fires on the day of the month of the start.
+        """
+        self.rule = rule
+        self.start = start
+        start_second = int(start // 1)
+        start_date = datetime.date.fromordinal(start_second // SECONDS_IN_DAY + EPOCH_ORDINAL)
+        self._start_date = start_date
+        self._by_weekday = frozenset(weekday for _, weekday in rule.by_day)
+        self._times = _period_times(rule, start_second)
+        freq = rule.freq
+        if freq == "YEARLY":
+            self._origin = start_date.year
+        elif freq == "MONTHLY":
+            self._origin = start_date.year * 12 + start_date.month - 1
+        elif freq == "WEEKLY":
+            ordinal = start_date.toordinal()
+            self._origin = ordinal - (start_date.weekday() - rule.week_start) % 7
+        elif freq == "DAILY":
+            self._origin = start_date.toordinal()
+        else:
+            period = _PERIOD_SECONDS[freq]
+            self._origin = start_second // period * period
+        self._reset(0, None)
+
+    def next(self, base: float, inclusive: bool):
+        """
+        Get the first occurrence after base, or at base if inclusive.
+
+        :param base: Wall clock seconds.
+        :return: Wall clock seconds, or None if the rule has no more occurrences.
+        """
+        floor = self._floor
+        if floor is not None and (floor > base or (inclusive and floor == base)):
+            # The occurrences skipped so far are not all before base: start over.
+            if self.rule.count is not None:
+                self._reset(0, None)
+            else:
+                self._reset(self._period_index(base), base)
+        count = self.rule.count
+        while True:
+            items = self._items
+            position = self._position
+            while position < len(items):
+                value = items[position]
+                if count is not None and self._index >= count:
+                    self._position = position
+                    return None
+                if value > base or (inclusive and value == base):
+                    self._position = position
+                    return value
+                self._floor = value
+                self._index += 1
+                position += 1
+            self._position = position
+            if count is not None and self._index >= count:
+                return None
+            if not self._load(None if count is not None else base):
+                return None
+
+    def _reset(self, period, floor):
+        """
+        Move to the start of a period.
+
+        :param floor: Time at or after all occurrences of the earlier periods, or None.
+        """
+        self._period = period - 1
+        self._items = ()
+        self._position = 0
+        self._index = 0
+        self._floor = floor
+
+    def _load(self, base):
+        """
+        Expand the next period with occurrences into _items.
+
+        :param base: Time before which periods can be skipped, or None.
+        :return: False if the rule is exhausted.
+        """
+        period = self._period + 1
+        if base is not None and self._period_index(base) > period:
+            period = self._period_index(base)
+            self._floor = base if self._floor is None else max(self._floor, base)
+        for _ in range(_MAX_EMPTY_PERIODS):
+            items, next_period = self._expand(period)
+            if items:
+                self._period = period
+                self._items = items
+                self._position = 0
+                return True
+            period = next_period
+        return False
+
+    def _period_index(self, base):
+        """
+        Index of the period containing the wall clock time base (0 for times before the start).
+        """
+        rule = self.rule
+        freq = rule.freq
+        if freq in _PERIOD_SECONDS:
+            index = (base // 1 - self._origin) // (_PERIOD_SECONDS[freq] * rule.interval)
+        else:
+            date = datetime.date.fromordinal(int(base // SECONDS_IN_DAY) + EPOCH_ORDINAL)
+            if freq == "YEARLY":
+                index = (date.year - self._origin) // rule.interval
+            elif freq == "MONTHLY":
+                index = (date.year * 12 + date.month - 1 - self._origin) // rule.interval
+            elif freq == "WEEKLY":
+                index = (date.toordinal() - self._origin) // (7 * rule.interval)
+            else:
+                index = (date.toordinal() - self._origin) // rule.interval
+        return max(int(index), 0)
+
+    def _expand(self, period):
+        """
+        Compute the occurrences of a period.
+
+        :return: Tuple of the sorted list of occurrences at or after the start, and the index
+                 of the next period that can have occurrences.
+        """
+        rule = self.rule
+        next_period = period + 1
+        if rule.freq in _PERIOD_SECONDS:
+            items, next_period = self._expand_sub_daily(period)
+        else:
+            items = []
+            for ordinal in self._days(period):
+                day_start = (ordinal - EPOCH_ORDINAL) * SECONDS_IN_DAY
+                items.extend(day_start + time for time in self._times)
+        if rule.by_set_pos:
+            length = len(items)
+            items = sorted({items[position - 1 if position > 0 else position]
+                            for position in rule.by_set_pos if -length <= position <= length and position})
+        start = self.start
+        if items and items[0] < start:
+            items = [item for item in items if item >= start]
+        return items, next_period
+
+    def _expand_sub_daily(self, period):
+        """
+        _expand() of an hourly, minutely or secondly rule. A period that does not match
+        the BY parts is skipped together with the periods of the same day, hour or minute.
+        """
+        rule = self.rule
+        freq = rule.freq
+        step = _PERIOD_SECONDS[freq] * rule.interval
+        period_start = self._origin + period * step
+        days, second_of_day = divmod(period_start, SECONDS_IN_DAY)
+        hour, rest = divmod(second_of_day, 3600)
+        minute, second = divmod(rest, 60)
+        if not self._day_matches(days + EPOCH_ORDINAL):
+            next_start = (days + 1) * SECONDS_IN_DAY
+        elif rule.by_hour and hour not in rule.by_hour:
+            next_start = (period_start // 3600 + 1) * 3600
+        elif freq != "HOURLY" and rule.by_minute and minute not in rule.by_minute:
+            next_start = (period_start // 60 + 1) * 60
+        elif freq == "SECONDLY" and rule.by_second and second not in rule.by_second:
+            next_start = period_start + 1
+        else:
+            return [period_start + time for time in self._times], period + 1
+        return [], max(period + 1, math.ceil((next_start - self._origin) / step))
+
+    def _days(self, period):
+        """
+        Ordinals of the matching days of a period of a daily or longer rule, in order.
+        """
+        rule = self.rule
+        freq = rule.freq
+        if freq == "DAILY":
+            ordinal = self._origin + period * rule.interval
+            return (ordinal,) if self._day_matches(ordinal) else ()
+        if freq == "WEEKLY":
+            first = self._origin + period * 7 * rule.interval
+            weekdays = self._by_weekday or (self._start_date.weekday(),)
+            days = sorted(first + (weekday - rule.week_start) % 7 for weekday in weekdays)
+            if rule.by_month:
+                days = [day for day in days if datetime.date.fromordinal(day).month in rule.by_month]
+            return days
+        if freq == "MONTHLY":
+            year, month = divmod(self._origin + period * rule.interval, 12)
+            month += 1
+            if rule.by_month and month not in rule.by_month:
+                return ()
+            return sorted(self._month_days(year, month))
+        return self._year_days(self._origin + period * rule.interval)
+
+    def _year_days(self, year):
+        """
+        _days() of a yearly rule.
+        """
+        rule = self.rule
+        if not 1 <= year <= 9999:
+            return ()
+        if rule.by_day and not rule.by_month:
+            # Ordinals of BYDAY count within the year.
+            first = datetime.date(year, 1, 1).toordinal()
+            days = self._weekday_days(first, 366 if calendar.isleap(year) else 365)
+            if rule.by_month_day:
+                month_days = set()
+                for month in range(1, 13):
+                    month_days |= self._month_day_days(year, month)
+                days &= month_days
+            return sorted(days)
+        if rule.by_month:
+            months = rule.by_month
+        elif rule.by_month_day:
+            months = range(1, 13)
+        else:
+            months = (self._start_date.month,)
+        days = []
+        for month in months:
+            days.extend(sorted(self._month_days(year, month)))
+        return days
+
+    def _month_days(self, year, month):
+        rule = self.rule
+        if not 1 <= year <= 9999:
+            return set()
+        if not rule.by_month_day and not rule.by_day:
+            first, length = _month_span(year, month)
+            day = self._start_date.day
+            return {first + day - 1} if day <= length else set()
+        days = None
+        if rule.by_month_day:
+            days = self._month_day_days(year, month)
+        if rule.by_day:
+            weekday_days = self._weekday_days(*_month_span(year, month))
+            days = weekday_days if days is None else days & weekday_days
+        return days
+
+    def _month_day_days(self, year, month):
+        first, length = _month_span(year, month)
+        result = set()
+        for day in self.rule.by_month_day:
+            if day < 0:
+                day += length + 1
+            if 1 <= day <= length:
+                result.add(first + day - 1)
+        return result
+
+    def _weekday_days(self, first, length):
+        """
+        Ordinals of the BYDAY days among length days from the ordinal first.
+        """
+        result = set()
+        for nth, weekday in self.rule.by_day:
+            matching = range(first + (weekday - (first - 1)) % 7, first + length, 7)
+            if not nth:
+                result.update(matching)
+            elif -len(matching) <= nth <= len(matching):
+                result.add(matching[nth - 1 if nth > 0 else nth])
+        return result
+
+    def _day_matches(self, ordinal):
+        """
+        Check a day against the BY parts that limit the days of daily and shorter rules.
+        """
+        rule = self.rule
+        if not (rule.by_month or rule.by_month_day or rule.by_day):
+            return True
+        date = datetime.date.fromordinal(ordinal)
+        if rule.by_month and date.month not in rule.by_month:
+            return False
+        if rule.by_day and date.weekday() not in self._by_weekday:
+            return False
+        if rule.by_month_day:
+            length = _month_span(date.year, date.month)[1]
+            return date.day in rule.by_month_day or date.day - length - 1 in rule.by_month_day
+        return True
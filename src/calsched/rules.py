@@ -0,0 +1,763 @@
+"""
+Event rules: the settings of a scheduled event and the computation of its fire times.
+
+EventSettings and its subclasses are dataclasses, one for each kind of event. They are not
+changed after __post_init__(), except for state computed lazily by a rule. They are not
+declared frozen: the __init__() of a frozen dataclass sets each field with a call to
+object.__setattr__(), which makes creating an event several times slower.
+The schedulers ask a rule for the next fire time with next_time() and use _period(),
+skip_to() and catch_up() when occurrences were missed.
+"""
+
+import bisect
+import calendar
+import collections
+import datetime
+import functools
+import hashlib
+import json
+import math
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Any
+
+from . import tzcache
+from .cron import compile_cron
+from .rrule import RRuleIterator, parse_rrule
+from .metrics import Metrics
+from .queues import QueueEntry
+
+
+SECONDS_IN_MINUTE = 60
+SECONDS_IN_HOUR = 3600
+SECONDS_IN_DAY = 86400
+SECONDS_IN_WEEK = 604800
+NANOSECONDS_IN_SECOND = 1_000_000_000
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday.
+
+MISFIRE_COALESCE = "coalesce"
+MISFIRE_SKIP = "skip"
+MISFIRE_RUN_ALL = "run_all"
+MISFIRE_POLICIES = (MISFIRE_COALESCE, MISFIRE_SKIP, MISFIRE_RUN_ALL)
+
+_sentinel = object()
+
+
+def _action_path(action):
+    """
+    Importable path of an action in the form "module:qualname".
+    """
+    action = getattr(action, "func", action)  # BatchAction and functools.partial
+    module = getattr(action, "__module__", None) or type(action).__module__
+    qualname = getattr(action, "__qualname__", None) or type(action).__qualname__
+    return f"{module}:{qualname}"
+
+
+def _stable_fraction(text):
+    """
+    Number in [0, 1) derived from a hash of text, the same in every process.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def _stable_json(value):
+    """
+    JSON text of an argument, or "?" if it is not JSON serializable.
+    """
+    try:
+        return json.dumps(value, sort_keys=True)
+    except (TypeError, ValueError):
+        return "?"
+
+
+# dataclass(slots=True) is available since Python 3.10. Older versions keep instance dicts,
+# so the rules take about half as much memory again there (see README, Event Queue).
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
+class Event:
+    """
+    Represents a scheduled event in the calendar scheduler.
+    Contains synchronization primitives and internal state for event management.
+    Can be used to cancel the event using the CalendarScheduler.cancel() method.
+    Each event has its own lock, so events do not block each other.
+    """
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    internal_event: Optional[QueueEntry] = None
+    canceled: bool = False
+    running: int = 0
+    settings: Optional["EventSettings"] = field(default=None, repr=False, compare=False)
+    metrics: Optional[Metrics] = field(default=None, repr=False, compare=False)
+
+
+@dataclass(**_SLOTS)
+class EventSettings:
+    """
+    Base class of the event rules.
+    Subclasses implement next_time(). Rules with a constant period set _unit, or override
+    _period(), which makes skipping missed occurrences O(1) arithmetic.
+
+    Rules work with nominal times. If spread is set, the event fires jitter seconds after
+    each nominal time. The jitter is stable: it is derived from a hash of the event identity.
+    """
+    event: Event
+    action: Any
+    action_args: Any # tuple
+    action_kwargs: Any # dict
+    start_time: float
+    end_time: Optional[float]
+    tz: Optional[datetime.tzinfo] = None
+    interval: int = 1
+    second: int = 0
+    minute: int = 0
+    hour: int = 0
+    weekday: int = 0
+    day: int = 1
+    month: int = 1
+    max_concurrent: Optional[int] = None
+    misfire_policy: str = MISFIRE_COALESCE
+    misfire_grace_time: Optional[float] = None
+    misfire_limit: Optional[int] = None
+    spread: Optional[float] = None
+    job_id: Optional[str] = None
+    jitter: float = field(init=False, repr=False, compare=False)  # Set in __post_init__().
+
+    def __post_init__(self):
+        jitter = _stable_fraction(self.identity()) * self.spread if self.spread else 0.0
+        self.jitter = jitter
+
+    def identity(self):
+        """
+        Text identifying the event across restarts: the job_id if set, otherwise
+        the rule, the action path and the JSON serializable arguments.
+        Other arguments are left out, as their repr may hold an address, which changes
+        on every restart. Events that differ only in such arguments need a job_id.
+        """
+        if self.job_id is not None:
+            return self.job_id
+        action_kwargs = {} if self.action_kwargs is _sentinel else self.action_kwargs
+        return "|".join(str(value) for value in (
+            type(self).__name__, _action_path(self.action),
+            ",".join(_stable_json(value) for value in self.action_args),
+            ",".join(f"{name}={_stable_json(value)}" for name, value in sorted(action_kwargs.items())),
+            self.interval, self.second, self.minute, self.hour, self.weekday, self.day, self.month
+        ))
+
+    _unit = None  # Length of the interval unit in seconds for rules with a constant period.
+
+    def next_time(self, run_time, inclusive=None):
+        """
+        Get the first occurrence at or after run_time if inclusive is true,
+        and strictly after run_time otherwise.
+
+        :param run_time: POSIX timestamp.
+        :param inclusive: If None, the first call for an event (before it has been queued)
+                          is inclusive and later calls are not.
+        """
+        raise NotImplementedError
+
+    def _period(self):
+        """
+        Constant distance between occurrences in seconds, or None if it varies.
+        """
+        if self._unit is None:
+            return None
+        return self.interval * self._unit
+
+    def skip_to(self, next_time, time_value):
+        """
+        Get the first occurrence at or after time_value.
+
+        :param next_time: An occurrence before time_value.
+        :param time_value: POSIX timestamp.
+        """
+        period = self._period()
+        if period is None:
+            return self.next_time(time_value, inclusive=True)
+        return next_time + math.ceil((time_value - next_time) / period) * period
+
+    def catch_up(self, next_time, current_time):
+        """
+        Get the occurrence to schedule when occurrences from next_time to current_time were missed.
+
+        :param next_time: The first missed occurrence.
+        :param current_time: Current time as a POSIX timestamp.
+        """
+        if self.misfire_policy != MISFIRE_RUN_ALL:
+            return self.skip_to(next_time, current_time)
+        if self.misfire_grace_time is not None:
+            next_time = max(next_time, self.skip_to(next_time, current_time - self.misfire_grace_time))
+        limit = self.misfire_limit
+        if limit is None or next_time >= current_time:
+            return next_time
+        period = self._period()
+        if period is not None:
+            return max(next_time, self.skip_to(next_time, current_time - limit * period))
+        recent = collections.deque([next_time], maxlen=limit)
+        while True:
+            next_time = self.next_time(next_time, inclusive=False)
+            if next_time >= current_time:
+                return recent[0]
+            recent.append(next_time)
+
+
+def _seconds_to_ns(seconds):
+    """
+    Convert a POSIX timestamp in float seconds to integer nanoseconds.
+    The whole seconds are split off first, so the result is exact to the nanosecond.
+    """
+    whole = math.floor(seconds)
+    return whole * NANOSECONDS_IN_SECOND + round((seconds - whole) * 1e9)
+
+
+@dataclass(**_SLOTS)
+class InternalEveryMillisecondEvent(EventSettings):
+    """
+    Occurrences are start_time + k * interval_ms for k >= 1, so the phase is kept when
+    occurrences are skipped.
+
+    The occurrences are computed in integer nanoseconds from start_ns and interval_ns and
+    rounded to float seconds only when returned, so the rounding error does not grow with k.
+    """
+    interval_ms: float = None  # Interval in seconds.
+    interval_ns: int = None
+    start_ns: int = None  # start_time in nanoseconds, exact if it comes from time.time_ns().
+
+    def __post_init__(self):
+        if self.interval_ns is None:
+            self.interval_ns = round(self.interval_ms * NANOSECONDS_IN_SECOND)
+        if self.interval_ms is None:
+            self.interval_ms = self.interval_ns / NANOSECONDS_IN_SECOND
+        if self.start_ns is None:
+            self.start_ns = _seconds_to_ns(self.start_time)
+        EventSettings.__post_init__(self)
+
+    def identity(self):
+        if self.job_id is not None:
+            return self.job_id
+        return EventSettings.identity(self) + "|" + str(self.interval_ns)
+
+    def next_time(self, run_time, inclusive=None):
+        if inclusive is None:
+            inclusive = self.event.internal_event is None
+        start, interval = self.start_ns, self.interval_ns
+        # Estimated in floats, then corrected by comparing with the exact occurrences.
+        # Dividing integers rounds correctly, so an occurrence on a whole second is whole.
+        count = max(int((run_time - self.start_time) // self.interval_ms), 0) + 1
+        while count > 1 and (start + (count - 1) * interval) / NANOSECONDS_IN_SECOND > run_time:
+            count -= 1
+        while (start + count * interval) / NANOSECONDS_IN_SECOND <= run_time:
+            count += 1
+        if inclusive and count > 1 and (start + (count - 1) * interval) / NANOSECONDS_IN_SECOND >= run_time:
+            count -= 1
+        return (start + count * interval) / NANOSECONDS_IN_SECOND
+
+    def _period(self):
+        return self.interval_ms
+
+    def skip_to(self, next_time, time_value):
+        return self.next_time(time_value, inclusive=True)
+
+
+@dataclass(**_SLOTS)
+class InternalEveryMicrosecondEvent(InternalEveryMillisecondEvent):
+    """
+    The same rule as InternalEveryMillisecondEvent with the interval given in microseconds.
+    """
+
+
+@dataclass(**_SLOTS)
+class InternalEverySecondEvent(EventSettings):
+    _unit = 1
+
+    def next_time(self, run_time, inclusive=None):
+        if inclusive is None:
+            inclusive = self.event.internal_event is None
+        target_time = run_time // 1 # remove milliseconds
+        past_event = False
+        if not inclusive:
+            if target_time <= run_time:
+                past_event = True
+        elif target_time < run_time:
+            past_event = True
+        if past_event:
+            target_time += self.interval
+        return target_time
+
+
+@dataclass(**_SLOTS)
+class InternalEveryMinuteEvent(EventSettings):
+    _unit = 1  # interval is in seconds.
+
+    def next_time(self, run_time, inclusive=None):
+        if inclusive is None:
+            inclusive = self.event.internal_event is None
+        minute_start = run_time // SECONDS_IN_MINUTE * SECONDS_IN_MINUTE
+        target_time = minute_start + self.second
+        past_event = False
+        if not inclusive:
+            if target_time <= run_time:
+                past_event = True
+        elif target_time < run_time:
+            past_event = True
+        if past_event:
+            target_time += self.interval
+        return target_time
+
+
+def _local_seconds(run_time, offset):
+    """
+    Wall clock time in seconds since the epoch, rounded to microseconds like datetime does.
+    """
+    seconds = run_time // 1
+    return seconds + offset + round((run_time - seconds) * 1e6) / 1e6
+
+
+@functools.lru_cache(maxsize=4096)
+def _days_from_civil(year, month, day):
+    """
+    Number of days since 1970-01-01 of a proleptic Gregorian date.
+    """
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + 9 if month <= 2 else month - 3) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+@functools.lru_cache(maxsize=4096)
+def _civil_from_days(days):
+    """
+    Proleptic Gregorian (year, month, day) of a number of days since 1970-01-01.
+    """
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = month_index + 3 if month_index < 10 else month_index - 9
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _days_in_month(year, month):
+    if month == 2 and calendar.isleap(year):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+@dataclass(**_SLOTS)
+class _CalendarEvent(EventSettings):
+    """
+    Base class of the rules defined in wall clock time of a time zone.
+
+    Away from UTC offset transitions the next time is computed in float arithmetic on
+    local seconds with the offset taken from the tzcache module. Near transitions, where
+    a wall clock time may be skipped or repeated, datetime is used.
+    Subclasses implement _next_local() and may override _next_datetime(), which by default
+    searches with _next_local() and converts its results with datetime.
+
+    Zones with a fixed offset, instances of datetime.timezone, have no transitions.
+    For them _offset is set when the rule is created and next_time() uses it directly.
+    """
+    _offset: Optional[float] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        EventSettings.__post_init__(self)
+        self._offset = tzcache.fixed_offset(self.tz)
+
+    def next_time(self, run_time, inclusive=None):
+        if inclusive is None:
+            inclusive = self.event.internal_event is None
+        offset = self._offset
+        if offset is not None:
+            return self._next_local(_local_seconds(run_time, offset), inclusive) - offset
+        span = tzcache.offset_span(self.tz, run_time)
+        if span is not None:
+            local_target_time = self._next_local(_local_seconds(run_time, span[2]), inclusive)
+            target_time = local_target_time - span[2]
+            if not span[0] <= target_time <= span[1]:
+                span = tzcache.offset_span(self.tz, target_time)
+                if span is not None:
+                    target_time = local_target_time - span[2]
+            if span is not None and span[0] <= target_time <= span[1]:
+                return target_time
+        return self._next_datetime(run_time, inclusive)
+
+    def _next_local(self, base_time, inclusive):
+        raise NotImplementedError
+
+    def _period(self):
+        if self._offset is None or self._unit is None:
+            return None
+        return self.interval * self._unit
+
+    def _time_of_day(self):
+        return self.hour * SECONDS_IN_HOUR + self.minute * SECONDS_IN_MINUTE + self.second
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz).replace(tzinfo=None)
+        base_time = (dt_base_time - _EPOCH_NAIVE).total_seconds()
+        while True:
+            base_time = self._next_local(base_time, inclusive)
+            if base_time == math.inf:
+                return base_time
+            target_time = (_EPOCH_NAIVE + datetime.timedelta(seconds=base_time)).replace(tzinfo=self.tz).timestamp()
+            # A wall clock time repeated when the clock is set back maps to its first moment.
+            if target_time > run_time or (inclusive and target_time == run_time):
+                return target_time
+            inclusive = False
+
+
+_EPOCH_NAIVE = datetime.datetime(1970, 1, 1)
+
+
+@dataclass(**_SLOTS)
+class InternalHourlyEvent(_CalendarEvent):
+    _unit = SECONDS_IN_HOUR
+
+    def _next_local(self, base_time, inclusive):
+        target_time = (
+            base_time // SECONDS_IN_HOUR * SECONDS_IN_HOUR + self.minute * SECONDS_IN_MINUTE + self.second
+        )
+        if target_time < base_time or (not inclusive and target_time == base_time):
+            target_time += self.interval * SECONDS_IN_HOUR
+        return target_time
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
+        target_time = dt_base_time.replace(minute=self.minute, second=self.second, microsecond=0)
+        past_event = False
+        if not inclusive:
+            if target_time <= dt_base_time:
+                past_event = True
+        elif target_time < dt_base_time:
+            past_event = True
+        if past_event:
+            target_time += datetime.timedelta(hours=self.interval)
+        return target_time.timestamp()
+
+
+@dataclass(**_SLOTS)
+class InternalDailyEvent(_CalendarEvent):
+    _unit = SECONDS_IN_DAY
+
+    def _next_local(self, base_time, inclusive):
+        target_time = base_time // SECONDS_IN_DAY * SECONDS_IN_DAY + self._time_of_day()
+        if target_time < base_time or (not inclusive and target_time == base_time):
+            target_time += self.interval * SECONDS_IN_DAY
+        return target_time
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
+        target_time = dt_base_time.replace(
+            hour=self.hour, minute=self.minute, second=self.second, microsecond=0
+        )
+
+        past_event = False
+        if not inclusive:
+            if target_time <= dt_base_time:
+                past_event = True
+        elif target_time < dt_base_time:
+            past_event = True
+        if past_event:
+            target_time += datetime.timedelta(days=self.interval)
+        return target_time.timestamp()
+
+
+@dataclass(**_SLOTS)
+class InternalWeeklyEvent(_CalendarEvent):
+    _unit = SECONDS_IN_WEEK
+
+    def _next_local(self, base_time, inclusive):
+        days = base_time // SECONDS_IN_DAY
+        days_ahead = (self.weekday - (days + EPOCH_WEEKDAY)) % 7
+        target_time = (days + days_ahead) * SECONDS_IN_DAY + self._time_of_day()
+        if target_time < base_time or (not inclusive and target_time == base_time):
+            target_time += self.interval * SECONDS_IN_WEEK
+        return target_time
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
+        days_ahead = (self.weekday - dt_base_time.weekday()) % 7
+        target_date = dt_base_time + datetime.timedelta(days=days_ahead)
+        target_time = target_date.replace(
+            hour=self.hour, minute=self.minute, second=self.second, microsecond=0
+        )
+
+        past_event = False
+        if not inclusive:
+            if target_time <= dt_base_time:
+                past_event = True
+        elif target_time < dt_base_time:
+            past_event = True
+        if past_event:
+            target_time += datetime.timedelta(weeks=self.interval)
+        return target_time.timestamp()
+
+
+@dataclass(**_SLOTS)
+class InternalMonthlyEvent(_CalendarEvent):
+    def _next_local(self, base_time, inclusive):
+        year, month, _ = _civil_from_days(int(base_time // SECONDS_IN_DAY))
+        target_time = self._month_time(year, month)
+        if target_time < base_time or (not inclusive and target_time == base_time):
+            next_month = month + self.interval
+            target_time = self._month_time(year + (next_month - 1) // 12, (next_month - 1) % 12 + 1)
+        return target_time
+
+    def _month_time(self, year, month):
+        limit_day = min(self.day, _days_in_month(year, month))
+        return _days_from_civil(year, month, limit_day) * SECONDS_IN_DAY + self._time_of_day()
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
+        last_day = calendar.monthrange(dt_base_time.year, dt_base_time.month)[1]
+        limit_day = min(self.day, last_day)
+        target_time = dt_base_time.replace(
+            day=limit_day, hour=self.hour, minute=self.minute, second=self.second, microsecond=0
+        )
+        past_event = False
+        if not inclusive:
+            if target_time <= dt_base_time:
+                past_event = True
+        elif target_time < dt_base_time:
+            past_event = True
+        if past_event:
+            next_month = dt_base_time.month + self.interval
+            next_year = dt_base_time.year + (next_month - 1) // 12
+            next_month = (next_month - 1) % 12 + 1
+            last_day = calendar.monthrange(next_year, next_month)[1]
+            limit_day = min(self.day, last_day)
+            target_time = datetime.datetime(
+                next_year, next_month, limit_day, self.hour, self.minute, self.second,
+                tzinfo=self.tz
+            )
+        return target_time.timestamp()
+
+
+@dataclass(**_SLOTS)
+class InternalYearlyEvent(_CalendarEvent):
+    def _next_local(self, base_time, inclusive):
+        year = _civil_from_days(int(base_time // SECONDS_IN_DAY))[0]
+        target_time = self._year_time(year)
+        if target_time < base_time or (not inclusive and target_time == base_time):
+            target_time = self._year_time(year + self.interval)
+        return target_time
+
+    def _year_time(self, year):
+        limit_day = min(self.day, _days_in_month(year, self.month))
+        return _days_from_civil(year, self.month, limit_day) * SECONDS_IN_DAY + self._time_of_day()
+
+    def _next_datetime(self, run_time, inclusive):
+        dt_base_time = datetime.datetime.fromtimestamp(run_time, self.tz)
+        last_day = calendar.monthrange(dt_base_time.year, self.month)[1]
+        limit_day = min(self.day, last_day)
+        target_time = dt_base_time.replace(
+            month=self.month, day=limit_day, hour=self.hour,
+            minute=self.minute, second=self.second, microsecond=0
+        )
+        past_event = False
+        if not inclusive:
+            if target_time <= dt_base_time:
+                past_event = True
+        elif target_time < dt_base_time:
+            past_event = True
+        if past_event:
+            next_year = dt_base_time.year + self.interval
+            last_day = calendar.monthrange(next_year, self.month)[1]
+            limit_day = min(self.day, last_day)
+            target_time = datetime.datetime(
+                next_year, self.month, limit_day, self.hour, self. minute, self.second,
+                tzinfo=self.tz
+            )
+        return target_time.timestamp()
+
+
+@dataclass(**_SLOTS)
+class InternalCronEvent(_CalendarEvent):
+    """
+    Occurrences are the wall clock minutes matching a cron expression. The expression is
+    compiled once by compile_cron(), which shares the result between events.
+    """
+    expression: str = None
+    _cron: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._cron = compile_cron(self.expression)
+        _CalendarEvent.__post_init__(self)
+
+    def identity(self):
+        if self.job_id is not None:
+            return self.job_id
+        return _CalendarEvent.identity(self) + "|" + self.expression
+
+    def _next_local(self, base_time, inclusive):
+        minute_index = math.ceil(base_time / SECONDS_IN_MINUTE) if inclusive else base_time // SECONDS_IN_MINUTE + 1
+        return self._cron.next_minute(int(minute_index)) * SECONDS_IN_MINUTE
+
+
+@dataclass(**_SLOTS)
+class InternalRRuleEvent(_CalendarEvent):
+    """
+    Occurrences of an RFC 5545 recurrence rule starting at start_time, except exdates.
+
+    The rule is parsed once by parse_rrule(). Each event keeps an RRuleIterator, so re-arming
+    continues from the previous occurrence. Exhausted rules return math.inf.
+    """
+    rule: str = None
+    exdates: tuple = ()  # Sorted POSIX timestamps.
+    _rrule: Any = field(init=False, repr=False, compare=False)
+    _iterator_lock: threading.Lock = field(init=False, repr=False, compare=False)
+    _iterator: Optional[RRuleIterator] = field(init=False, default=None, repr=False, compare=False)
+    _until: Optional[float] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        rule = parse_rrule(self.rule)
+        self._rrule = rule
+        self._iterator_lock = threading.Lock()
+        _CalendarEvent.__post_init__(self)
+        until = None
+        if rule.until is not None:
+            until = rule.until.replace(tzinfo=datetime.timezone.utc if rule.until_utc else self.tz).timestamp()
+        self._until = until
+
+    def identity(self):
+        if self.job_id is not None:
+            return self.job_id
+        return _CalendarEvent.identity(self) + "|" + self.rule
+
+    def next_time(self, run_time, inclusive=None):
+        if inclusive is None:
+            inclusive = self.event.internal_event is None
+        next_time = _CalendarEvent.next_time(self, run_time, inclusive)
+        exdates = self.exdates
+        while exdates and next_time != math.inf:
+            index = bisect.bisect_left(exdates, next_time)
+            if index == len(exdates) or exdates[index] != next_time:
+                break
+            next_time = _CalendarEvent.next_time(self, next_time, False)
+        if self._until is not None and next_time > self._until:
+            return math.inf
+        return next_time
+
+    def _next_local(self, base_time, inclusive):
+        with self._iterator_lock:
+            iterator = self._iterator
+            if iterator is None:
+                offset = self._offset
+                if offset is None:
+                    start = datetime.datetime.fromtimestamp(self.start_time, self.tz).replace(tzinfo=None)
+                    start_local = (start - _EPOCH_NAIVE).total_seconds()
+                else:
+                    start_local = _local_seconds(self.start_time, offset)
+                iterator = RRuleIterator(self._rrule, start_local)
+                self._iterator = iterator
+            next_time = iterator.next(base_time, inclusive)
+        return math.inf if next_time is None else next_time
+
+
+COMPOUND_PERIODS = ("hourly", "daily", "weekly", "monthly")
+
+
+@dataclass(**_SLOTS)
+class InternalCompoundEvent(_CalendarEvent):
+    """
+    Occurrences at several times of each period: every combination of the given seconds,
+    minutes, hours, weekdays (weekly) and days (monthly).
+
+    The combinations are precomputed into a sorted table of offsets from the period start,
+    so the next time is a binary search in the table. Days beyond the end of a short month
+    fall on its last day; monthly events keep a table for each month length.
+    """
+    period: str = "daily"
+    hours: tuple = (0,)
+    minutes: tuple = (0,)
+    seconds: tuple = (0,)
+    weekdays: tuple = (0,)
+    days: tuple = (1,)
+    _offsets: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        times = [
+            hour * SECONDS_IN_HOUR + minute * SECONDS_IN_MINUTE + second
+            for hour in (self.hours if self.period != "hourly" else (0,))
+            for minute in self.minutes for second in self.seconds
+        ]
+        if self.period == "weekly":
+            tables = _compound_offsets(times, self.weekdays)
+        elif self.period == "monthly":
+            tables = {
+                length: _compound_offsets(times, sorted({min(day, length) - 1 for day in self.days}))
+                for length in (28, 29, 30, 31)
+            }
+        else:
+            tables = tuple(sorted(set(times)))
+        self._offsets = tables
+        _CalendarEvent.__post_init__(self)
+
+    def identity(self):
+        if self.job_id is not None:
+            return self.job_id
+        return "|".join(str(value) for value in (
+            _CalendarEvent.identity(self), self.period, self.hours, self.minutes, self.seconds, self.weekdays, self.days
+        ))
+
+    def _next_local(self, base_time, inclusive):
+        period_start, offsets = self._period_start(base_time)
+        position = (bisect.bisect_left if inclusive else bisect.bisect_right)(offsets, base_time - period_start)
+        if position < len(offsets):
+            return period_start + offsets[position]
+        period_start, offsets = self._period_start(period_start, self.interval)
+        return period_start + offsets[0]
+
+    def _period_start(self, base_time, periods=0):
+        """
+        Get the start of the period containing base_time, or of the given number of periods
+        after it, and its table of offsets.
+        """
+        if self.period == "hourly":
+            return (base_time // SECONDS_IN_HOUR + periods) * SECONDS_IN_HOUR, self._offsets
+        days = base_time // SECONDS_IN_DAY
+        if self.period == "daily":
+            return (days + periods) * SECONDS_IN_DAY, self._offsets
+        if self.period == "weekly":
+            week_start = days - (days + EPOCH_WEEKDAY) % 7
+            return (week_start + periods * 7) * SECONDS_IN_DAY, self._offsets
+        year, month, _ = _civil_from_days(int(days))
+        month += periods
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        return _days_from_civil(year, month, 1) * SECONDS_IN_DAY, self._offsets[_days_in_month(year, month)]
+
+
+def _value_set(values, low, high):
+    """
+    Get the sorted unique values of an iterable of integers, or None if it is empty
+    or a value is out of range. A string is not taken as an iterable of digits.
+    """
+    if isinstance(values, (str, bytes)):
+        return None
+    try:
+        values = tuple(sorted({int(value) for value in values}))
+    except (TypeError, ValueError):
+        return None
+    if not values or not low <= values[0] <= values[-1] <= high:
+        return None
+    return values
+
+
+def _compound_offsets(times, days):
+    """
+    Sorted offsets of the times of the given days from the start of the period.
+    """
+    return tuple(sorted({day * SECONDS_IN_DAY + time for day in days for time in times}))
@@ -0,0 +1,313 @@
+"""
+Calendar scheduler that runs events in several worker processes.
+"""
+
+import dataclasses
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import threading
+
+from .base import BaseCalendarScheduler
+from .core import CalendarScheduler
+from .rules import Event, _sentinel, _stable_fraction
+
+
+class ShardedCalendarScheduler(BaseCalendarScheduler):
+    """
+    Calendar scheduler that partitions events across worker processes.
+
+    Has the same enter_*_event() methods and cancel() as CalendarScheduler. Each event is
+    assigned to a worker by a stable hash of its identity, and every worker runs its own
+    CalendarScheduler, so actions of different workers run in parallel without sharing the GIL.
+    Events are sent to the workers over pipes: actions and their arguments must be picklable.
+    Events with the same BatchAction function are grouped within each worker.
+
+    The workers are started by the constructor and stopped by close().
+    """
+    def __init__(self, workers: int = None, queue_factory=None, spread=None, mp_context=None):
+        """
+        Initialize the ShardedCalendarScheduler.
+
+        :param workers: Number of worker processes (default: os.cpu_count()).
+        :param queue_factory: Function creating the event queue of a worker, such as
+                              TimingWheelQueue (default: None, HeapQueue).
+                              Must be picklable with the "spawn" start method.
+        :param spread: Default spread window in seconds for all events (default: None, no spread).
+        :param mp_context: multiprocessing context used to start the workers (default: the default context).
+        """
+        self.spread = spread
+        self._lock = threading.Lock()
+        self._handles = itertools.count()
+        self._events = {}
+        context = multiprocessing.get_context() if mp_context is None else mp_context
+        self._shards = []
+        for _ in range(workers or os.cpu_count() or 1):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=_worker_main, args=(worker_connection, queue_factory), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._shards.append(_Shard(connection, process))
+
+    def __len__(self):
+        """
+        Number of events that are neither canceled nor reported ended by their workers.
+        """
+        with self._lock:
+            return len(self._events)
+
+    @property
+    def workers(self):
+        return len(self._shards)
+
+    def shard_of(self, event: Event):
+        """
+        Get the index of the worker that runs an event.
+
+        :param event: The event instance returned by the enter_*() method.
+        """
+        return int(_stable_fraction("shard|" + event.settings.identity()) * len(self._shards))
+
+    def run(self):
+        """
+        Run all scheduled events until completion.
+        Completion means that all events have either been canceled or have reached their end_time.
+        An exception raised by an action stops run() and is raised from it.
+        """
+        with self._lock:
+            for shard in self._shards:
+                shard.send(("run",))
+        pending = {shard.connection: shard for shard in self._shards}
+        while pending:
+            for connection in multiprocessing.connection.wait(list(pending)):
+                shard = pending[connection]
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    raise RuntimeError(f"worker process {shard.process.pid} exited") from None
+                if message[0] == "error":
+                    self._pause()
+                    raise message[1]
+                with self._lock:
+                    self._forget_ended(shard, message[1])
+                    # The worker may have received commands after it went idle.
+                    if message[1] == shard.sent:
+                        del pending[connection]
+
+    def cancel(self, event: Event):
+        """
+        Cancel a scheduled event.
+
+        :param event: The event instance returned by the enter_*() method.
+        """
+        with self._lock:
+            if event.canceled:
+                return
+            event.canceled = True
+            item = self._events.pop(id(event), None)
+            if item is not None:
+                _, shard, handle = item
+                del shard.entered[handle]
+                shard.send(("cancel", handle))
+
+    def close(self):
+        """
+        Cancel all events and stop the worker processes.
+        """
+        with self._lock:
+            for shard in self._shards:
+                if shard.process.is_alive():
+                    shard.send(("stop",))
+            for event, _, _ in self._events.values():
+                event.canceled = True
+            self._events.clear()
+        for shard in self._shards:
+            shard.process.join()
+            shard.connection.close()
+
+    def _add_event(self, event_settings):
+        event = event_settings.event
+        event.settings = event_settings
+        shard = self._shards[self.shard_of(event)]
+        state = {
+            item.name: getattr(event_settings, item.name)
+            for item in dataclasses.fields(event_settings) if item.init and item.name != "event"
+        }
+        if state["action_kwargs"] is _sentinel:
+            state["action_kwargs"] = {}
+        with self._lock:
+            handle = next(self._handles)
+            try:
+                shard.enter(handle, id(event), type(event_settings), state)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                return None
+            self._events[id(event)] = (event, shard, handle)
+        return event
+
+    def _schedule(self, event_settings, next_time):
+        # Events are scheduled and run by the schedulers of the workers.
+        raise RuntimeError("events of a ShardedCalendarScheduler are scheduled by its workers")
+
+    def _run_action(self, event_settings, event_time=None):
+        raise RuntimeError("events of a ShardedCalendarScheduler are run by its workers")
+
+    def _push(self):
+        pass
+
+    def _forget_ended(self, shard, received):
+        """
+        Drop the events which ended in a worker. It reports idle with the number of
+        commands it has received once all events entered by them have ended.
+        """
+        for event_id in shard.ended(received):
+            del self._events[event_id]
+
+    def _pause(self):
+        """
+        Stop the runs of all workers after an error and wait until each of them confirms,
+        so that no action runs after run() has raised. The messages sent before the
+        confirmation are read, so that they are not left in the pipes. Only the first error
+        is raised. The events stay scheduled in the workers until the next run().
+        """
+        shards = []
+        with self._lock:
+            for shard in self._shards:
+                try:
+                    shard.send(("pause",))
+                except OSError:
+                    continue
+                shards.append(shard)
+        for shard in shards:
+            try:
+                while True:
+                    message = shard.connection.recv()
+                    if message[0] == "paused":
+                        break
+                    if message[0] == "idle":
+                        with self._lock:
+                            self._forget_ended(shard, message[1])
+            except (EOFError, OSError):
+                pass
+
+
+class _Shard:
+    """
+    Pipe and process of a worker, and the events entered in it.
+    """
+    def __init__(self, connection, process):
+        self.connection = connection
+        self.process = process
+        self.sent = 0
+        # Handle -> (number of the enter command, event id), in the order of the commands.
+        self.entered = {}
+
+    def send(self, command):
+        self.connection.send(command)
+        self.sent += 1
+
+    def enter(self, handle, event_id, settings_class, state):
+        self.send(("enter", handle, settings_class, state))
+        self.entered[handle] = (self.sent, event_id)
+
+    def ended(self, received):
+        """
+        Remove the events entered by the first received commands.
+
+        :return: Ids of the removed events.
+        """
+        handles = []
+        for handle, (number, _) in self.entered.items():
+            if number > received:
+                break
+            handles.append(handle)
+        return [self.entered.pop(handle)[1] for handle in handles]
+
+
+class _Worker:
+    """
+    Worker process state. Serves as the sleep controller of its scheduler: sleeping waits
+    for commands on the pipe, so they are handled in the scheduler thread between events.
+    """
+    def __init__(self, connection, queue_factory):
+        self._connection = connection
+        self._events = {}
+        self._received = 0
+        self._running = False
+        self._stopped = False
+        self.scheduler = CalendarScheduler(
+            sleep_controller=self, queue=None if queue_factory is None else queue_factory()
+        )
+
+    def sleep(self, seconds):
+        if self._connection.poll(max(seconds, 0)):
+            while self._connection.poll():
+                self._handle(self._connection.recv())
+            if not self._running and not self._stopped:
+                # Paused: leave scheduler.run(), the events stay in its queue.
+                raise _Paused()
+
+    def interrupt(self):
+        pass
+
+    def main(self):
+        while not self._stopped:
+            if self._running:
+                try:
+                    self.scheduler.run()
+                except _Paused:
+                    pass
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    # Pause like CalendarScheduler.run() until the next run command.
+                    self._running = False
+                    self._send_error(error)
+                else:
+                    if self._stopped:
+                        break
+                    # All events have ended or were canceled.
+                    self._events.clear()
+                    self._connection.send(("idle", self._received))
+            try:
+                command = self._connection.recv()
+            except EOFError:
+                break
+            self._handle(command)
+
+    def _handle(self, command):
+        self._received += 1
+        name = command[0]
+        if name == "enter":
+            _, handle, settings_class, state = command
+            event = self.scheduler._add_event(settings_class(event=Event(), **state))  # pylint: disable=protected-access
+            self._events[handle] = event
+        elif name == "cancel":
+            event = self._events.pop(command[1], None)
+            if event is not None:
+                self.scheduler.cancel(event)
+        elif name == "run":
+            self._running = True
+        elif name == "pause":
+            self._running = False
+            self._connection.send(("paused",))
+        elif name == "stop":
+            self._stopped = True
+            for event in self._events.values():
+                self.scheduler.cancel(event)
+            self._events.clear()
+
+    def _send_error(self, error):
+        try:
+            self._connection.send(("error", error))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self._connection.send(("error", RuntimeError(repr(error))))
+
+
+class _Paused(Exception):
+    """
+    Raised by the sleep of a worker to leave the run of its scheduler on a pause command.
+    """
+
+
+def _worker_main(connection, queue_factory):
+    _Worker(connection, queue_factory).main()
@@ -0,0 +1,137 @@
+"""
+Running schedules on simulated time.
+
+The simulated clock jumps to the next due event instead of sleeping, so a year of schedules
+is replayed as fast as the scheduler can compute the fire times. Use it to check schedule
+changes and daylight saving time transitions offline.
+"""
+
+import collections
+from typing import NamedTuple
+
+from .core import CalendarScheduler
+from .rules import Event
+
+
+class SimulatedClock:
+    """
+    Clock and sleep controller for CalendarScheduler that jumps instead of sleeping.
+    Pass clock.time as timefunc and the clock as sleep_controller.
+
+    If stop_time is set, sleeping past it moves the clock to stop_time and raises
+    SimulationStopped, which ends CalendarScheduler.run().
+    """
+    def __init__(self, start_time: float = 0.0):
+        """
+        Initialize the SimulatedClock.
+
+        :param start_time: Initial time in seconds since the epoch (default: 0).
+        """
+        self.now = start_time
+        self.stop_time = None
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        wake_time = self.now + max(seconds, 0)
+        if self.stop_time is not None and wake_time > self.stop_time:
+            self.now = max(self.now, self.stop_time)
+            raise SimulationStopped()
+        self.now = wake_time
+
+    def interrupt(self):
+        pass
+
+
+class SimulationStopped(Exception):
+    """
+    Raised by SimulatedClock.sleep() when the clock reaches its stop_time.
+    """
+
+
+class Fire(NamedTuple):
+    """
+    Occurrence dispatched by SimulatedScheduler.
+    """
+    time: float
+    event: Event
+
+
+class SimulatedScheduler(CalendarScheduler):
+    """
+    Calendar scheduler running on a SimulatedClock.
+
+    Records every dispatched occurrence in the fires list, in the order of dispatch,
+    and counts them per load_interval. By default actions are not called, so production
+    schedules can be replayed without their side effects.
+
+        scheduler = SimulatedScheduler(start_time=datetime.datetime(2025, 1, 1, tzinfo=tz).timestamp())
+        scheduler.enter_daily_event(action=backup, hour=2, minute=30, tz=tz)
+        scheduler.run_until(datetime.datetime(2026, 1, 1, tzinfo=tz).timestamp())
+        print(scheduler.fires[:10], max(scheduler.load().values()))
+    """
+    def __init__(self, start_time: float = 0.0, run_actions: bool = False, log: bool = True,
+                 load_interval: float = 60, **kwargs):
+        """
+        Initialize the SimulatedScheduler.
+
+        :param start_time: Initial time of the clock in seconds since the epoch (default: 0).
+                           Events entered without start_time start at this time.
+        :param run_actions: Call the actions of the events (default: False).
+        :param log: Record the fires list (default: True). Turn it off for long replays
+                    of many events if only the load is needed.
+        :param load_interval: Length of the intervals of load() in seconds (default: 60, per minute).
+        :param kwargs: Other parameters of CalendarScheduler, except timefunc and sleep_controller.
+        """
+        self.clock = SimulatedClock(start_time)
+        super().__init__(timefunc=self.clock.time, sleep_controller=self.clock, **kwargs)
+        self.run_actions = run_actions
+        self.fires = [] if log else None
+        self.load_interval = load_interval
+        self._load = collections.Counter()
+
+    def run_until(self, stop_time: float):
+        """
+        Run the events due up to stop_time inclusive and move the clock to stop_time.
+        Can be called repeatedly to step through time; events can be entered and canceled
+        between the calls.
+
+        :param stop_time: Time in seconds since the epoch.
+        """
+        self.clock.stop_time = stop_time
+        try:
+            self.run()
+        except SimulationStopped:
+            pass
+        finally:
+            self.clock.stop_time = None
+        self.clock.now = max(self.clock.now, stop_time)
+
+    def load(self):
+        """
+        Count the dispatched occurrences per load_interval.
+
+        :return: Dictionary of the counts by interval start time, in the order of time.
+                 Intervals without occurrences are omitted.
+        """
+        return {start * self.load_interval: self._load[start] for start in sorted(self._load)}
+
+    def _record(self, event_settings):
+        now = self.clock.now
+        self._load[int(now // self.load_interval)] += 1
+        if self.fires is not None:
+            self.fires.append(Fire(now, event_settings.event))
+
+    def _run_action(self, event_settings, event_time=None):
+        self._record(event_settings)
+        if self.run_actions:
+            return super()._run_action(event_settings, event_time)
+        return True
+
+    def _run_batch(self, action, items):
+        for event_settings, _ in items:
+            self._record(event_settings)
+        if self.run_actions:
+            return super()._run_batch(action, items)
+        return True
@@ -0,0 +1,445 @@
+"""
+Persistent job stores for the calendar scheduler.
+
+A job is an event entered with a job_id. The store keeps its rule, the importable path of
+its action, its arguments and the time of its last occurrence, so that
+CalendarScheduler.restore() can re-enter all jobs after a restart.
+
+Arguments are stored as JSON, so they must be JSON serializable. Tuples are restored as lists.
+"""
+
+import datetime
+import functools
+import importlib
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from . import tzcache
+from .rules import (
+    MISFIRE_COALESCE, Event, InternalCompoundEvent, InternalCronEvent, InternalDailyEvent,
+    InternalEveryMicrosecondEvent, InternalEveryMillisecondEvent, InternalEveryMinuteEvent,
+    InternalEverySecondEvent, InternalHourlyEvent, InternalMonthlyEvent, InternalRRuleEvent,
+    InternalWeeklyEvent, InternalYearlyEvent, _action_path, _sentinel
+)
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+_KINDS = {
+    InternalEveryMillisecondEvent: "every_millisecond",
+    InternalEveryMicrosecondEvent: "every_microsecond",
+    InternalEverySecondEvent: "every_second",
+    InternalEveryMinuteEvent: "every_minute",
+    InternalHourlyEvent: "hourly",
+    InternalDailyEvent: "daily",
+    InternalWeeklyEvent: "weekly",
+    InternalMonthlyEvent: "monthly",
+    InternalYearlyEvent: "yearly",
+    InternalCronEvent: "cron",
+    InternalRRuleEvent: "rrule",
+    InternalCompoundEvent: "compound",
+}
+
+_SETTINGS_CLASSES = {kind: settings_class for settings_class, kind in _KINDS.items()}
+
+_COMMON_PARAMS = (
+    "start_time", "end_time", "max_concurrent", "misfire_policy", "misfire_grace_time",
+    "misfire_limit", "spread",
+)
+
+_RULE_PARAMS = {
+    "every_millisecond": ("interval",),
+    "every_microsecond": ("interval",),
+    "every_second": ("interval",),
+    "every_minute": ("interval", "second"),
+    "hourly": ("interval", "minute", "second", "tz"),
+    "daily": ("interval", "hour", "minute", "second", "tz"),
+    "weekly": ("interval", "weekday", "hour", "minute", "second", "tz"),
+    "monthly": ("interval", "day", "hour", "minute", "second", "tz"),
+    "yearly": ("interval", "month", "day", "hour", "minute", "second", "tz"),
+    "cron": ("expression", "tz"),
+    "rrule": ("rule", "exdates", "tz"),
+    "compound": ("period", "interval", "hours", "minutes", "seconds", "weekdays", "days", "tz"),
+}
+
+
+@dataclass
+class JobRecord:
+    """
+    Stored job: the arguments of the enter_<kind>_event() call and the last occurrence.
+    """
+    job_id: str
+    kind: str
+    action: str  # "module:qualname"
+    args: list
+    kwargs: dict
+    params: dict = field(default_factory=dict)
+    last_fire_time: Optional[float] = None
+    data: Optional[str] = field(default=None, repr=False, compare=False)  # Cached to_json() result.
+
+    def to_json(self):
+        if self.data is None:
+            self.data = json.dumps({"action": self.action, "args": self.args, "kwargs": self.kwargs, "params": self.params})
+        return self.data
+
+    @classmethod
+    def from_data(cls, job_id, kind, data, last_fire_time=None):
+        """
+        Make a record of the decoded to_json() result.
+        """
+        return cls(job_id, kind, data["action"], data["args"], data["kwargs"], data["params"], last_fire_time)
+
+    @classmethod
+    def from_json(cls, job_id, kind, data, last_fire_time=None):
+        return cls.from_data(job_id, kind, json.loads(data), last_fire_time)
+
+    @classmethod
+    def from_json_many(cls, rows):
+        """
+        Make records of many (job_id, kind, data, last_fire_time) rows.
+        The data of all rows is decoded by one json.loads() call.
+        """
+        rows = list(rows)
+        return [
+            cls.from_data(job_id, kind, data, last_fire_time)
+            for (job_id, kind, _, last_fire_time), data in zip(rows, _loads_many(row[2] for row in rows))
+        ]
+
+    def event_settings(self, spread=None):
+        """
+        Make the settings of the event of the job.
+        The record was made of the settings of a valid event, so the settings are made
+        directly instead of by the validating enter_<kind>_event() method.
+
+        :param spread: Spread of the event if the job has none (default: None).
+        :raises ValueError: If the kind, the action or the time zone cannot be loaded.
+        """
+        settings_class = _SETTINGS_CLASSES.get(self.kind)
+        if settings_class is None:
+            raise ValueError(f"unknown kind of job {self.kind!r}")
+        params = dict(self.params)
+        if "tz" in params:
+            params["tz"] = _load_tz(params["tz"])
+        if self.kind == "every_millisecond":
+            params["interval_ns"] = round(params.pop("interval") * 1_000_000)
+        elif self.kind == "every_microsecond":
+            params["interval_ns"] = params.pop("interval") * 1000
+        elif self.kind == "every_minute":
+            params["interval"] *= 60
+        elif self.kind == "rrule":
+            params["exdates"] = tuple(params["exdates"])
+        elif self.kind == "compound":
+            for name in ("hours", "minutes", "seconds", "weekdays", "days"):
+                params[name] = tuple(params[name])
+        params.setdefault("end_time", None)
+        params.setdefault("spread", spread)
+        return settings_class(
+            Event(), resolve_action(self.action), tuple(self.args), self.kwargs, job_id=self.job_id, **params
+        )
+
+
+@functools.lru_cache(maxsize=1024)
+def resolve_action(path):
+    """
+    Import an action by its path in the form "module:qualname".
+    Results are cached, so restoring many jobs with the same action imports it once.
+
+    :raises ValueError: If the action cannot be imported.
+    """
+    module_name, _, qualname = path.partition(":")
+    try:
+        result = importlib.import_module(module_name)
+        for name in qualname.split("."):
+            result = getattr(result, name)
+    except (ImportError, AttributeError) as error:
+        raise ValueError(f"cannot import action {path!r}") from error
+    return result
+
+
+class JobStore:
+    """
+    Base class of job stores.
+    Subclasses implement save_many(), remove(), load() and _write_fire_times().
+
+    Fire times passed to fired() are buffered and written by flush(). CalendarScheduler
+    calls flush() while it waits for the next event and when run() returns.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fire_times = {}
+
+    def record(self, event_settings):
+        """
+        Make a record of an event entered with a job_id.
+
+        :raises ValueError: If the action is not importable by its path, or the arguments
+                            or the time zone cannot be stored.
+        """
+        kind = _KINDS[type(event_settings)]
+        action = event_settings.action
+        path = _action_path(action)
+        if resolve_action(path) is not action:
+            raise ValueError(f"action {path!r} is not importable by its path")
+        # Values equal to the defaults of the enter methods are not stored.
+        params = {
+            name: getattr(event_settings, name) for name in _COMMON_PARAMS
+            if getattr(event_settings, name) not in (None, MISFIRE_COALESCE)
+        }
+        for name in _RULE_PARAMS[kind]:
+            params[name] = getattr(event_settings, name)
+        if kind == "every_millisecond":
+            params["interval"] = round(event_settings.interval_ns / 1_000_000)
+        elif kind == "every_microsecond":
+            params["interval"] = event_settings.interval_ns // 1000
+        elif kind == "every_minute":
+            params["interval"] = event_settings.interval // 60
+        if "tz" in params:
+            params["tz"] = _dump_tz(params["tz"])
+        action_kwargs = {} if event_settings.action_kwargs is _sentinel else event_settings.action_kwargs
+        record = JobRecord(event_settings.job_id, kind, path, list(event_settings.action_args), dict(action_kwargs), params)
+        try:
+            record.to_json()
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"arguments of job {record.job_id!r} are not JSON serializable") from error
+        return record
+
+    def save_many(self, records):
+        """
+        Add or replace jobs.
+
+        :param records: Iterable of JobRecord.
+        """
+        raise NotImplementedError
+
+    def remove(self, job_id):
+        """
+        Remove a job.
+        """
+        raise NotImplementedError
+
+    def load(self):
+        """
+        Load all jobs.
+
+        :return: List of JobRecord with their last fire times.
+        """
+        raise NotImplementedError
+
+    def fired(self, job_id, fire_time):
+        """
+        Remember the last occurrence of a job. The time is written by flush().
+        """
+        with self._lock:
+            self._fire_times[job_id] = fire_time
+
+    def flush(self):
+        """
+        Write the buffered fire times.
+        """
+        if not self._fire_times:
+            return
+        with self._lock:
+            fire_times, self._fire_times = self._fire_times, {}
+            self._write_fire_times(fire_times)
+
+    def close(self):
+        """
+        Flush the fire times and release the storage.
+        """
+        self.flush()
+
+    def _write_fire_times(self, fire_times):
+        raise NotImplementedError
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store in an SQLite database.
+    """
+    def __init__(self, path, table: str = "calsched_jobs"):
+        """
+        Initialize the SQLiteJobStore.
+
+        :param path: Path of the database file, or ":memory:".
+        :param table: Name of the table for the jobs (default: "calsched_jobs").
+        """
+        super().__init__()
+        self._table = table
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, data TEXT NOT NULL, last_fire_time REAL)"
+        )
+
+    def save_many(self, records):
+        rows = [(record.job_id, record.kind, record.to_json(), record.last_fire_time) for record in records]
+        with self._lock:
+            self._transaction(
+                f"INSERT OR REPLACE INTO {self._table} (job_id, kind, data, last_fire_time) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def remove(self, job_id):
+        with self._lock:
+            self._fire_times.pop(job_id, None)
+            self._connection.execute(f"DELETE FROM {self._table} WHERE job_id = ?", (job_id,))
+
+    def load(self):
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(f"SELECT job_id, kind, data, last_fire_time FROM {self._table}").fetchall()
+        return JobRecord.from_json_many(rows)
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+    def _write_fire_times(self, fire_times):
+        self._transaction(
+            f"UPDATE {self._table} SET last_fire_time = ? WHERE job_id = ?",
+            [(fire_time, job_id) for job_id, fire_time in fire_times.items()]
+        )
+
+    def _transaction(self, sql, rows):
+        self._connection.execute("BEGIN")
+        try:
+            self._connection.executemany(sql, rows)
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+
+class FileJobStore(JobStore):
+    """
+    Job store in an append-only file of JSON lines.
+    Every change appends a line, load() replays them. compact() rewrites the file
+    with one line per job. The job data is embedded in the line as a JSON object,
+    so it is decoded together with the line.
+    """
+    def __init__(self, path):
+        """
+        Initialize the FileJobStore.
+
+        :param path: Path of the file. It is created if it does not exist.
+        """
+        super().__init__()
+        self._path = path
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def save_many(self, records):
+        self._append([_save_line(record) for record in records])
+
+    def remove(self, job_id):
+        with self._lock:
+            self._fire_times.pop(job_id, None)
+        self._append([json.dumps({"op": "remove", "job_id": job_id})])
+
+    def load(self):
+        self.flush()
+        with self._lock:
+            return list(self._replay().values())
+
+    def compact(self):
+        """
+        Rewrite the file with the current jobs only.
+        """
+        self.flush()
+        with self._lock:
+            records = list(self._replay().values())
+            self._file.close()
+            temporary_path = self._path + ".tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                for record in records:
+                    file.write(_save_line(record) + "\n")
+            os.replace(temporary_path, self._path)
+            self._file = open(self._path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+    def _write_fire_times(self, fire_times):
+        self._append_locked([json.dumps({"op": "fired", "times": fire_times})])
+
+    def _append(self, lines):
+        with self._lock:
+            self._append_locked(lines)
+
+    def _append_locked(self, lines):
+        self._file.write("".join(line + "\n" for line in lines))
+        self._file.flush()
+
+    def _replay(self):
+        with open(self._path, encoding="utf-8") as file:
+            changes = _loads_many(line for line in file if line.strip())
+        records = {}
+        for change in changes:
+            operation = change["op"]
+            if operation == "save":
+                data = change["data"]
+                if isinstance(data, str):  # Lines of older versions hold the data as a JSON string.
+                    data = json.loads(data)
+                records[change["job_id"]] = JobRecord.from_data(
+                    change["job_id"], change["kind"], data, change["last_fire_time"]
+                )
+            elif operation == "remove":
+                records.pop(change["job_id"], None)
+            elif operation == "fired":
+                for job_id, fire_time in change["times"].items():
+                    if job_id in records:
+                        records[job_id].last_fire_time = fire_time
+        return records
+
+
+def _save_line(record):
+    """
+    Line of FileJobStore saving a job. The cached to_json() result is embedded as is.
+    """
+    header = json.dumps({
+        "op": "save", "job_id": record.job_id, "kind": record.kind, "last_fire_time": record.last_fire_time
+    })
+    return header[:-1] + ', "data": ' + record.to_json() + "}"
+
+
+def _loads_many(documents):
+    """
+    Decode many JSON documents with one json.loads() call, which is faster than a call for each.
+    """
+    return json.loads("[" + ",".join(documents) + "]")
+
+
+def _dump_tz(tz):
+    if tz is None:
+        return None
+    offset = tzcache.fixed_offset(tz)
+    if offset is not None:
+        return {"offset": offset}
+    key = getattr(tz, "key", None) or getattr(tz, "zone", None)
+    if key is None:
+        raise ValueError(f"time zone {tz!r} cannot be stored")
+    return {"zone": key}
+
+
+def _load_tz(value):
+    if value is None:
+        return None
+    if "offset" in value:
+        if value["offset"] == 0:
+            return datetime.timezone.utc
+        return datetime.timezone(datetime.timedelta(seconds=value["offset"]))
+    if zoneinfo is None:
+        raise ValueError(f"time zone {value['zone']!r} requires zoneinfo")
+    try:
+        return zoneinfo.ZoneInfo(value["zone"])
+    except zoneinfo.ZoneInfoNotFoundError as error:
+        raise ValueError(f"time zone {value['zone']!r} is not found") from error
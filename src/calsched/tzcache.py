@@ -0,0 +1,155 @@
+"""
+Cache of UTC offset transitions of time zones.
+
+The time line is split into windows of WINDOW_SECONDS. For every (tzinfo, window) pair
+the UTC offset is probed once a day, and each change of the offset is located to the
+second by bisection. Windows are computed lazily and kept in bounded LRU caches, so
+the memory use does not depend on the number of events or on the time range.
+
+Transitions closer than PROBE_SECONDS to each other may be missed. Real time zones
+do not have them.
+"""
+
+import datetime
+import functools
+import time
+
+
+WINDOW_SECONDS = 1 << 22  # About 48.5 days.
+PROBE_SECONDS = 86400
+# A wall clock time is unambiguous if there is no transition within this distance,
+# because no transition moves the clock by more than 26 hours.
+MARGIN_SECONDS = 2 * 86400
+# How many windows to look through for the neighbouring transitions.
+SEARCH_WINDOWS = 8
+
+
+def utc_offset(tz, timestamp):
+    """
+    Get the UTC offset of a time zone at a moment.
+
+    :param tz: Time zone. If None, the local time zone is used.
+    :param timestamp: POSIX timestamp.
+    :return: Offset in seconds.
+    """
+    if tz is None:
+        return time.localtime(timestamp).tm_gmtoff
+    return datetime.datetime.fromtimestamp(timestamp, tz).utcoffset().total_seconds()
+
+
+def fixed_offset(tz):
+    """
+    Get the UTC offset of a time zone which never changes it.
+
+    Only datetime.timezone is known to be fixed. Other tzinfo classes may return their
+    standard offset from utcoffset(None) and still observe daylight saving time.
+
+    :param tz: Time zone or None.
+    :return: Offset in seconds, or None if the offset may change.
+    """
+    if isinstance(tz, datetime.timezone):
+        return tz.utcoffset(None).total_seconds()
+    return None
+
+
+def offset_span(tz, timestamp):
+    """
+    Find the span of time around a moment where the UTC offset of a time zone is constant.
+
+    Every moment of the span is at least MARGIN_SECONDS away from the transitions, so any
+    wall clock time that maps into the span with the span offset is unambiguous.
+
+    :param tz: Time zone. If None, the local time zone is used.
+    :param timestamp: POSIX timestamp.
+    :return: Tuple (start, end, offset), where start <= timestamp <= end, or None if
+             the moment is close to a transition or the offset cannot be computed.
+    """
+    try:
+        for span in _spans(tz, int(timestamp // WINDOW_SECONDS)):
+            if span[0] <= timestamp <= span[1]:
+                return span
+    except (TypeError, ValueError, OverflowError, OSError):
+        # Unhashable tzinfo or a time outside of the platform range.
+        pass
+    return None
+
+
+def cache_clear():
+    """
+    Drop all cached windows.
+    """
+    _spans.cache_clear()
+    _window.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def _spans(tz, index):
+    """
+    Spans of constant offset which intersect one window.
+    """
+    first_offset, transitions, offsets = _window(tz, index)
+    previous, following = _neighbours(tz, index)
+    bounds = (previous,) + transitions + (following,)
+    span_offsets = (first_offset,) + offsets
+    spans = []
+    for start, end, offset in zip(bounds, bounds[1:], span_offsets):
+        start += MARGIN_SECONDS
+        end -= MARGIN_SECONDS
+        if start <= end:
+            spans.append((start, end, offset))
+    return tuple(spans)
+
+
+def _neighbours(tz, index):
+    """
+    The last transition before a window and the first one after it. Where there is none
+    within SEARCH_WINDOWS, the bound of the searched range is used instead.
+    """
+    window_start = index * WINDOW_SECONDS
+    previous = window_start - SEARCH_WINDOWS * WINDOW_SECONDS
+    for back in range(index - 1, index - SEARCH_WINDOWS - 1, -1):
+        back_transitions = _window(tz, back)[1]
+        if back_transitions:
+            previous = back_transitions[-1]
+            break
+    following = window_start + (SEARCH_WINDOWS + 1) * WINDOW_SECONDS
+    for forward in range(index + 1, index + SEARCH_WINDOWS + 1):
+        forward_transitions = _window(tz, forward)[1]
+        if forward_transitions:
+            following = forward_transitions[0]
+            break
+    return previous, following
+
+
+@functools.lru_cache(maxsize=4096)
+def _window(tz, index):
+    """
+    Offsets of a time zone in one window.
+
+    :return: (offset at the window start, times of transitions, offsets after them).
+    """
+    start = index * WINDOW_SECONDS
+    end = start + WINDOW_SECONDS
+    first_offset = utc_offset(tz, start)
+    transitions = []
+    offsets = []
+    previous_time = start
+    previous_offset = first_offset
+    probe = start
+    while probe < end:
+        probe = min(probe + PROBE_SECONDS, end)
+        offset = utc_offset(tz, probe)
+        if offset != previous_offset:
+            # The offset changes in (previous_time, probe].
+            low, high = previous_time, probe
+            while high - low > 1:
+                middle = (low + high) // 2
+                if utc_offset(tz, middle) == previous_offset:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append(high)
+            offsets.append(offset)
+            previous_offset = offset
+        previous_time = probe
+    return first_offset, tuple(transitions), tuple(offsets)
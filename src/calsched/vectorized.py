@@ -0,0 +1,151 @@
+"""
+Vectorized fire time computation for many events at once.
+
+Requires NumPy, which can be installed with the numpy extra:
+
+    pip install calsched[numpy]
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+SECONDS_IN_MINUTE = 60
+SECONDS_IN_HOUR = 3600
+SECONDS_IN_DAY = 86400
+SECONDS_IN_WEEK = 604800
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday.
+
+NANOSECONDS_IN_SECOND = 1_000_000_000
+
+KINDS = ("microsecond", "millisecond", "second", "minute", "hourly", "daily", "weekly", "monthly", "yearly")
+
+
+def next_fire_times(
+        kind: str,
+        start,
+        count: int,
+        interval=1,
+        second=0,
+        minute=0,
+        hour=0,
+        weekday=0,
+        day=1,
+        month=1,
+        tz_offset=0
+):
+    """
+    Compute the first fire times of many events of one kind in a single vectorized pass.
+
+    Every rule parameter can be a scalar or a 1-D array, all arrays are broadcast to
+    the number of events. Row i of the result holds the same times as the first `count`
+    values of CalendarScheduler.occurrences() for an event entered with the i-th parameters,
+    start_time=start and tz=datetime.timezone(datetime.timedelta(seconds=tz_offset)).
+
+    :param kind: Event kind: "microsecond", "millisecond", "second", "minute", "hourly", "daily",
+                 "weekly", "monthly" or "yearly", matching the enter_*_event() methods.
+    :param start: Start time as a POSIX timestamp.
+    :param count: Number of fire times per event.
+    :param interval: Interval in units of the kind (microseconds for "microsecond",
+                     milliseconds for "millisecond").
+    :param second: Second of the minute. Range: 0-59.
+    :param minute: Minute of the hour. Range: 0-59.
+    :param hour: Hour of the day. Range: 0-23.
+    :param weekday: Day of the week, where Monday is 0, and Sunday is 6.
+    :param day: Day of the month. Range: 1-31. Clamped to the last day of shorter months.
+    :param month: Month. Range: 1-12.
+    :param tz_offset: UTC offset of the time zone in seconds (default: 0, UTC).
+    :return: Array of shape (number of events, count) with POSIX timestamps.
+    """
+    if np is None:
+        raise ImportError("calsched.vectorized requires NumPy: pip install calsched[numpy]")
+    if kind not in KINDS:
+        raise ValueError(f"unknown event kind: {kind!r}")
+
+    start, interval, second, minute, hour, weekday, day, month, tz_offset = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value)) for value in (
+            start, interval, second, minute, hour, weekday, day, month, tz_offset
+        ))
+    )
+    start = start.astype(np.float64)
+    interval = interval.astype(np.int64)
+    steps = np.arange(count, dtype=np.int64)
+
+    if kind in ("microsecond", "millisecond"):
+        return _sub_second_times(start, interval * (1000 if kind == "microsecond" else 1_000_000), steps)
+
+    if kind in ("second", "minute"):
+        tz_offset = np.zeros_like(tz_offset)  # These rules do not depend on the time zone.
+    local = start + tz_offset
+    if kind in ("monthly", "yearly"):
+        return _month_times(kind, local, steps, interval, day, month, hour, minute, second) - tz_offset[:, None]
+    first, period = _first_time(kind, local, interval, weekday, hour, minute, second)
+    return (first - tz_offset)[:, None] + steps[None, :] * period[:, None]
+
+
+def _sub_second_times(start, interval_ns, steps):
+    """
+    Compute the times in integer nanoseconds from the start, as InternalEveryMillisecondEvent does.
+    """
+    whole = np.floor(start)
+    start_ns = np.rint((start - whole) * 1e9).astype(np.int64)
+    offsets = start_ns[:, None] + (steps + 1)[None, :] * interval_ns[:, None]
+    seconds, rest = np.divmod(offsets, NANOSECONDS_IN_SECOND)
+    return (whole[:, None] + seconds) + rest / 1e9
+
+
+def _first_time(kind, local, interval, weekday, hour, minute, second):
+    """
+    Get the first local fire time at or after local and the constant period of the rules
+    from "second" to "weekly".
+    """
+    if kind == "second":
+        period = interval
+        first = np.floor(local)
+    elif kind == "minute":
+        period = interval * SECONDS_IN_MINUTE
+        first = np.floor(local / SECONDS_IN_MINUTE) * SECONDS_IN_MINUTE + second
+    elif kind == "hourly":
+        period = interval * SECONDS_IN_HOUR
+        first = np.floor(local / SECONDS_IN_HOUR) * SECONDS_IN_HOUR + minute * SECONDS_IN_MINUTE + second
+    elif kind == "daily":
+        period = interval * SECONDS_IN_DAY
+        first = np.floor(local / SECONDS_IN_DAY) * SECONDS_IN_DAY + _time_of_day(hour, minute, second)
+    else:
+        period = interval * SECONDS_IN_WEEK
+        days = np.floor(local / SECONDS_IN_DAY).astype(np.int64)
+        days_ahead = (weekday - (days + EPOCH_WEEKDAY)) % 7
+        first = (days + days_ahead) * SECONDS_IN_DAY + _time_of_day(hour, minute, second)
+    return np.where(first < local, first + period, first), period
+
+
+def _month_times(kind, local, steps, interval, day, month, hour, minute, second):
+    """
+    Compute the local fire times of monthly and yearly rules by walking over month indexes
+    counted from January 1970.
+    """
+    time_of_day = _time_of_day(hour, minute, second)
+    current_month = np.floor(local / SECONDS_IN_DAY).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if kind == "monthly":
+        first_month = current_month
+        month_step = interval
+    else:
+        first_month = current_month // 12 * 12 + (month - 1)
+        month_step = interval * 12
+    first = _month_day_time(first_month, day, time_of_day)
+    first_month = np.where(first < local, first_month + month_step, first_month)
+    months = first_month[:, None] + steps[None, :] * month_step[:, None]
+    return _month_day_time(months, day[:, None], time_of_day[:, None])
+
+
+def _time_of_day(hour, minute, second):
+    return hour * SECONDS_IN_HOUR + minute * SECONDS_IN_MINUTE + second
+
+
+def _month_day_time(months, day, time_of_day):
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    next_month_start = (months + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    limit_day = np.minimum(day, next_month_start - month_start)
+    return (month_start + limit_day - 1) * float(SECONDS_IN_DAY) + time_of_day
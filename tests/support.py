@@ -0,0 +1,75 @@
+import datetime
+
+
+UTC = datetime.timezone.utc
+
+
+def timestamp(*args, tz=UTC):
+    return datetime.datetime(*args, tzinfo=tz).timestamp()
+
+
+class TestTimeController:
+    """
+    Virtual clock for the schedulers: sleep() advances the clock instantly.
+    """
+
+    def __init__(self, clock=0.0):
+        self.clock = clock
+
+    def sleep(self, seconds):
+        self.clock += seconds
+
+    def interrupt(self):
+        pass
+
+    def get_clock(self):
+        return self.clock
+
+
+class USEasternTime(datetime.tzinfo):
+    """
+    US Eastern time like the USTimeZone example of the datetime documentation.
+    Like many tzinfo classes, it returns the standard offset from utcoffset(None).
+    """
+
+    STANDARD = datetime.timedelta(hours=-5)
+    HOUR = datetime.timedelta(hours=1)
+
+    @staticmethod
+    def _dst_range(year):
+        # Since 2007 daylight saving time starts at 2:00 on the second Sunday in March
+        # and ends at 2:00 on the first Sunday in November.
+        start = datetime.datetime(year, 3, 8, 2)
+        start += datetime.timedelta(days=6 - start.weekday())
+        end = datetime.datetime(year, 11, 1, 2)
+        end += datetime.timedelta(days=6 - end.weekday())
+        return start, end
+
+    def utcoffset(self, dt):
+        return self.STANDARD + self.dst(dt)
+
+    def dst(self, dt):
+        if dt is None or dt.tzinfo is None:
+            return datetime.timedelta(0)
+        start, end = self._dst_range(dt.year)
+        dt = dt.replace(tzinfo=None)
+        if start + self.HOUR <= dt < end - self.HOUR:
+            return self.HOUR
+        if end - self.HOUR <= dt < end:
+            return datetime.timedelta(0) if dt.fold else self.HOUR
+        if start <= dt < start + self.HOUR:
+            return self.HOUR if dt.fold else datetime.timedelta(0)
+        return datetime.timedelta(0)
+
+    def fromutc(self, dt):
+        start, end = self._dst_range(dt.year)
+        standard_time = dt.replace(tzinfo=None) + self.STANDARD
+        dst_time = standard_time + self.HOUR
+        if end <= dst_time < end + self.HOUR:
+            return standard_time.replace(tzinfo=self, fold=1)
+        if standard_time < start or dst_time >= end:
+            return standard_time.replace(tzinfo=self)
+        return dst_time.replace(tzinfo=self)
+
+    def tzname(self, dt):
+        return "EDT" if self.dst(dt) else "EST"
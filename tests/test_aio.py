@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from calsched import AsyncCalendarScheduler
+
+
+class TestAsyncCalendarScheduler(unittest.TestCase):
+    def test_sync_action(self):
+        clocks = []
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+
+            def action():
+                clocks.append(time.time())
+                if len(clocks) >= 5:
+                    scheduler.cancel(event)
+
+            event = scheduler.enter_every_millisecond_event(action=action, interval=20)
+            await scheduler.run()
+
+        asyncio.run(main())
+        self.assertEqual(5, len(clocks))
+        for i in range(4):
+            self.assertAlmostEqual(clocks[i+1] - clocks[i], 0.02, delta=0.015, msg=clocks)
+
+    def test_coroutine_action(self):
+        finished = []
+
+        async def action(name):
+            await asyncio.sleep(0.03)
+            finished.append(name)
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            start_time = time.time()
+            scheduler.enter_every_millisecond_event(
+                action=action, action_args=("a",), interval=10, start_time=start_time, end_time=start_time + 0.035
+            )
+            await scheduler.run()
+            return list(finished)
+
+        self.assertEqual(["a"] * 3, asyncio.run(main()))
+
+    def test_enter_while_running(self):
+        fired = []
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            start_time = time.time()
+
+            def enter_more():
+                scheduler.enter_every_millisecond_event(
+                    action=fired.append, action_args=("late",), interval=10, end_time=time.time() + 0.025
+                )
+
+            scheduler.enter_every_millisecond_event(action=enter_more, interval=10, start_time=start_time, end_time=start_time + 0.015)
+            await scheduler.run()
+
+        asyncio.run(main())
+        self.assertEqual(["late", "late"], fired)
+
+    def test_cancel_before_run(self):
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            event = scheduler.enter_hourly_event(action=print)
+            scheduler.cancel(event)
+            await asyncio.wait_for(scheduler.run(), 1.0)
+
+        asyncio.run(main())
+
+    def test_cancel_many_before_run(self):
+        fired = []
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            events = []
+
+            def action(i):
+                fired.append(i)
+                scheduler.cancel(events[i])
+
+            for i in range(20000):
+                events.append(scheduler.enter_every_millisecond_event(action=action, action_args=(i,), interval=10))
+            for event in events[1:]:
+                scheduler.cancel(event)
+            await asyncio.wait_for(scheduler.run(), 5.0)
+
+        asyncio.run(main())
+        self.assertEqual([0], fired)
+
+    def test_exception(self):
+        async def failing():
+            raise ValueError("boom")
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            scheduler.enter_every_second_event(action=failing)
+            await scheduler.run()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(main())
+
+    def test_exception_disarms_events(self):
+        fired = []
+
+        def failing():
+            raise ValueError("boom")
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            start_time = time.time()
+            scheduler.enter_every_millisecond_event(action=failing, interval=10, start_time=start_time + 0.02)
+            scheduler.enter_every_millisecond_event(
+                action=fired.append, action_args=(1,), interval=10, start_time=start_time, end_time=start_time + 0.1
+            )
+            with self.assertRaises(ValueError):
+                await scheduler.run()
+            count = len(fired)
+            await asyncio.sleep(0.05)
+            self.assertEqual(count, len(fired))
+
+        asyncio.run(main())
+
+    def test_max_concurrent(self):
+        running = []
+
+        async def action():
+            running.append(1)
+            await asyncio.sleep(0.05)
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            start_time = time.time()
+            scheduler.enter_every_millisecond_event(
+                action=action, interval=10, start_time=start_time, end_time=start_time + 0.045, max_concurrent=1
+            )
+            await scheduler.run()
+
+        asyncio.run(main())
+        self.assertEqual(1, len(running))
+
+    def test_many_events_without_threads(self):
+        # Occurrences may be coalesced when the loop falls behind, so only the events are counted.
+        fired = set()
+        threads = threading.active_count()
+        thread_counts = set()
+
+        def action(i):
+            fired.add(i)
+            thread_counts.add(threading.active_count())
+
+        async def main():
+            scheduler = AsyncCalendarScheduler()
+            # Entering the events may take longer than an interval on a slow machine.
+            start_time = time.time() + 0.5
+            for i in range(3000):
+                scheduler.enter_every_millisecond_event(
+                    action=action, action_args=(i,), interval=50, start_time=start_time, end_time=start_time + 0.12
+                )
+            await scheduler.run()
+
+        asyncio.run(main())
+        self.assertEqual(set(range(3000)), fired)
+        self.assertEqual({threads}, thread_counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
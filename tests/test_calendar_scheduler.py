@@ -1,24 +1,14 @@
 import datetime
+import itertools
+import sys
 import threading
 import unittest
 import time
 from time import sleep
 
-from calsched import CalendarScheduler
-
-
-class TestTimeController:
-    def __init__(self):
-        self.clock = 0.0
+from support import TestTimeController
 
-    def sleep(self, seconds):
-        self.clock += seconds
-
-    def interrupt(self):
-        pass
-
-    def get_clock(self):
-        return self.clock
+from calsched import CalendarScheduler
 
 
 class TestEveryMillisecond(unittest.TestCase):
@@ -58,6 +48,47 @@ class TestEveryMillisecond(unittest.TestCase):
 
         self.assertEqual([0.001, 0.002, 0.003], clocks)
 
+    def test_phase_kept(self):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_every_millisecond_event(action=print, interval=10, start_time=1.7e9)
+        scheduler.cancel(event)
+        settings = event.settings
+        # A year of 10 ms occurrences later, occurrences still fall on whole seconds.
+        run_time = 1.7e9 + 365 * 86400
+        self.assertEqual(run_time + 0.01, settings.next_time(run_time, False))
+        self.assertEqual(run_time, settings.next_time(run_time, True))
+        self.assertEqual(run_time + 1, settings.next_time(run_time + 0.99, False))
+        run_time = settings.next_time(run_time + 0.005, False)
+        for _ in range(100):
+            run_time = settings.next_time(run_time, False)
+        self.assertEqual(1.7e9 + 365 * 86400 + 1.01, run_time)
+
+    def test_start_time_ns(self):
+        scheduler = CalendarScheduler()
+        before = time.time_ns()
+        event = scheduler.enter_every_millisecond_event(action=print, interval=1)
+        scheduler.cancel(event)
+        self.assertLessEqual(before, event.settings.start_ns)
+        self.assertEqual(event.settings.start_ns / 10 ** 9, event.settings.start_time)
+
+
+class TestEveryMicrosecond(unittest.TestCase):
+    def test_interval(self):
+        time_controller = TestTimeController()
+        time_controller.clock = 1.7e9
+        clocks = []
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        scheduler.enter_every_microsecond_event(
+            action=lambda: clocks.append(time_controller.get_clock()), interval=250, end_time=1.7e9 + 0.001
+        )
+        scheduler.run()
+        self.assertEqual([(1_700_000_000 * 10 ** 9 + k * 250_000) / 10 ** 9 for k in (1, 2, 3)], clocks)
+
+    def test_invalid_interval(self):
+        scheduler = CalendarScheduler()
+        self.assertIsNone(scheduler.enter_every_microsecond_event(action=print, interval=0))
+        self.assertIsNone(scheduler.enter_every_microsecond_event(action=print, interval=2.5))
+
 
 class TestEverySecond(unittest.TestCase):
     def test_interval_default(self):
@@ -809,6 +840,83 @@ class TestRunForever(unittest.TestCase):
         self.assertAlmostEqual(1.0, run_duration, delta=0.1)
 
 
+class TestEventLock(unittest.TestCase):
+    def test_events_have_own_locks(self):
+        scheduler = CalendarScheduler()
+        first = scheduler.enter_hourly_event(action=lambda: None)
+        second = scheduler.enter_hourly_event(action=lambda: None)
+        self.assertIsNot(first.lock, second.lock)
+        with first.lock:
+            scheduler.cancel(second)
+        self.assertTrue(second.canceled)
+        scheduler.cancel(first)
+
+    def test_schedulers_have_own_sleep_controllers(self):
+        self.assertIsNot(CalendarScheduler().sleep_controller, CalendarScheduler().sleep_controller)
+
+
+class TestCompactEvents(unittest.TestCase):
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclass slots require Python 3.10")
+    def test_no_instance_dict(self):
+        scheduler = CalendarScheduler()
+        events = [
+            scheduler.enter_every_millisecond_event(action=print, interval=10),
+            scheduler.enter_daily_event(action=print, tz=datetime.timezone.utc),
+            scheduler.enter_cron_event(print, "0 * * * *"),
+            scheduler.enter_rrule_event(print, "FREQ=DAILY;COUNT=3", exdates=[0.0]),
+            scheduler.enter_compound_event(print, "daily", hours=(8, 18)),
+        ]
+        for event in events:
+            self.assertFalse(hasattr(event, "__dict__"))
+            self.assertFalse(hasattr(event.settings, "__dict__"), event.settings)
+            scheduler.cancel(event)
+
+
+class TestOccurrences(unittest.TestCase):
+    def assert_matches_run(self, enter, count):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        clocks = []
+        events = []
+
+        def action():
+            clocks.append(time_controller.get_clock())
+            if len(clocks) >= count:
+                scheduler.cancel(events[0])
+
+        events.append(enter(scheduler, action))
+        preview = list(itertools.islice(scheduler.occurrences(events[0]), count))
+        scheduler.run()
+        self.assertEqual(clocks, preview)
+
+    def test_matches_run(self):
+        utc = datetime.timezone.utc
+        self.assert_matches_run(lambda s, a: s.enter_every_millisecond_event(action=a, interval=30), 10)
+        self.assert_matches_run(lambda s, a: s.enter_every_second_event(action=a, interval=7, start_time=3.5), 10)
+        self.assert_matches_run(lambda s, a: s.enter_every_minute_event(action=a, second=15, interval=2), 10)
+        self.assert_matches_run(lambda s, a: s.enter_hourly_event(action=a, minute=5, interval=3, tz=utc), 10)
+        self.assert_matches_run(lambda s, a: s.enter_daily_event(action=a, hour=1, interval=2, tz=utc, start_time=3600), 10)
+        self.assert_matches_run(lambda s, a: s.enter_weekly_event(action=a, weekday=3, tz=utc), 10)
+        self.assert_matches_run(lambda s, a: s.enter_monthly_event(action=a, day=31, tz=utc), 14)
+        self.assert_matches_run(lambda s, a: s.enter_yearly_event(action=a, month=2, day=29, tz=utc), 6)
+
+    def test_range(self):
+        scheduler = CalendarScheduler()
+        utc = datetime.timezone.utc
+        start = datetime.datetime(2024, 1, 1, tzinfo=utc).timestamp()
+        event = scheduler.enter_daily_event(action=print, hour=12, tz=utc, start_time=start)
+        scheduler.cancel(event)
+        preview = list(scheduler.occurrences(event, start=start + 10 * 86400, end=start + 13 * 86400))
+        self.assertEqual([start + day * 86400 + 12 * 3600 for day in (10, 11, 12)], preview)
+
+    def test_end_time(self):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_every_second_event(action=print, start_time=100, end_time=105)
+        scheduler.cancel(event)
+        self.assertEqual([100, 101, 102, 103, 104], list(scheduler.occurrences(event)))
+        self.assertEqual([102, 103], list(scheduler.occurrences(event, start=102, end=104)))
+
+
 class TestTimeParameters(unittest.TestCase):
     def setUp(self):
         self.scheduler = CalendarScheduler()
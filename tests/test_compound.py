@@ -0,0 +1,112 @@
+import datetime
+import itertools
+import unittest
+
+from support import UTC, TestTimeController, timestamp
+
+from calsched import CalendarScheduler
+from calsched.queues import HeapQueue
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+class TestCompoundEvent(unittest.TestCase):
+    def fire_times(self, start, count=4, tz=UTC, **kwargs):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_compound_event(print, start_time=start, tz=tz, **kwargs)
+        scheduler.cancel(event)
+        return [
+            datetime.datetime.fromtimestamp(time, tz).replace(tzinfo=None)
+            for time in itertools.islice(scheduler.occurrences(event), count)
+        ]
+
+    def test_daily(self):
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 1, 12), datetime.datetime(2025, 1, 1, 18),
+             datetime.datetime(2025, 1, 2, 8), datetime.datetime(2025, 1, 2, 12)],
+            self.fire_times(timestamp(2025, 1, 1, 12), period="daily", hours=[18, 8, 12, 8])
+        )
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 1, 8, 0), datetime.datetime(2025, 1, 1, 8, 30),
+             datetime.datetime(2025, 1, 1, 9, 0), datetime.datetime(2025, 1, 1, 9, 30),
+             datetime.datetime(2025, 1, 3, 8, 0)],
+            self.fire_times(timestamp(2025, 1, 1), 5, period="daily", interval=2, hours=(8, 9), minutes=(0, 30))
+        )
+
+    def test_hourly(self):
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 1, 0, 45, 10), datetime.datetime(2025, 1, 1, 1, 15),
+             datetime.datetime(2025, 1, 1, 1, 15, 10), datetime.datetime(2025, 1, 1, 1, 45)],
+            self.fire_times(
+                timestamp(2025, 1, 1, 0, 45, 5), period="hourly", hours=(5,), minutes={15, 45}, seconds=(0, 10)
+            )
+        )
+
+    def test_weekly(self):
+        # 2025-01-01 was a Wednesday.
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 3, 9), datetime.datetime(2025, 1, 3, 17),
+             datetime.datetime(2025, 1, 6, 9), datetime.datetime(2025, 1, 6, 17)],
+            self.fire_times(timestamp(2025, 1, 1, 10), period="weekly", weekdays=(0, 4), hours=(9, 17))
+        )
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 5), datetime.datetime(2025, 1, 13), datetime.datetime(2025, 1, 19)],
+            self.fire_times(timestamp(2025, 1, 1), 3, period="weekly", interval=2, weekdays=(6, 0))
+        )
+
+    def test_monthly(self):
+        # Day 31 falls on the last day of shorter months and is not repeated after day 30.
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 15, 6), datetime.datetime(2025, 1, 30, 6),
+             datetime.datetime(2025, 1, 31, 6), datetime.datetime(2025, 2, 15, 6),
+             datetime.datetime(2025, 2, 28, 6), datetime.datetime(2025, 3, 15, 6)],
+            self.fire_times(timestamp(2025, 1, 1), 6, period="monthly", days=(15, 30, 31), hours=(6,))
+        )
+        self.assertEqual(
+            [datetime.datetime(2026, 1, 1), datetime.datetime(2026, 4, 1), datetime.datetime(2026, 7, 1)],
+            self.fire_times(timestamp(2025, 10, 2), 3, period="monthly", interval=3)
+        )
+
+    def test_invalid(self):
+        scheduler = CalendarScheduler()
+        self.assertIsNone(scheduler.enter_compound_event(print, "yearly"))
+        self.assertIsNone(scheduler.enter_compound_event(print, "daily", hours=()))
+        self.assertIsNone(scheduler.enter_compound_event(print, "daily", hours=(8, 24)))
+        self.assertIsNone(scheduler.enter_compound_event(print, "weekly", weekdays=(7,)))
+        self.assertIsNone(scheduler.enter_compound_event(print, "monthly", days=(0,)))
+        self.assertIsNone(scheduler.enter_compound_event(print, "daily", minutes=None))
+        self.assertIsNone(scheduler.enter_compound_event(print, "daily", hours="12"))
+        self.assertIsNone(scheduler.enter_compound_event(print, "monthly", days=b"12"))
+        self.assertIsNone(scheduler.enter_compound_event(print, "daily", interval=0))
+
+    @unittest.skipIf(zoneinfo is None, "zoneinfo is not available")
+    def test_daylight_saving_time(self):
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        # 02:30 does not exist on 2025-03-30.
+        self.assertEqual(
+            [datetime.datetime(2025, 3, 30, 1, 30), datetime.datetime(2025, 3, 30, 3, 30),
+             datetime.datetime(2025, 3, 31, 1, 30), datetime.datetime(2025, 3, 31, 2, 30)],
+            self.fire_times(timestamp(2025, 3, 30, tz=tz), tz=tz, period="daily", hours=(1, 2), minutes=(30,))
+        )
+
+
+class TestCompoundEventRun(unittest.TestCase):
+    def test_single_queue_entry(self):
+        time_controller = TestTimeController(timestamp(2025, 1, 1))
+        clocks = []
+        queue = HeapQueue()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller, queue=queue)
+        scheduler.enter_compound_event(
+            lambda: clocks.append(time_controller.get_clock()), "daily", hours=(8, 12, 18),
+            end_time=timestamp(2025, 1, 3), tz=UTC
+        )
+        self.assertEqual(1, len(queue))
+        scheduler.run()
+        self.assertEqual([timestamp(2025, 1, day, hour) for day in (1, 2) for hour in (8, 12, 18)], clocks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import datetime
+import itertools
+import unittest
+
+from support import UTC, TestTimeController, timestamp
+
+from calsched import CalendarScheduler
+from calsched.cron import CronExpression, compile_cron
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+class TestCronExpression(unittest.TestCase):
+    def fire_times(self, expression, start, count=4, tz=UTC):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_cron_event(print, expression, start_time=start, tz=tz)
+        scheduler.cancel(event)
+        return [
+            datetime.datetime.fromtimestamp(time, tz).replace(tzinfo=None)
+            for time in itertools.islice(scheduler.occurrences(event), count)
+        ]
+
+    def test_fields(self):
+        start = timestamp(2025, 1, 1)
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 1, 9, 0), datetime.datetime(2025, 1, 1, 9, 15),
+             datetime.datetime(2025, 1, 1, 9, 30), datetime.datetime(2025, 1, 1, 9, 45)],
+            self.fire_times("*/15 9-17 * * mon-fri", start)
+        )
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 1, 2, 30), datetime.datetime(2025, 1, 15, 2, 30),
+             datetime.datetime(2025, 2, 1, 2, 30), datetime.datetime(2025, 2, 15, 2, 30)],
+            self.fire_times("30 2 1,15 * *", start)
+        )
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 5, 4, 5), datetime.datetime(2025, 1, 12, 4, 5)],
+            self.fire_times("5 4 * * 7", start, count=2)
+        )
+        self.assertEqual(
+            [datetime.datetime(2025, 3, 1), datetime.datetime(2025, 6, 1)],
+            self.fire_times("0 0 1 mar/3 *", start, count=2)
+        )
+
+    def test_day_of_month_or_day_of_week(self):
+        # Both fields restricted: Fridays and the 13th.
+        self.assertEqual(
+            [datetime.datetime(2025, 1, 3), datetime.datetime(2025, 1, 10),
+             datetime.datetime(2025, 1, 13), datetime.datetime(2025, 1, 17)],
+            self.fire_times("0 0 13 * fri", timestamp(2025, 1, 1))
+        )
+
+    def test_sparse(self):
+        self.assertEqual(
+            [datetime.datetime(2028, 2, 29, 3), datetime.datetime(2032, 2, 29, 3)],
+            self.fire_times("0 3 29 2 *", timestamp(2025, 1, 1), count=2)
+        )
+
+    def test_macros(self):
+        self.assertEqual(
+            [datetime.datetime(2025, 2, 1), datetime.datetime(2025, 3, 1)],
+            self.fire_times("@monthly", timestamp(2025, 1, 1, 0, 1), count=2)
+        )
+
+    def test_invalid(self):
+        for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "1-x * * * *", "0 0 30 2 *", "0 0 31 4,6 *"):
+            with self.assertRaises(ValueError, msg=expression):
+                CronExpression(expression)
+        scheduler = CalendarScheduler()
+        self.assertIsNone(scheduler.enter_cron_event(print, "0 0 30 2 *"))
+        self.assertIsNone(scheduler.enter_cron_event(print, None))
+
+    def test_compiled_once(self):
+        self.assertIs(compile_cron("0 3 * * *"), compile_cron("0 3 * * *"))
+
+    @unittest.skipIf(zoneinfo is None, "zoneinfo is not available")
+    def test_daylight_saving_time(self):
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        # 02:30 does not exist on 2025-03-30 and is repeated on 2025-10-26.
+        self.assertEqual(
+            [timestamp(2025, 3, 29, 2, 30, tz=tz), timestamp(2025, 3, 30, 3, 30, tz=tz),
+             timestamp(2025, 3, 31, 2, 30, tz=tz)],
+            list(itertools.islice(
+                self.occurrences("30 2 * * *", timestamp(2025, 3, 29, tz=tz), tz), 3
+            ))
+        )
+        self.assertEqual(
+            [timestamp(2025, 10, 26, 2, 30, tz=tz), timestamp(2025, 10, 27, 2, 30, tz=tz)],
+            list(itertools.islice(
+                self.occurrences("30 2 * * *", timestamp(2025, 10, 26, tz=tz), tz), 2
+            ))
+        )
+
+    def occurrences(self, expression, start, tz):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_cron_event(print, expression, start_time=start, tz=tz)
+        scheduler.cancel(event)
+        return scheduler.occurrences(event)
+
+
+class TestCronEvent(unittest.TestCase):
+    def test_run(self):
+        time_controller = TestTimeController(timestamp(2025, 1, 1))
+        clocks = []
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        scheduler.enter_cron_event(
+            lambda: clocks.append(time_controller.get_clock()), "0 */6 * * *",
+            end_time=timestamp(2025, 1, 2), tz=UTC
+        )
+        scheduler.run()
+        self.assertEqual([timestamp(2025, 1, 1, hour) for hour in (0, 6, 12, 18)], clocks)
+
+
+if __name__ == "__main__":
+    unittest.main()
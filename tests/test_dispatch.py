@@ -0,0 +1,566 @@
+import concurrent.futures
+import datetime
+import itertools
+import threading
+import unittest
+from time import sleep
+
+from support import TestTimeController
+
+from calsched import BatchAction, CalendarScheduler, HeapQueue
+
+
+class CountingTimeController(TestTimeController):
+    def __init__(self):
+        super().__init__()
+        self.interrupts = 0
+
+    def interrupt(self):
+        self.interrupts += 1
+
+
+class TestBatch(unittest.TestCase):
+    def test_batch(self):
+        time_controller = CountingTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        fired = []
+        with scheduler.batch() as batch:
+            for i in range(1, 101):
+                batch.enter_every_second_event(action=fired.append, action_args=(i,), interval=i, end_time=100)
+            self.assertIsNone(batch.enter_daily_event(action=print, hour=24))
+            self.assertEqual(100, len(batch))
+            self.assertEqual(0, time_controller.interrupts)
+        self.assertEqual(1, time_controller.interrupts)
+        scheduler.run()
+        self.assertEqual(sum(len(range(0, 100, i)) for i in range(1, 101)), len(fired))
+        self.assertEqual(list(range(1, 101)), fired[:100])
+
+    def test_cancel_batch_event(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        fired = []
+        with scheduler.batch() as batch:
+            first = batch.enter_every_second_event(action=fired.append, action_args=(1,), end_time=3)
+            batch.enter_every_second_event(action=fired.append, action_args=(2,), end_time=3)
+            scheduler.cancel(first)
+        scheduler.run()
+        self.assertEqual([2, 2, 2], fired)
+
+    def test_exception_discards_batch(self):
+        scheduler = CalendarScheduler()
+        with self.assertRaises(RuntimeError):
+            with scheduler.batch() as batch:
+                event = batch.enter_hourly_event(action=print)
+                raise RuntimeError()
+        self.assertTrue(event.canceled)
+        scheduler.run()
+
+
+class PendingExecutor(concurrent.futures.Executor):
+    def __init__(self, timefunc):
+        self.timefunc = timefunc
+        self.calls = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        self.calls.append((self.timefunc(), future, fn, args, kwargs))
+        return future
+
+
+class TestExecutor(unittest.TestCase):
+    def test_actions_are_submitted(self):
+        time_controller = TestTimeController()
+        executor = PendingExecutor(time_controller.get_clock)
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller, executor=executor)
+        scheduler.enter_every_second_event(action=print, action_args=(1,), action_kwargs={"end": ""}, end_time=3)
+        scheduler.run()
+        self.assertEqual([(print, (1,), {"end": ""})] * 3, [call[2:] for call in executor.calls])
+
+    def test_max_concurrent(self):
+        time_controller = TestTimeController()
+        executor = PendingExecutor(time_controller.get_clock)
+        sleep_func = time_controller.sleep
+
+        def sleep_and_complete(seconds):
+            sleep_func(seconds)
+            if time_controller.get_clock() == 4 and not executor.calls[0][1].done():
+                executor.calls[0][1].set_result(None)
+
+        time_controller.sleep = sleep_and_complete
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller, executor=executor)
+        event = scheduler.enter_every_second_event(action=print, max_concurrent=2, end_time=8)
+        scheduler.run()
+        self.assertEqual([0, 1, 4], [call[0] for call in executor.calls])
+        self.assertEqual(2, event.running)
+
+    def test_max_concurrent_parameter(self):
+        scheduler = CalendarScheduler()
+        self.assertIsNone(scheduler.enter_daily_event(action=print, max_concurrent=0))
+
+    def test_long_action_does_not_delay_other_events(self):
+        # The futures of the executor never complete, as if every action were still running.
+        time_controller = TestTimeController()
+        executor = PendingExecutor(time_controller.get_clock)
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller, executor=executor)
+        scheduler.enter_every_millisecond_event(action=sleep, action_args=(0.3,), interval=100, end_time=0.6)
+        scheduler.enter_every_millisecond_event(action=print, interval=50, end_time=0.6)
+        scheduler.run()
+        clocks = [round(call[0], 6) for call in executor.calls if call[2] is print]
+        self.assertEqual([round(i * 0.05, 6) for i in range(1, 12)], clocks)
+
+
+class TestMisfire(unittest.TestCase):
+    def run_stalled(self, enter, stall_at, stall, count):
+        """
+        Run an event whose action stalls the clock once, and return the clocks of the actions.
+        """
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        clocks = []
+        events = []
+
+        def action():
+            clocks.append(round(time_controller.get_clock(), 6))
+            if len(clocks) == stall_at:
+                time_controller.clock += stall
+            if len(clocks) >= count:
+                scheduler.cancel(events[0])
+
+        events.append(enter(scheduler, action))
+        scheduler.run()
+        return clocks
+
+    def test_policies(self):
+        def run(count, **kwargs):
+            return self.run_stalled(
+                lambda s, a: s.enter_every_second_event(action=a, start_time=0, **kwargs), 3, 3.5, count
+            )
+        self.assertEqual([0.0, 1.0, 2.0, 5.5, 6.0, 7.0], run(6))
+        self.assertEqual([0.0, 1.0, 2.0, 6.0, 7.0], run(5, misfire_policy="skip"))
+        self.assertEqual([0.0, 1.0, 2.0, 5.5, 5.5, 5.5, 6.0], run(7, misfire_policy="run_all"))
+        self.assertEqual([0.0, 1.0, 2.0, 5.5, 5.5, 6.0], run(6, misfire_policy="run_all", misfire_limit=1))
+        self.assertEqual([0.0, 1.0, 2.0, 6.0, 7.0], run(5, misfire_grace_time=1.0))
+
+    def test_skip_late_occurrence(self):
+        def run(stall, **kwargs):
+            return self.run_stalled(
+                lambda s, a: s.enter_every_second_event(action=a, start_time=0, misfire_policy="skip", **kwargs),
+                3, stall, 5
+            )
+        # The occurrence at 3.0 is due when the stall ends.
+        self.assertEqual([0.0, 1.0, 2.0, 3.5, 4.0], run(1.5))
+        self.assertEqual([0.0, 1.0, 2.0, 4.0, 5.0], run(2.0))
+        self.assertEqual([0.0, 1.0, 2.0, 4.0, 5.0], run(1.5, misfire_grace_time=0.25))
+        self.assertEqual([0.0, 1.0, 2.0, 4.5, 5.0], run(2.5, misfire_grace_time=1.5))
+
+    def test_millisecond_phase(self):
+        clocks = self.run_stalled(
+            lambda s, a: s.enter_every_millisecond_event(action=a, interval=300, start_time=0), 2, 0.5, 5
+        )
+        self.assertEqual([0.3, 0.6, 1.1, 1.2, 1.5], clocks)
+
+    def test_interval_phase(self):
+        clocks = self.run_stalled(
+            lambda s, a: s.enter_every_minute_event(action=a, interval=5, second=10, start_time=0), 1, 400, 3
+        )
+        self.assertEqual([10.0, 410.0, 610.0], clocks)
+
+    def test_long_stall(self):
+        class ClockCallsController(TestTimeController):
+            calls = 0
+
+            def get_clock(self):
+                self.calls += 1
+                return self.clock
+
+        time_controller = ClockCallsController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        clocks = []
+        events = []
+
+        def action():
+            clocks.append(time_controller.get_clock())
+            if len(clocks) == 1:
+                time_controller.clock += 3600
+            if len(clocks) >= 7:
+                scheduler.cancel(events[0])
+
+        events.append(scheduler.enter_every_millisecond_event(
+            action=action, interval=10, start_time=0, misfire_policy="run_all", misfire_limit=5
+        ))
+        scheduler.run()
+        self.assertEqual(7, len(clocks))
+        self.assertLess(time_controller.calls, 100)
+
+    def test_start_time_in_the_past(self):
+        time_controller = TestTimeController()
+        time_controller.clock = 10.5
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        clocks = []
+        events = []
+
+        def action():
+            clocks.append(time_controller.get_clock())
+            if len(clocks) >= 4:
+                scheduler.cancel(events[0])
+
+        events.append(scheduler.enter_every_second_event(
+            action=action, interval=3, start_time=0, misfire_policy="run_all", misfire_limit=2
+        ))
+        scheduler.run()
+        self.assertEqual([10.5, 10.5, 12.0, 15.0], clocks)
+
+    def test_invalid(self):
+        scheduler = CalendarScheduler()
+        self.assertIsNone(scheduler.enter_every_second_event(action=print, misfire_policy="later"))
+        self.assertIsNone(scheduler.enter_every_second_event(action=print, misfire_grace_time=-1))
+        self.assertIsNone(scheduler.enter_every_second_event(action=print, misfire_limit=0))
+
+
+class CountingQueue(HeapQueue):
+    def __init__(self):
+        super().__init__()
+        self.pushes = 0
+        self.groups = []
+
+    def push(self, *args):
+        self.pushes += 1
+        return super().push(*args)
+
+    def pop_group(self):
+        entries = super().pop_group()
+        self.groups.append(len(entries))
+        return entries
+
+
+class TestGroupDispatch(unittest.TestCase):
+    def test_same_instant(self):
+        time_controller = CountingTimeController()
+        queue = CountingQueue()
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, queue=queue
+        )
+        fired = []
+        with scheduler.batch() as batch:
+            for i in range(100):
+                batch.enter_every_minute_event(action=fired.append, action_args=(i,), second=i % 2, end_time=180)
+        scheduler.run()
+        self.assertEqual([50, 50, 50, 50, 50, 50], queue.groups)
+        self.assertEqual(list(range(0, 100, 2)) + list(range(1, 100, 2)), fired[:100])
+        self.assertEqual(300, len(fired))
+        self.assertEqual(0, queue.pushes)
+        self.assertEqual(1, time_controller.interrupts)
+
+    def test_exception_runs_rest_of_group(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        fired = []
+
+        def fail():
+            fired.append("fail")
+            raise RuntimeError()
+
+        scheduler.enter_every_second_event(action=fail, end_time=2)
+        scheduler.enter_every_second_event(action=fired.append, action_args=("next",), end_time=2)
+        scheduler.enter_every_second_event(action=fail, end_time=2)
+        with self.assertRaises(RuntimeError):
+            scheduler.run()
+        self.assertEqual(["fail", "next", "fail"], fired)
+        with self.assertRaises(RuntimeError):
+            scheduler.run()
+        self.assertEqual(["fail", "next", "fail"] * 2, fired)
+        scheduler.run()
+
+    def test_first_exception_propagates(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        fired = []
+
+        def fail(error):
+            fired.append(error)
+            raise error
+
+        first = RuntimeError("first")
+        second = ValueError("second")
+        scheduler.enter_every_second_event(action=fail, action_args=(first,), end_time=1)
+        scheduler.enter_every_second_event(action=fail, action_args=(second,), end_time=1)
+        for _ in range(2000):
+            scheduler.enter_every_second_event(action=fail, action_args=(second,), end_time=1)
+        with self.assertRaises(RuntimeError) as context:
+            scheduler.run()
+        self.assertIs(first, context.exception)
+        self.assertEqual([first] + [second] * 2001, fired)
+
+    def test_batch_action(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        calls = []
+
+        def record(items):
+            calls.append((time_controller.get_clock(), items))
+
+        action = BatchAction(record)
+
+        fired = []
+        for i in range(3):
+            scheduler.enter_every_second_event(action=action, action_args=(i,), end_time=2)
+        scheduler.enter_every_second_event(action=fired.append, action_args=("single",), end_time=2)
+        scheduler.enter_every_second_event(action=action, action_kwargs={"key": 3}, end_time=2)
+        scheduler.run()
+        items = [((0,), {}), ((1,), {}), ((2,), {}), ((), {"key": 3})]
+        self.assertEqual([(0.0, items), (1.0, items)], calls)
+        self.assertEqual(["single", "single"], fired)
+
+        calls.clear()
+        action("x", key=1)
+        self.assertEqual([(1.0, [(("x",), {"key": 1})])], calls)
+
+    def test_batch_action_max_concurrent(self):
+        time_controller = TestTimeController()
+        executor = PendingExecutor(time_controller.get_clock)
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, executor=executor
+        )
+        action = BatchAction(print)
+        events = [
+            scheduler.enter_every_second_event(action=action, action_args=(i,), end_time=2, max_concurrent=1)
+            for i in range(2)
+        ]
+        scheduler.run()
+        self.assertEqual(1, len(executor.calls))
+        self.assertEqual([[((0,), {}), ((1,), {})]], list(executor.calls[0][3]))
+        self.assertEqual([1, 1], [event.running for event in events])
+        executor.calls[0][1].set_result(None)
+        self.assertEqual([0, 0], [event.running for event in events])
+
+
+class TestSpread(unittest.TestCase):
+    def minute_load(self, spread):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, spread=spread
+        )
+        load = [0] * 60
+
+        def action(job):  # pylint: disable=unused-argument
+            load[int(time_controller.get_clock() // 60)] += 1
+
+        with scheduler.batch() as batch:
+            for i in range(3000):
+                batch.enter_hourly_event(action=action, action_args=(i,), end_time=3600, tz=datetime.timezone.utc)
+        scheduler.run()
+        return load
+
+    def test_load_histogram(self):
+        self.assertEqual([3000] + [0] * 59, self.minute_load(None))
+        load = self.minute_load(3600)
+        self.assertEqual(3000, sum(load))
+        self.assertLess(max(load), 2 * 50)
+        self.assertGreater(min(load), 50 // 3)
+
+    def test_stable_offset(self):
+        def fire_times(**kwargs):
+            scheduler = CalendarScheduler(spread=kwargs.pop("scheduler_spread", None))
+            event = scheduler.enter_daily_event(
+                action=print, action_args=("report",), hour=3, start_time=0, tz=datetime.timezone.utc, **kwargs
+            )
+            scheduler.cancel(event)
+            return list(itertools.islice(scheduler.occurrences(event), 3))
+
+        nominal = [3 * 3600.0, 27 * 3600.0, 51 * 3600.0]
+        self.assertEqual(nominal, fire_times())
+        spread = fire_times(spread=600)
+        self.assertEqual(spread, fire_times(scheduler_spread=600))
+        self.assertEqual(nominal, fire_times(scheduler_spread=600, spread=0))
+        jitter = spread[0] - nominal[0]
+        self.assertTrue(0 < jitter < 600)
+        self.assertEqual([t + jitter for t in nominal], spread)
+
+    def test_address_repr_argument(self):
+        scheduler = CalendarScheduler(spread=600)
+        # The repr of these arguments holds their address, which changes on every restart.
+        events = [
+            scheduler.enter_daily_event(action=print, action_args=(argument, "report"), hour=3)
+            for argument in (object(), object(), print.__call__)
+        ]
+        self.assertNotIn("0x", events[0].settings.identity())
+        self.assertIn('"report"', events[0].settings.identity())
+        self.assertEqual(1, len({event.settings.jitter for event in events}))
+        with_job_ids = [
+            scheduler.enter_daily_event(action=print, action_args=(object(),), hour=3, job_id=job_id)
+            for job_id in ("first", "second")
+        ]
+        self.assertEqual(["first", "second"], [event.settings.identity() for event in with_job_ids])
+        self.assertNotEqual(with_job_ids[0].settings.jitter, with_job_ids[1].settings.jitter)
+        for event in events + with_job_ids:
+            scheduler.cancel(event)
+
+    def test_sub_second_intervals(self):
+        scheduler = CalendarScheduler(spread=1)
+        events = [
+            scheduler.enter_every_millisecond_event(action=print, interval=100),
+            scheduler.enter_every_millisecond_event(action=print, interval=250),
+            scheduler.enter_every_microsecond_event(action=print, interval=100),
+            scheduler.enter_every_microsecond_event(action=print, interval=250),
+        ]
+        self.assertEqual(4, len({event.settings.identity() for event in events}))
+        self.assertEqual(4, len({event.settings.jitter for event in events}))
+        for event in events:
+            scheduler.cancel(event)
+
+    def test_rearm_keeps_nominal_times(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        clocks = []
+        event = scheduler.enter_every_minute_event(
+            action=lambda: clocks.append(time_controller.get_clock()), end_time=300, spread=30
+        )
+        scheduler.run()
+        jitter = event.settings.jitter
+        self.assertEqual([minute * 60 + jitter for minute in range(5)], clocks)
+
+    def test_invalid(self):
+        self.assertIsNone(CalendarScheduler().enter_hourly_event(action=print, spread=-1))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stats(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, metrics=True
+        )
+        slow_calls = []
+
+        def slow():
+            slow_calls.append(time_controller.get_clock())
+            time_controller.clock += 0.25
+
+        # The slow action delays the fast event, which is due 0.1 s after it.
+        slow_event = scheduler.enter_every_second_event(action=slow, start_time=0, end_time=5)
+        fast = scheduler.enter_every_millisecond_event(
+            action=lambda: None, interval=1000, start_time=0.1, end_time=5
+        )
+        self.assertIsNone(scheduler.stats(fast))
+        self.assertEqual(2, scheduler.stats()["queue_depth"])
+        scheduler.run()
+
+        stats = scheduler.stats()
+        self.assertEqual(9, stats["fires"])
+        self.assertEqual(9, stats["runs"])
+        self.assertEqual(0, stats["queue_depth"])
+        self.assertEqual(4, stats["wakeups"])
+        self.assertEqual(9, stats["lateness"]["count"])
+        self.assertEqual(9, stats["duration"]["count"])
+
+        fast_stats = scheduler.stats(fast)
+        self.assertEqual(4, fast_stats["fires"])
+        self.assertAlmostEqual(0.15, fast_stats["lateness"]["max"])
+        self.assertAlmostEqual(0.15, fast_stats["lateness"]["p50"])
+        self.assertEqual([(0.2, 4)], [bucket for bucket in fast_stats["lateness"]["buckets"] if bucket[1]])
+        self.assertEqual(0.0, scheduler.stats(slow_event)["lateness"]["max"])
+        self.assertEqual(5, len(slow_calls))
+
+    def test_disabled(self):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_every_second_event(action=print)
+        self.assertIsNone(scheduler.stats())
+        self.assertIsNone(scheduler.stats(event))
+        scheduler.cancel(event)
+
+
+class TestHooks(unittest.TestCase):
+    def make_scheduler(self, **kwargs):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, **kwargs
+        )
+        calls = []
+        for name in ("before_rearm", "before_action", "after_action", "on_exception", "on_cancel"):
+            scheduler.add_hook(name, lambda *args, name=name: calls.append((name,) + args))
+        return time_controller, scheduler, calls
+
+    def test_order(self):
+        time_controller, scheduler, calls = self.make_scheduler()
+
+        def action():
+            time_controller.clock += 0.25
+            if time_controller.clock > 2:
+                raise ValueError("failed")
+
+        event = scheduler.enter_every_second_event(action=action, start_time=0, end_time=2.5)
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        scheduler.cancel(event)
+
+        error = calls[-2][4]
+        self.assertIsInstance(error, ValueError)
+        self.assertEqual([
+            ("before_rearm", event, 0.0, 0.0),
+            ("before_action", event, 0.0, 0.0),
+            ("after_action", event, 0.0, 0.25),
+            ("before_rearm", event, 1.0, 1.0),
+            ("before_action", event, 1.0, 1.0),
+            ("after_action", event, 1.0, 1.25),
+            ("before_rearm", event, 2.0, 2.0),
+            ("before_action", event, 2.0, 2.0),
+            ("on_exception", event, 2.0, 2.25, error),
+            ("on_cancel", event, None, 2.25),
+        ], calls)
+
+    def test_batch_and_executor(self):
+        _, scheduler, calls = self.make_scheduler(
+            executor=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        )
+        send = BatchAction(lambda calls: None)
+        events = [
+            scheduler.enter_every_second_event(action=send, action_args=(i,), start_time=0, end_time=1)
+            for i in range(2)
+        ]
+        scheduler.run()
+        scheduler.executor.shutdown(wait=True)
+        self.assertEqual(6, len(calls))
+        self.assertEqual(
+            [("after_action", event, 0.0) for event in events],
+            sorted([call[:3] for call in calls if call[0] == "after_action"], key=lambda call: events.index(call[1]))
+        )
+
+    def test_max_concurrent(self):
+        _, scheduler, calls = self.make_scheduler(
+            executor=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        )
+        release = threading.Event()
+        event = scheduler.enter_every_second_event(
+            action=release.wait, start_time=0, end_time=2, max_concurrent=1
+        )
+        scheduler.run()
+        release.set()
+        scheduler.executor.shutdown(wait=True)
+        # The second occurrence is skipped while the first one still runs.
+        self.assertEqual([
+            ("before_rearm", event, 0.0),
+            ("before_action", event, 0.0),
+            ("before_rearm", event, 1.0),
+            ("after_action", event, 0.0),
+        ], [call[:3] for call in calls])
+
+    def test_remove(self):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        calls = []
+
+        def hook(*args):
+            calls.append(args)
+
+        scheduler.add_hook("before_action", hook)
+        scheduler.remove_hook("before_action", hook)
+        scheduler.enter_every_second_event(action=lambda: None, start_time=0, end_time=1)
+        scheduler.run()
+        self.assertEqual([], calls)
+        with self.assertRaises(ValueError):
+            scheduler.remove_hook("before_action", hook)
+        with self.assertRaises(ValueError):
+            scheduler.add_hook("after_everything", hook)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import types
+import unittest
+
+from support import TestTimeController
+
+from calsched import CalendarScheduler, FileLease, SQLiteLease
+from calsched import leadership
+
+
+class LeaseTestMixin:
+    def make_lease(self, path, **kwargs):
+        raise NotImplementedError
+
+    def setUp(self):  # pylint: disable=invalid-name
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "lease")
+        self.time_controller = TestTimeController()
+
+    def make_nodes(self):
+        return [
+            self.make_lease(self.path, lease_time=9, node_id=node_id, timefunc=self.time_controller.get_clock)
+            for node_id in ("a", "b")
+        ]
+
+    def test_one_leader(self):
+        a, b = self.make_nodes()
+        self.assertTrue(a.is_leader())
+        self.assertFalse(b.is_leader())
+        # The leader renews the lease, so it does not expire.
+        for _ in range(10):
+            self.time_controller.clock += 4
+            self.assertTrue(a.is_leader())
+            self.assertFalse(b.is_leader())
+
+    def test_failover(self):
+        a, b = self.make_nodes()
+        self.assertTrue(a.is_leader())
+        self.assertFalse(b.is_leader())
+        # The leader stops renewing. The standby takes over within lease_time + retry_interval.
+        takeover = None
+        while takeover is None:
+            self.time_controller.clock += 0.5
+            if b.is_leader():
+                takeover = self.time_controller.clock
+        self.assertLessEqual(9, takeover)
+        self.assertLessEqual(takeover, 9 + b.retry_interval + 0.5)
+        self.assertFalse(a.is_leader())
+
+    def test_release(self):
+        a, b = self.make_nodes()
+        self.assertTrue(a.is_leader())
+        a.release()
+        self.time_controller.clock += b.retry_interval
+        self.assertTrue(b.is_leader())
+
+
+class TestSQLiteLease(LeaseTestMixin, unittest.TestCase):
+    def make_lease(self, path, **kwargs):
+        lease = SQLiteLease(path, **kwargs)
+        self.addCleanup(lease.close)
+        return lease
+
+
+@unittest.skipIf(leadership.fcntl is None, "requires fcntl")
+class TestFileLease(LeaseTestMixin, unittest.TestCase):
+    def make_lease(self, path, **kwargs):
+        return FileLease(path, **kwargs)
+
+
+class TestSchedulerLeadership(unittest.TestCase):
+    def test_standby_keeps_queue(self):
+        time_controller = TestTimeController()
+
+        take_over = types.SimpleNamespace(is_leader=lambda: time_controller.get_clock() >= 3.5)
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, leadership=take_over
+        )
+        clocks = []
+
+        def action():
+            clocks.append(time_controller.get_clock())
+
+        scheduler.enter_every_second_event(action=action, start_time=0, end_time=6)
+        scheduler.run()
+        self.assertEqual([4.0, 5.0], clocks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import datetime
+import random
+import unittest
+
+from support import TestTimeController
+
+from calsched import CalendarScheduler, HeapQueue, TimingWheelQueue
+
+
+def drain(queue, times):
+    result = []
+    for now in times:
+        while True:
+            entry = queue.peek(now)
+            if entry is None or entry.time > now:
+                break
+            result.append(queue.pop().argument)
+    return result
+
+
+class QueueTestMixin:
+    def make_queue(self):
+        raise NotImplementedError
+
+    def test_order(self):
+        queue = self.make_queue()
+        rng = random.Random(1)
+        items = [(rng.uniform(0, 1000), i) for i in range(2000)]
+        for time_value, i in items:
+            queue.push(time_value, None, i)
+        self.assertEqual(2000, len(queue))
+        result = drain(queue, [1000.0])
+        self.assertEqual([i for _, i in sorted(items)], result)
+        self.assertEqual(0, len(queue))
+        self.assertIsNone(queue.peek(1000.0))
+
+    def test_equal_times_keep_insertion_order(self):
+        queue = self.make_queue()
+        for i in range(10):
+            queue.push(5.0, None, i)
+        self.assertEqual(list(range(10)), drain(queue, [5.0]))
+
+    def test_cancel(self):
+        queue = self.make_queue()
+        rng = random.Random(2)
+        entries = [queue.push(rng.uniform(0, 100), None, i) for i in range(500)]
+        canceled = set(rng.sample(range(500), 200))
+        for i in canceled:
+            self.assertTrue(queue.cancel(entries[i]))
+            self.assertFalse(queue.cancel(entries[i]))
+        self.assertEqual(300, len(queue))
+        expected = [e.argument for e in sorted(entries, key=lambda e: e.time) if e.argument not in canceled]
+        self.assertEqual(expected, drain(queue, [100.0]))
+
+    def test_stepwise_time(self):
+        queue = self.make_queue()
+        rng = random.Random(3)
+        items = [(rng.uniform(0, 10), i) for i in range(300)]
+        for time_value, i in items:
+            queue.push(time_value, None, i)
+        steps = [x / 10 for x in range(101)]
+        self.assertEqual([i for _, i in sorted(items)], drain(queue, steps))
+
+    def test_peek_future(self):
+        queue = self.make_queue()
+        queue.push(50.0, None, "b")
+        queue.push(20.0, None, "a")
+        self.assertEqual(20.0, queue.peek(0.0).time)
+        self.assertEqual(20.0, queue.peek(10.0).time)
+        queue.push(15.0, None, "c")
+        self.assertEqual(15.0, queue.peek(10.0).time)
+
+    def test_pop_after_cancel(self):
+        queue = self.make_queue()
+        first = queue.push(1.0, None, "a")
+        queue.push(2.0, None, "b")
+        queue.peek(3.0)
+        queue.cancel(first)
+        self.assertEqual(["b"], drain(queue, [3.0]))
+
+    def test_pop_group(self):
+        queue = self.make_queue()
+        queue.push(2.0, None, "c")
+        queue.push(1.0, None, "a")
+        canceled = queue.push(1.0, None, "x")
+        queue.push(1.0, None, "b")
+        queue.cancel(canceled)
+        self.assertEqual(1.0, queue.peek(1.5).time)
+        self.assertEqual(["a", "b"], [entry.argument for entry in queue.pop_group()])
+        self.assertEqual(1, len(queue))
+        self.assertEqual(["c"], [entry.argument for entry in queue.pop_group()])
+        self.assertIsNone(queue.peek(3.0))
+
+
+class TestHeapQueue(QueueTestMixin, unittest.TestCase):
+    def make_queue(self):
+        return HeapQueue()
+
+
+    def test_compact(self):
+        queue = HeapQueue(compact_threshold=10)
+        entries = [queue.push(float(i), None, i) for i in range(100)]
+        for entry in entries[:9]:
+            queue.cancel(entry)
+        queue.compact()
+        self.assertEqual(9, queue.tombstones)
+        for entry in entries[9:60]:
+            queue.cancel(entry)
+        queue.compact()
+        self.assertEqual(0, queue.tombstones)
+        self.assertEqual(40, len(queue))
+        self.assertEqual(list(range(60, 100)), drain(queue, [100.0]))
+
+
+class TestTimingWheelQueue(QueueTestMixin, unittest.TestCase):
+    def make_queue(self):
+        return TimingWheelQueue()
+
+    def test_posix_times(self):
+        queue = TimingWheelQueue()
+        base = 1700000000.0
+        rng = random.Random(4)
+        items = [(base + rng.uniform(0, 86400 * 400), i) for i in range(1000)]
+        for time_value, i in items:
+            queue.push(time_value, None, i)
+        self.assertEqual(min(items)[0], queue.peek(base).time)
+        steps = [base + day * 86400 for day in range(402)]
+        self.assertEqual([i for _, i in sorted(items)], drain(queue, steps))
+
+    def test_overflow(self):
+        queue = TimingWheelQueue(resolution=0.001, slot_bits=2, levels=2)
+        rng = random.Random(5)
+        items = [(rng.uniform(0, 1), i) for i in range(200)]
+        for time_value, i in items:
+            queue.push(time_value, None, i)
+        self.assertEqual([i for _, i in sorted(items)], drain(queue, [0.0, 0.3, 0.5, 1.0]))
+
+    def test_push_behind_cursor(self):
+        queue = TimingWheelQueue()
+        queue.push(10.0, None, "late")
+        self.assertEqual(10.0, queue.peek(5.0).time)
+        queue.push(1.0, None, "early")
+        self.assertEqual(["early"], drain(queue, [5.0]))
+        self.assertEqual(["late"], drain(queue, [10.0]))
+
+
+class TestSchedulerWithTimingWheel(unittest.TestCase):
+    def run_events(self, enter):
+        clocks = [self.run_with_queue(queue, enter) for queue in (HeapQueue(), TimingWheelQueue())]
+        self.assertEqual(clocks[0], clocks[1])
+        return clocks[1]
+
+    def run_with_queue(self, queue, enter):
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller, queue=queue)
+        fired = []
+        events = []
+
+        def action(name):
+            fired.append((name, time_controller.get_clock()))
+            if len(fired) >= 40:
+                for event in events:
+                    scheduler.cancel(event)
+
+        events.extend(enter(scheduler, action))
+        scheduler.run()
+        return fired
+
+    def test_mixed_events(self):
+        def enter(scheduler, action):
+            return [
+                scheduler.enter_every_millisecond_event(action, ("ms",), interval=700),
+                scheduler.enter_every_second_event(action, ("second",), interval=3),
+                scheduler.enter_every_minute_event(action, ("minute",), second=5),
+            ]
+        fired = self.run_events(enter)
+        self.assertEqual(40, len(fired))
+        self.assertEqual(("ms", 0.7), fired[1])
+
+    def test_calendar_events(self):
+        def enter(scheduler, action):
+            tz = datetime.timezone.utc
+            return [
+                scheduler.enter_daily_event(action, ("daily",), hour=3, tz=tz),
+                scheduler.enter_weekly_event(action, ("weekly",), weekday=2, tz=tz),
+                scheduler.enter_monthly_event(action, ("monthly",), day=31, tz=tz),
+            ]
+        fired = self.run_events(enter)
+        self.assertEqual(("daily", 3 * 3600.0), fired[0])
+        self.assertIn(("monthly", datetime.datetime(1970, 1, 31, tzinfo=datetime.timezone.utc).timestamp()), fired)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import datetime
+import itertools
+import unittest
+
+from support import TestTimeController
+
+from calsched import CalendarScheduler
+from calsched.rrule import parse_rrule
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+UTC = datetime.timezone.utc
+START = datetime.datetime(2025, 1, 1, 9, 0, tzinfo=UTC).timestamp()
+
+
+def occurrences(rule, count=6, start=START, tz=UTC, **kwargs):
+    scheduler = CalendarScheduler()
+    event = scheduler.enter_rrule_event(print, rule, start_time=start, tz=tz, **kwargs)
+    scheduler.cancel(event)
+    return [
+        datetime.datetime.fromtimestamp(time, tz).replace(tzinfo=None)
+        for time in itertools.islice(scheduler.occurrences(event), count)
+    ]
+
+
+def dates(*items):
+    return [datetime.datetime(*item) for item in items]
+
+
+class TestRRule(unittest.TestCase):
+    def test_monthly_weekday(self):
+        self.assertEqual(
+            dates((2025, 1, 31, 9), (2025, 2, 28, 9), (2025, 3, 28, 9)),
+            occurrences("FREQ=MONTHLY;BYDAY=-1FR", 3)
+        )
+        self.assertEqual(
+            dates((2025, 1, 14, 10, 30), (2025, 2, 11, 10, 30)),
+            occurrences("RRULE:FREQ=MONTHLY;BYDAY=2TU;BYHOUR=10;BYMINUTE=30", 2)
+        )
+
+    def test_set_position(self):
+        # The last workday of the month.
+        self.assertEqual(
+            dates((2025, 1, 31, 9), (2025, 2, 28, 9), (2025, 3, 31, 9), (2025, 4, 30, 9)),
+            occurrences("FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1", 4)
+        )
+
+    def test_count_and_exdates(self):
+        excluded = datetime.datetime(2025, 1, 2, 9, tzinfo=UTC).timestamp()
+        self.assertEqual(
+            dates((2025, 1, 1, 9), (2025, 1, 3, 9), (2025, 1, 4, 9)),
+            occurrences("FREQ=DAILY;COUNT=4", exdates=[excluded])
+        )
+
+    def test_until(self):
+        self.assertEqual(
+            dates((2025, 1, 1, 9), (2025, 1, 2, 9), (2025, 1, 3, 9)),
+            occurrences("FREQ=DAILY;UNTIL=20250103T090000Z")
+        )
+
+    def test_weekly_interval(self):
+        self.assertEqual(
+            dates((2025, 1, 1, 9), (2025, 1, 13, 9), (2025, 1, 15, 9), (2025, 1, 27, 9)),
+            occurrences("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE", 4)
+        )
+
+    def test_yearly(self):
+        self.assertEqual(
+            dates((2028, 2, 29, 9), (2032, 2, 29, 9)),
+            occurrences("FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29", 2)
+        )
+        self.assertEqual(
+            dates((2025, 5, 19, 9), (2026, 5, 18, 9)),
+            occurrences("FREQ=YEARLY;BYDAY=20MO", 2)
+        )
+
+    def test_sub_daily(self):
+        self.assertEqual(
+            dates((2025, 1, 4, 2), (2025, 1, 4, 7), (2025, 1, 4, 12), (2025, 1, 4, 17), (2025, 1, 4, 22),
+                  (2025, 1, 11, 4)),
+            occurrences("FREQ=HOURLY;INTERVAL=5;BYDAY=SA")
+        )
+        self.assertEqual(
+            dates((2025, 1, 1, 9), (2025, 1, 1, 9, 30), (2025, 1, 1, 17), (2025, 1, 1, 17, 30), (2025, 1, 2, 9)),
+            occurrences("FREQ=MINUTELY;INTERVAL=30;BYHOUR=9,17", 5)
+        )
+
+    def test_preview_after_rearm(self):
+        scheduler = CalendarScheduler()
+        event = scheduler.enter_rrule_event(print, "FREQ=MONTHLY;BYMONTHDAY=1,15;COUNT=5", start_time=START, tz=UTC)
+        scheduler.cancel(event)
+        settings = event.settings
+        first = list(scheduler.occurrences(event))
+        self.assertEqual(5, len(first))
+        self.assertEqual(first[3], settings.next_time(first[2], False))
+        self.assertEqual(first[1], settings.next_time(first[0], False))
+        self.assertEqual(first, list(scheduler.occurrences(event)))
+
+    def test_invalid(self):
+        for rule in ("BYDAY=MO", "FREQ=SOMETIMES", "FREQ=DAILY;BYYEARDAY=1", "FREQ=DAILY;BYDAY=1MO",
+                     "FREQ=DAILY;COUNT=2;UNTIL=20250101", "FREQ=DAILY;BYMONTH=13", "FREQ=DAILY;;"):
+            with self.assertRaises(ValueError, msg=rule):
+                parse_rrule(rule)
+        self.assertIsNone(CalendarScheduler().enter_rrule_event(print, "FREQ=DAILY;BYHOUR=24"))
+        self.assertIs(parse_rrule("FREQ=DAILY"), parse_rrule("FREQ=DAILY"))
+
+    @unittest.skipIf(zoneinfo is None, "zoneinfo is not available")
+    def test_daylight_saving_time(self):
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        start = datetime.datetime(2025, 3, 29, 2, 30, tzinfo=tz).timestamp()
+        self.assertEqual(
+            dates((2025, 3, 29, 2, 30), (2025, 3, 30, 3, 30), (2025, 3, 31, 2, 30)),
+            occurrences("FREQ=DAILY", 3, start=start, tz=tz)
+        )
+
+
+class TestRRuleEvent(unittest.TestCase):
+    def test_run(self):
+        time_controller = TestTimeController(START)
+        clocks = []
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, sleep_controller=time_controller)
+        scheduler.enter_rrule_event(
+            lambda: clocks.append(time_controller.get_clock()), "FREQ=WEEKLY;BYDAY=MO,FR;COUNT=3", tz=UTC
+        )
+        scheduler.run()
+        self.assertEqual(
+            [datetime.datetime(2025, 1, day, 9, tzinfo=UTC).timestamp() for day in (3, 6, 10)], clocks
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+
+from calsched import BatchAction, ShardedCalendarScheduler
+
+
+# Holds the queue the forked workers report to.
+results = []
+
+
+def report(value):
+    results[0].put((os.getpid(), value))
+
+
+def report_many(calls):
+    results[0].put((os.getpid(), sorted(args[0] for args, _ in calls)))
+
+
+def fail():
+    raise ValueError("action failed")
+
+
+def collect():
+    items = []
+    while not results[0].empty():
+        items.append(results[0].get())
+    return items
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "requires the fork start method")
+class TestShardedCalendarScheduler(unittest.TestCase):
+    def make_scheduler(self, workers=2):
+        context = multiprocessing.get_context("fork")
+        # The queue is inherited by the forked workers.
+        results[:] = [context.SimpleQueue()]
+        scheduler = ShardedCalendarScheduler(workers=workers, mp_context=context)
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    def test_events_run_in_workers(self):
+        scheduler = self.make_scheduler()
+        start_time = time.time() + 0.05
+        events = [
+            scheduler.enter_every_millisecond_event(
+                action=report, action_args=(i,), interval=20, start_time=start_time, end_time=start_time + 0.1,
+                misfire_policy="run_all"
+            )
+            for i in range(20)
+        ]
+        scheduler.run()
+
+        pids = {}
+        counts = {}
+        for pid, value in collect():
+            pids.setdefault(value, set()).add(pid)
+            counts[value] = counts.get(value, 0) + 1
+        self.assertEqual(list(range(20)), sorted(counts))
+        self.assertEqual({4}, set(counts.values()))
+        self.assertTrue(all(len(value_pids) == 1 for value_pids in pids.values()))
+        self.assertEqual(2, len(set().union(*pids.values())))
+        self.assertEqual({0, 1}, {scheduler.shard_of(event) for event in events})
+
+    def test_ended_events_are_released(self):
+        scheduler = self.make_scheduler()
+        start_time = time.time() + 0.05
+        for i in range(4):
+            scheduler.enter_every_millisecond_event(
+                action=report, action_args=(i,), interval=20, start_time=start_time, end_time=start_time + 0.05
+            )
+        event = scheduler.enter_daily_event(action=report, action_args=(4,))
+        self.assertEqual(5, len(scheduler))
+        scheduler.cancel(event)
+        scheduler.run()
+        self.assertEqual(0, len(scheduler))
+
+    def test_stable_shard(self):
+        first = self.make_scheduler(workers=3)
+        second = self.make_scheduler(workers=3)
+        shards = [
+            (first.shard_of(first.enter_daily_event(action=report, action_args=(i,))),
+             second.shard_of(second.enter_daily_event(action=report, action_args=(i,))))
+            for i in range(10)
+        ]
+        self.assertTrue(all(a == b for a, b in shards))
+
+    def test_cancel(self):
+        scheduler = self.make_scheduler()
+        event = scheduler.enter_every_millisecond_event(action=report, action_args=(1,), interval=10)
+        timer = threading.Timer(0.1, scheduler.cancel, (event,))
+        timer.start()
+        scheduler.run()
+        timer.join()
+        self.assertTrue(event.canceled)
+        self.assertGreater(len(collect()), 2)
+
+    def test_batch_action_in_worker(self):
+        scheduler = self.make_scheduler(workers=1)
+        send = BatchAction(report_many)
+        start_time = time.time() + 0.05
+        for i in range(3):
+            scheduler.enter_every_millisecond_event(
+                action=send, action_args=(i,), interval=100, start_time=start_time, end_time=start_time + 0.15
+            )
+        scheduler.run()
+        self.assertEqual([[0, 1, 2]], [value for _, value in collect()])
+
+    def test_not_picklable(self):
+        scheduler = self.make_scheduler(workers=1)
+        self.assertIsNone(scheduler.enter_every_second_event(action=lambda: None))
+        self.assertIsNone(scheduler.enter_every_second_event(action=report, action_args=(threading.Lock(),)))
+
+    def test_action_error(self):
+        scheduler = self.make_scheduler(workers=1)
+        event = scheduler.enter_every_millisecond_event(action=fail, interval=10)
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        scheduler.cancel(event)
+        scheduler.run()
+
+    def test_action_error_with_idle_workers(self):
+        scheduler = self.make_scheduler(workers=4)
+        events = [scheduler.enter_every_millisecond_event(action=fail, interval=10, start_time=time.time() + 0.1)]
+        # Events in the other workers, which end before the error.
+        while len({scheduler.shard_of(event) for event in events}) < 4:
+            events.append(scheduler.enter_every_millisecond_event(
+                action=report, action_args=(len(events),), interval=10, end_time=time.time() + 0.02
+            ))
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        scheduler.cancel(events[0])
+        scheduler.run()
+        self.assertEqual(0, len(scheduler))
+
+    def test_action_error_pauses_other_workers(self):
+        scheduler = self.make_scheduler(workers=2)
+        events = [scheduler.enter_every_millisecond_event(action=fail, interval=10, start_time=time.time() + 0.1)]
+        # An event in the other worker, which would fire until it is canceled.
+        while len({scheduler.shard_of(event) for event in events}) < 2:
+            events.append(scheduler.enter_every_millisecond_event(
+                action=report, action_args=(len(events),), interval=10
+            ))
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        self.assertGreater(len(collect()), 2)
+        time.sleep(0.1)
+        self.assertEqual([], collect())
+        scheduler.cancel(events[0])
+        timer = threading.Timer(0.1, lambda: [scheduler.cancel(event) for event in events])
+        timer.start()
+        scheduler.run()
+        timer.join()
+        self.assertGreater(len(collect()), 2)
+        self.assertEqual(0, len(scheduler))
+
+
+if __name__ == '__main__':
+    unittest.main()
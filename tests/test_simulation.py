@@ -0,0 +1,67 @@
+import datetime
+import unittest
+
+from calsched import SimulatedClock, SimulatedScheduler
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+class TestSimulatedScheduler(unittest.TestCase):
+    def test_fire_log_and_load(self):
+        scheduler = SimulatedScheduler()
+        fast = scheduler.enter_every_second_event(action=print, interval=20)
+        slow = scheduler.enter_every_minute_event(action=print, second=30)
+        scheduler.run_until(120)
+
+        self.assertEqual(
+            [(0, fast), (20, fast), (30, slow), (40, fast), (60, fast), (80, fast), (90, slow), (100, fast), (120, fast)],
+            [(fire.time, fire.event) for fire in scheduler.fires]
+        )
+        self.assertEqual({0: 4, 60: 4, 120: 1}, scheduler.load())
+        self.assertEqual(120, scheduler.clock.now)
+
+    def test_step(self):
+        calls = []
+        scheduler = SimulatedScheduler(start_time=960, run_actions=True, log=False, load_interval=3600)
+        event = scheduler.enter_every_minute_event(action=lambda: calls.append(scheduler.clock.now))
+        scheduler.run_until(1080)
+        self.assertEqual([960, 1020, 1080], calls)
+        self.assertEqual(1080, scheduler.clock.now)
+
+        scheduler.run_until(1100)
+        self.assertEqual([960, 1020, 1080], calls)
+        scheduler.cancel(event)
+        scheduler.run_until(5000)
+        self.assertEqual(5000, scheduler.clock.now)
+        self.assertEqual({0: 3}, scheduler.load())
+        self.assertIsNone(scheduler.fires)
+
+    def test_clock(self):
+        clock = SimulatedClock(start_time=10)
+        clock.sleep(5)
+        self.assertEqual(15, clock.time())
+
+    @unittest.skipIf(zoneinfo is None, "zoneinfo is not available")
+    def test_year_with_daylight_saving_time(self):
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        start = datetime.datetime(2025, 1, 1, tzinfo=tz).timestamp()
+        scheduler = SimulatedScheduler(start_time=start)
+        scheduler.enter_daily_event(action=print, hour=2, minute=30, tz=tz)
+        scheduler.enter_hourly_event(action=print, minute=15, tz=tz)
+        scheduler.run_until(datetime.datetime(2026, 1, 1, tzinfo=tz).timestamp())
+
+        times = [datetime.datetime.fromtimestamp(fire.time, tz) for fire in scheduler.fires]
+        self.assertEqual(times, sorted(times))
+        daily = [time for time in times if time.minute == 30]
+        self.assertEqual(365, len(daily))
+        # 02:30 does not exist on the spring forward day.
+        self.assertEqual(datetime.datetime(2025, 3, 30, 3, 30, tzinfo=tz), daily[88])
+        # Every wall clock hour once: 02:15 is skipped in spring and not repeated in autumn.
+        self.assertEqual(365 * 24 - 1, len(times) - len(daily))
+
+
+if __name__ == "__main__":
+    unittest.main()
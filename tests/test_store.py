@@ -0,0 +1,216 @@
+import datetime
+import itertools
+import os
+import tempfile
+import unittest
+
+from support import TestTimeController, USEasternTime
+
+from calsched import CalendarScheduler, FileJobStore, SQLiteJobStore
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+
+class Crash(Exception):
+    pass
+
+
+calls = []
+hooks = []
+
+
+def record_call(*args, **kwargs):
+    calls.append((args, kwargs))
+    for hook in hooks:
+        hook()
+
+
+class StoreTestMixin:
+    def make_store(self, path):
+        raise NotImplementedError
+
+    def setUp(self):  # pylint: disable=invalid-name
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "jobs")
+        calls.clear()
+        hooks.clear()
+
+    def open_store(self):
+        store = self.make_store(self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_restore_rules(self):
+        berlin = zoneinfo.ZoneInfo("Europe/Berlin") if zoneinfo is not None else None
+        plus_three = datetime.timezone(datetime.timedelta(hours=3))
+        jobs = {
+            "ms": lambda s: s.enter_every_millisecond_event(record_call, interval=250, job_id="ms"),
+            "second": lambda s: s.enter_every_second_event(record_call, (1, "a"), interval=3, job_id="second"),
+            "minute": lambda s: s.enter_every_minute_event(record_call, interval=2, second=15, job_id="minute"),
+            "hourly": lambda s: s.enter_hourly_event(record_call, minute=5, tz=plus_three, job_id="hourly"),
+            "daily": lambda s: s.enter_daily_event(
+                record_call, action_kwargs={"x": 1}, hour=4, tz=datetime.timezone.utc, job_id="daily"
+            ),
+            "weekly": lambda s: s.enter_weekly_event(record_call, weekday=2, hour=3, tz=berlin, job_id="weekly"),
+            "monthly": lambda s: s.enter_monthly_event(
+                record_call, day=31, end_time=1e10, misfire_policy="run_all", misfire_limit=3, job_id="monthly"
+            ),
+            "yearly": lambda s: s.enter_yearly_event(record_call, month=2, day=29, spread=60, job_id="yearly"),
+            "cron": lambda s: s.enter_cron_event(record_call, "*/10 9-17 * * mon-fri", tz=berlin, job_id="cron"),
+            "rrule": lambda s: s.enter_rrule_event(
+                record_call, "FREQ=MONTHLY;BYDAY=-1FR;COUNT=12", exdates=[1.7e9 + 86400], tz=berlin, job_id="rrule"
+            ),
+            "every_microsecond": lambda s: s.enter_every_microsecond_event(record_call, interval=250, job_id="every_microsecond"),
+            "compound": lambda s: s.enter_compound_event(
+                record_call, "weekly", weekdays=[0, 4], hours=[8, 18], tz=berlin, job_id="compound"
+            ),
+        }
+        time_controller = TestTimeController(1.7e9)
+        scheduler = CalendarScheduler(timefunc=time_controller.get_clock, store=self.open_store())
+        events = {job_id: enter(scheduler) for job_id, enter in jobs.items()}
+        self.assertNotIn(None, events.values())
+
+        restored = CalendarScheduler(timefunc=time_controller.get_clock, store=self.open_store()).restore()
+        self.assertEqual(set(jobs), set(restored))
+        for job_id, event in events.items():
+            restored_settings = restored[job_id].settings
+            self.assertEqual(event.settings.action_args, restored_settings.action_args)
+            self.assertEqual(event.settings.misfire_limit, restored_settings.misfire_limit)
+            self.assertEqual(
+                list(itertools.islice(scheduler.occurrences(event), 5)),
+                list(itertools.islice(scheduler.occurrences(restored[job_id]), 5))
+            )
+        self.assertEqual({"x": 1}, restored["daily"].settings.action_kwargs)
+
+    def test_not_storable(self):
+        scheduler = CalendarScheduler(store=self.open_store())
+        self.assertIsNone(scheduler.enter_every_second_event(lambda: None, job_id="lambda"))
+        self.assertIsNone(scheduler.enter_every_second_event(record_call, (object(),), job_id="argument"))
+        # A zone with daylight saving time and no key must not be stored as a fixed offset.
+        self.assertIsNone(scheduler.enter_daily_event(record_call, hour=9, tz=USEasternTime(), job_id="zone"))
+        self.assertIsNotNone(scheduler.enter_every_second_event(lambda: None))
+        self.assertEqual([], scheduler.store.load())
+
+    @unittest.skipIf(zoneinfo is None, "zoneinfo is not available")
+    def test_unknown_zone_skipped(self):
+        class RemovedZone(USEasternTime):
+            key = "Removed/Zone"
+
+        scheduler = CalendarScheduler(store=self.open_store())
+        scheduler.enter_daily_event(record_call, hour=9, tz=RemovedZone(), job_id="removed")
+        scheduler.enter_daily_event(record_call, hour=9, job_id="valid")
+        store = self.open_store()
+        self.assertEqual(["valid"], list(CalendarScheduler(store=store).restore()))
+        self.assertEqual(["removed", "valid"], sorted(record.job_id for record in store.load()))
+
+    def test_cancel_removes_job(self):
+        scheduler = CalendarScheduler(store=self.open_store())
+        first = scheduler.enter_every_second_event(record_call, job_id="first")
+        with scheduler.batch() as batch:
+            batch.enter_every_second_event(record_call, job_id="second")
+        scheduler.cancel(first)
+        self.assertEqual(["second"], [record.job_id for record in scheduler.store.load()])
+
+    def run_until_crash(self, misfire_policy, **kwargs):
+        """
+        Run an every second job that crashes the process on its fourth occurrence.
+        """
+        time_controller = TestTimeController()
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, store=self.open_store()
+        )
+        scheduler.enter_every_second_event(
+            record_call, start_time=0, misfire_policy=misfire_policy, job_id="job", **kwargs
+        )
+
+        def crash():
+            if len(calls) == 4:
+                raise Crash()
+
+        hooks.append(crash)
+        with self.assertRaises(Crash):
+            scheduler.run()
+        self.assertEqual(4, len(calls))
+
+    def restart(self, clock, count):
+        """
+        Restore the jobs at clock and return the clocks of the next count actions.
+        """
+        time_controller = TestTimeController(clock)
+        scheduler = CalendarScheduler(
+            timefunc=time_controller.get_clock, sleep_controller=time_controller, store=self.open_store()
+        )
+        events = scheduler.restore()
+        clocks = []
+
+        def stop():
+            clocks.append(time_controller.get_clock())
+            if len(clocks) == count:
+                scheduler.cancel(events["job"])
+
+        hooks[:] = [stop]
+        scheduler.run()
+        return clocks
+
+    # The fire time of the fourth occurrence at 3.0 was not written before the crash.
+    def test_missed_while_down_coalesce(self):
+        self.run_until_crash("coalesce")
+        self.assertEqual([7.5, 8.0, 9.0], self.restart(7.5, 3))
+
+    def test_missed_while_down_run_all(self):
+        self.run_until_crash("run_all")
+        self.assertEqual([7.5, 7.5, 7.5, 7.5, 7.5, 8.0], self.restart(7.5, 6))
+
+    def test_missed_while_down_skip(self):
+        self.run_until_crash("skip")
+        self.assertEqual([8.0, 9.0], self.restart(7.5, 2))
+
+    def test_one_missed_while_down_skip(self):
+        self.run_until_crash("skip")
+        self.assertEqual([4.0, 5.0], self.restart(3.5, 2))
+
+    def test_missed_while_down_skip_grace_time(self):
+        self.run_until_crash("skip", misfire_grace_time=1.0)
+        self.assertEqual([3.5, 4.0], self.restart(3.5, 2))
+
+    def test_ended_jobs_removed(self):
+        scheduler = CalendarScheduler(store=self.open_store())
+        scheduler.enter_every_second_event(record_call, start_time=0, end_time=10, job_id="ended")
+        scheduler.enter_every_second_event(record_call, start_time=0, job_id="running")
+        scheduler.store.fired("ended", 9.0)
+        scheduler.store.flush()
+        store = self.open_store()
+        restored = CalendarScheduler(store=store).restore()
+        self.assertEqual(["running"], list(restored))
+        self.assertEqual(["running"], [record.job_id for record in store.load()])
+
+
+class TestSQLiteJobStore(StoreTestMixin, unittest.TestCase):
+    def make_store(self, path):
+        return SQLiteJobStore(path)
+
+
+class TestFileJobStore(StoreTestMixin, unittest.TestCase):
+    def make_store(self, path):
+        return FileJobStore(path)
+
+    def test_compact(self):
+        store = self.open_store()
+        scheduler = CalendarScheduler(store=store)
+        events = [scheduler.enter_every_second_event(record_call, job_id=str(i)) for i in range(10)]
+        for event in events[:8]:
+            scheduler.cancel(event)
+        store.fired("8", 100.0)
+        store.compact()
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(2, len(file.readlines()))
+        records = {record.job_id: record for record in self.open_store().load()}
+        self.assertEqual({"8": 100.0, "9": None}, {job_id: r.last_fire_time for job_id, r in records.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# The tests compare the cached computation of the rules with their datetime reference.
+# pylint: disable=protected-access
+
+import datetime
+import random
+import unittest
+
+from support import USEasternTime
+
+from calsched import tzcache
+from calsched.rules import (
+    Event, InternalHourlyEvent, InternalDailyEvent, InternalWeeklyEvent, InternalMonthlyEvent,
+    InternalYearlyEvent,
+)
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+TZ_DATABASE = zoneinfo is not None and "Europe/Berlin" in zoneinfo.available_timezones()
+
+
+@unittest.skipUnless(TZ_DATABASE, "requires zoneinfo with the tz database")
+class TestOffsetSpan(unittest.TestCase):
+    def test_transitions(self):
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        spring = datetime.datetime(2024, 3, 31, 1, tzinfo=datetime.timezone.utc).timestamp()
+        autumn = datetime.datetime(2024, 10, 27, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+        summer = tzcache.offset_span(tz, spring + 30 * 86400)
+        self.assertEqual((spring + tzcache.MARGIN_SECONDS, autumn - tzcache.MARGIN_SECONDS, 7200), summer)
+        winter = tzcache.offset_span(tz, spring - 30 * 86400)
+        self.assertEqual(3600, winter[2])
+        self.assertEqual(spring - tzcache.MARGIN_SECONDS, winter[1])
+        self.assertIsNone(tzcache.offset_span(tz, spring + 3600))
+        self.assertIsNone(tzcache.offset_span(tz, autumn - 86400))
+
+    def test_fixed_offset(self):
+        tz = datetime.timezone(datetime.timedelta(hours=-3))
+        span = tzcache.offset_span(tz, 1.7e9)
+        self.assertEqual(-3 * 3600, span[2])
+        self.assertLess(span[0], 1.7e9 - 100 * 86400)
+        self.assertGreater(span[1], 1.7e9 + 100 * 86400)
+
+
+@unittest.skipUnless(TZ_DATABASE, "requires zoneinfo with the tz database")
+class TestCachedNextTime(unittest.TestCase):
+    def test_matches_datetime(self):
+        rng = random.Random(1)
+        zones = [None, datetime.timezone.utc] + [
+            zoneinfo.ZoneInfo(name) for name in ("America/New_York", "Australia/Lord_Howe", "Pacific/Apia")
+        ]
+        classes = [
+            InternalHourlyEvent, InternalDailyEvent, InternalWeeklyEvent, InternalMonthlyEvent,
+            InternalYearlyEvent,
+        ]
+        for _ in range(5000):
+            event_settings = rng.choice(classes)(
+                Event(), None, (), {}, 0, None, tz=rng.choice(zones), interval=rng.randint(1, 3),
+                second=rng.randint(0, 59), minute=rng.choice((0, 30, rng.randint(0, 59))),
+                hour=rng.choice((0, 1, 2, 3, rng.randint(0, 23))), weekday=rng.randint(0, 6),
+                day=rng.choice((1, 29, 30, 31)), month=rng.randint(1, 12)
+            )
+            run_time = rng.uniform(1.2e9, 1.9e9)
+            if rng.random() < 0.5:
+                run_time = float(int(run_time))
+            for inclusive in (True, False):
+                self.assertEqual(
+                    event_settings._next_datetime(run_time, inclusive),
+                    event_settings.next_time(run_time, inclusive),
+                    (event_settings, run_time, inclusive)
+                )
+
+    def test_fixed_offset_fast_path(self):
+        for tz in (datetime.timezone.utc, datetime.timezone(datetime.timedelta(hours=-9, minutes=-30))):
+            event_settings = InternalWeeklyEvent(Event(), None, (), {}, 0, None, tz=tz, weekday=4, hour=13)
+            self.assertEqual(tz.utcoffset(None).total_seconds(), event_settings._offset)
+            run_time = 1.7e9
+            for _ in range(10):
+                self.assertEqual(
+                    event_settings._next_datetime(run_time, False), event_settings.next_time(run_time, False)
+                )
+                run_time = event_settings.next_time(run_time, False)
+        event_settings = InternalWeeklyEvent(Event(), None, (), {}, 0, None, tz=zoneinfo.ZoneInfo("Asia/Tokyo"))
+        self.assertIsNone(event_settings._offset)
+
+    def test_dst_daily(self):
+        tz = zoneinfo.ZoneInfo("America/New_York")
+        event_settings = InternalDailyEvent(Event(), None, (), {}, 0, None, tz=tz, hour=2, minute=30)
+        run_time = datetime.datetime(2024, 3, 1, tzinfo=tz).timestamp()
+        times = []
+        for _ in range(30):
+            run_time = event_settings.next_time(run_time, inclusive=False)
+            times.append(run_time)
+        expected = []
+        for day in range(1, 31):
+            expected.append(datetime.datetime(2024, 3, day, 2, 30, tzinfo=tz).timestamp())
+        self.assertEqual(expected, times)
+
+
+class TestDstTzinfo(unittest.TestCase):
+    def test_standard_offset_without_datetime(self):
+        # utcoffset(None) of the zone is its standard offset, but the zone is not fixed.
+        tz = USEasternTime()
+        self.assertIsNotNone(tz.utcoffset(None))
+        self.assertIsNone(tzcache.fixed_offset(tz))
+        event_settings = InternalDailyEvent(Event(), None, (), {}, 0, None, tz=tz, hour=9)
+        self.assertIsNone(event_settings._offset)
+        run_time = datetime.datetime(2024, 7, 1, tzinfo=tz).timestamp()
+        fire_time = datetime.datetime.fromtimestamp(event_settings.next_time(run_time, False), tz)
+        self.assertEqual((9, datetime.timedelta(hours=-4)), (fire_time.hour, fire_time.utcoffset()))
+        run_time = datetime.datetime(2024, 1, 1, tzinfo=tz).timestamp()
+        fire_time = datetime.datetime.fromtimestamp(event_settings.next_time(run_time, False), tz)
+        self.assertEqual((9, datetime.timedelta(hours=-5)), (fire_time.hour, fire_time.utcoffset()))
+
+
+if __name__ == '__main__':
+    unittest.main()
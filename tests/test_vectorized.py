@@ -0,0 +1,115 @@
+import datetime
+import itertools
+import random
+import unittest
+
+from calsched import CalendarScheduler
+from calsched.vectorized import next_fire_times
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "requires numpy")
+class TestNextFireTimes(unittest.TestCase):
+    COUNT = 15
+
+    def assert_matches_occurrences(self, kind, enter, params, starts, offsets):
+        scheduler = CalendarScheduler()
+        expected = []
+        for i, (start, offset) in enumerate(zip(starts, offsets)):
+            tz = datetime.timezone(datetime.timedelta(seconds=int(offset)))
+            kwargs = {name: int(values[i]) for name, values in params.items()}
+            event = enter(scheduler)(action=print, start_time=float(start), tz=tz, **kwargs)
+            scheduler.cancel(event)
+            expected.append(list(itertools.islice(scheduler.occurrences(event), self.COUNT)))
+        result = next_fire_times(kind, starts, self.COUNT, tz_offset=offsets, **params)
+        self.assertEqual((len(starts), self.COUNT), result.shape)
+        self.assertEqual(expected, result.tolist())
+
+    def random_arrays(self, size=200, seed=1):
+        rng = random.Random(seed)
+        base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+        starts = numpy.array([base + rng.randrange(0, 86400 * 3000) + rng.choice((0, 0.5)) for _ in range(size)])
+        offsets = numpy.array([rng.randrange(-12 * 4, 14 * 4) * 900 for _ in range(size)])
+        return rng, starts, offsets
+
+    def test_hourly_daily_weekly(self):
+        rng, starts, offsets = self.random_arrays()
+        size = len(starts)
+        base_params = {
+            "interval": numpy.array([rng.randint(1, 5) for _ in range(size)]),
+            "minute": numpy.array([rng.randint(0, 59) for _ in range(size)]),
+            "second": numpy.array([rng.randint(0, 59) for _ in range(size)]),
+        }
+        self.assert_matches_occurrences(
+            "hourly", lambda s: s.enter_hourly_event, base_params, starts, offsets
+        )
+        daily_params = dict(base_params, hour=numpy.array([rng.randint(0, 23) for _ in range(size)]))
+        self.assert_matches_occurrences(
+            "daily", lambda s: s.enter_daily_event, daily_params, starts, offsets
+        )
+        weekly_params = dict(daily_params, weekday=numpy.array([rng.randint(0, 6) for _ in range(size)]))
+        self.assert_matches_occurrences(
+            "weekly", lambda s: s.enter_weekly_event, weekly_params, starts, offsets
+        )
+
+    def test_monthly_yearly(self):
+        rng, starts, offsets = self.random_arrays(seed=2)
+        size = len(starts)
+        params = {
+            "interval": numpy.array([rng.randint(1, 5) for _ in range(size)]),
+            "day": numpy.array([rng.choice((1, 15, 28, 29, 30, 31)) for _ in range(size)]),
+            "hour": numpy.array([rng.randint(0, 23) for _ in range(size)]),
+            "minute": numpy.array([rng.randint(0, 59) for _ in range(size)]),
+        }
+        self.assert_matches_occurrences(
+            "monthly", lambda s: s.enter_monthly_event, params, starts, offsets
+        )
+        yearly_params = dict(params, month=numpy.array([rng.randint(1, 12) for _ in range(size)]))
+        self.assert_matches_occurrences(
+            "yearly", lambda s: s.enter_yearly_event, yearly_params, starts, offsets
+        )
+
+    def test_second_minute_millisecond(self):
+        scheduler = CalendarScheduler()
+        starts = numpy.array([100.0, 100.5, 137.25])
+
+        expected = []
+        for start in starts:
+            event = scheduler.enter_every_minute_event(action=print, second=30, interval=2, start_time=start)
+            scheduler.cancel(event)
+            expected.append(list(itertools.islice(scheduler.occurrences(event), self.COUNT)))
+        self.assertEqual(expected, next_fire_times("minute", starts, self.COUNT, interval=2, second=30).tolist())
+
+        expected = []
+        for start in starts:
+            event = scheduler.enter_every_second_event(action=print, interval=3, start_time=start)
+            scheduler.cancel(event)
+            expected.append(list(itertools.islice(scheduler.occurrences(event), self.COUNT)))
+        self.assertEqual(expected, next_fire_times("second", starts, self.COUNT, interval=3).tolist())
+
+        result = next_fire_times("millisecond", 100.0, 3, interval=[250, 1000])
+        self.assertEqual([[100.25, 100.5, 100.75], [101.0, 102.0, 103.0]], result.tolist())
+
+        starts = numpy.array([1.7e9, 1.7e9 + 0.123456789, 1234567890.987654])
+        for kind, enter in (
+            ("millisecond", scheduler.enter_every_millisecond_event),
+            ("microsecond", scheduler.enter_every_microsecond_event),
+        ):
+            expected = []
+            for start in starts:
+                event = enter(action=print, interval=7, start_time=start)
+                scheduler.cancel(event)
+                expected.append(list(itertools.islice(scheduler.occurrences(event), self.COUNT)))
+            self.assertEqual(expected, next_fire_times(kind, starts, self.COUNT, interval=7).tolist())
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            next_fire_times("fortnightly", 0.0, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()